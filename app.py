@@ -1,12 +1,91 @@
 
-from flask import Flask, request, jsonify, send_file
-from receptionist import get_greeting, parse_party_size, init_db, find_table_for_party, plan_path, avoid_obstacle
-from receptionist.db import list_tables, init_db as _init_db
+from flask import Flask, Response, g, request, jsonify, send_file
+from receptionist import get_greeting, parse_party_size, find_table_for_party, plan_path, avoid_obstacle
+from receptionist import db
+from receptionist.db import list_tables, floor_version
+from receptionist.feed import get_feed
+from receptionist.allocator import allocate_batch
+from receptionist.waitlist import get_waitlist, fits_floor
+from receptionist.nlp import parse_party_sizes, interpret
+from receptionist.navigation import MAX_GRID_CELLS, PATH_FORMATS, OccupancyGrid, path_payload
+from receptionist import eventlog, lifecycle, sites
+from receptionist.greeting import GREETINGS
+from receptionist.speech import get_phrase_cache
+from receptionist import metrics
+import json
 import os
+import tempfile
+import threading
+import time
 
 app = Flask(__name__)
 
-init_db()
+# no DB work at import: a site's DB is opened (and created or seeded if
+# missing) by sites.get_site() on the first request that names it
+# server-side only: clients may switch profiling on only where RECEPTIONIST_PROFILING=1,
+# and never choose where it writes
+PROFILING_ALLOWED = os.environ.get('RECEPTIONIST_PROFILING') == '1'
+PROFILE_DIR = os.environ.get('RECEPTIONIST_PROFILE_DIR') or os.path.join(tempfile.gettempdir(), 'receptionist-profiles')
+
+
+@app.before_request
+def _start_request():
+	g.request_start = time.perf_counter()
+	g.profiler = metrics.start_profile()
+	if _prewarm_thread is None:
+		_prewarm_phrases()
+	# every API call works on one site: ?site=<id> or an X-Site header, else the default
+	site_id = request.args.get('site') or request.headers.get('X-Site') or sites.DEFAULT_SITE
+	g.site = sites.get_site(site_id)
+	if g.site is None:
+		return jsonify({'error': f'unknown site {site_id!r}'}), 404
+	g.db_token = db.activate(g.site.db_path)
+
+
+@app.after_request
+def _record_request(resp):
+	endpoint = request.endpoint or 'unmatched'
+	metrics.HTTP_LATENCY.observe(time.perf_counter() - g.request_start, endpoint, request.method, str(resp.status_code))
+	profiler = g.pop('profiler', None)
+	path = metrics.finish_profile(profiler, endpoint) if profiler is not None else None
+	if path:
+		resp.headers['X-Profile-File'] = path
+	return resp
+
+
+@app.teardown_request
+def _drop_profiler(exc):
+	# after_request is skipped if the request died early; never leak the profiler slot
+	profiler = g.pop('profiler', None)
+	if profiler is not None:
+		metrics.finish_profile(profiler, request.endpoint or 'unmatched')
+	token = g.pop('db_token', None)
+	if token is not None:
+		db.deactivate(token)
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+	return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.route('/api/profiling', methods=['GET', 'POST'])
+def api_profiling():
+	"""Toggle per-request cProfile dumps: POST {"enabled": true}.
+
+	While on, each request (one at a time) writes a .prof file into
+	PROFILE_DIR (RECEPTIONIST_PROFILE_DIR), named in the response's
+	X-Profile-File header; inspect with python -m pstats. Switching it on
+	is refused (403) unless the server runs with RECEPTIONIST_PROFILING=1.
+	"""
+	if request.method == 'POST':
+		data = request.get_json(silent=True) or {}
+		enabled = isinstance(data, dict) and bool(data.get('enabled'))
+		if enabled and not PROFILING_ALLOWED:
+			return jsonify({'error': 'profiling is disabled on this server'}), 403
+		metrics.set_profiling(PROFILE_DIR if enabled else None)
+	return jsonify({'enabled': metrics.profile_dir is not None, 'dir': metrics.profile_dir})
+
 
 @app.route('/')
 def index():
@@ -15,70 +94,342 @@ def index():
 @app.route('/api/greeting')
 def api_greeting():
 	g = get_greeting()
+	eventlog.record('greeting')
 	return jsonify({'greeting': g})
 
 
-# Compatibility endpoints for the existing UI
-TABLE_COORDS = {
-	'T1': (3, 3),
-	'T2': (5, 3),
-	'T3_A': (9, 4),
-	'T3_B': (9, 6),
-	'T4': (4, 6),
-}
+@app.route('/api/sites')
+def api_sites():
+	return jsonify({'sites': [sites.get_site(s).describe() for s in sites.site_ids()]})
+
+
+@app.route('/api/site')
+def api_site():
+	"""The requested site's levels (grid size, robot home), for drawing the map."""
+	return jsonify(g.site.describe())
+
+
+def _level(data):
+	"""Floor level named by a request body or ?floor=, or None if the site lacks it."""
+	return _site_level(g.site, data, request.args.get('floor'))
+
+
+def _site_level(site, data, floor_arg):
+	try:
+		level = int(data.get('floor', floor_arg if floor_arg is not None else 0))
+	except (TypeError, ValueError):
+		return None
+	return level if level in site.floors else None
+
+
+def _bad_level():
+	return jsonify({'error': 'unknown floor for this site'}), 400
+
+
+def _path_format(data):
+	"""Route encoding a request asks for ("format"), or None if unsupported."""
+	fmt = data.get('format', 'cells')
+	return fmt if fmt in PATH_FORMATS else None
+
+
+def _bad_format():
+	return jsonify({'error': f"format must be one of {', '.join(PATH_FORMATS)}"}), 400
+
+CONFIRM_TEMPLATE = 'Got it, a table for {party}. Please follow me.'
+# the robot's fixed phrases; synthesized once so greetings never wait on TTS
+PHRASES = [*GREETINGS, *(CONFIRM_TEMPLATE.format(party=n) for n in range(1, 13))]
+_prewarm_thread = None
+_prewarm_lock = threading.Lock()
+
+
+def _prewarm_phrases():
+	"""Synthesize PHRASES on a background thread, started once by the first request.
+
+	Not at import: a cold start should not wait on TTS or its disk cache.
+	Returns the thread, so callers can wait for it.
+	"""
+	global _prewarm_thread
+	with _prewarm_lock:
+		if _prewarm_thread is None:
+			_prewarm_thread = threading.Thread(target=get_phrase_cache().prewarm, args=(PHRASES,),
+				name='tts-prewarm', daemon=True)
+			_prewarm_thread.start()
+	return _prewarm_thread
 
 
 @app.route('/api/greet')
 def api_greet():
 	msg = get_greeting()
+	eventlog.record('greeting')
 	return jsonify({'message': msg})
 
 
+def _timed(timings, stage, fn, *args):
+	"""Call fn(*args), recording its wall time in ms under timings[stage]."""
+	start = time.perf_counter()
+	try:
+		return fn(*args)
+	finally:
+		timings[stage] = round((time.perf_counter() - start) * 1000, 3)
+
+
+def _seat_request(text, timings):
+	"""Parse and allocate: (response dict, reserved table ids or None)."""
+	nlu = _timed(timings, 'parse', interpret, text)
+	slots = nlu['slots']
+	party = slots.get('party_size')
+	extra = {'intent': nlu['intent'], 'slots': slots}
+	eventlog.record('parse', party, intent=nlu['intent'])
+	if party is None:
+		# not a party size: answer what the guest did ask, then ask for the size
+		if nlu['intent'] == 'reservation_lookup' and slots.get('name'):
+			msg = f"Let me find the booking under {slots['name']}. How many are in your party?"
+		elif nlu['intent'] == 'seating_preference' and slots.get('seating'):
+			msg = f"I'll look for {slots['seating']} seating. How many are in your party?"
+		elif nlu['intent'] == 'greeting':
+			msg = f'{get_greeting()} How many are in your party?'
+		else:
+			msg = 'Sorry, I did not understand the party size.'
+		return {'success': False, 'message': msg, **extra}, None
+	if int(party) < 1:
+		return {'success': False, 'message': 'How many are in your party?', **extra}, None
+	tables = _timed(timings, 'allocate', find_table_for_party, int(party))
+	if not tables:
+		if not fits_floor(int(party)):
+			return {'success': False, 'message': 'No table available for that party size.', **extra}, None
+		# keep the guest: queue them and seat them automatically when tables free up
+		entry = _waitlist_json(get_waitlist().enqueue(int(party), name=slots.get('name')))
+		if entry['status'] != 'Seated':
+			wait = entry['eta_seconds']
+			msg = f"No table is free right now. You are number {entry['position']} on the waitlist"
+			if wait is not None:
+				minutes = max(1, round(wait / 60))
+				msg += f", about {minutes} minute{'s' if minutes != 1 else ''}."
+			else:
+				msg += '.'
+			return {'success': False, 'message': msg, 'waitlist': entry, **extra}, None
+		tables = entry['tables']
+		extra['waitlist'] = entry
+	level, coords = _timed(timings, 'approach', _approach, tables)
+	return {'success': True, 'message': CONFIRM_TEMPLATE.format(party=party), 'tables': tables,
+		'floor': level, 'target_coords': {'x': coords[0], 'y': coords[1]}, **extra}, tables
+
+
+def _approach(tables):
+	"""(level, cell) to lead a party seated at tables; a party never spans levels."""
+	rows = db.get_tables(tables)
+	level = rows[0]['floor']
+	cells = [(r['x'], r['y']) for r in rows]
+	# lead the party to the spot that serves the whole combination, not just tables[0]
+	return level, g.site.floor_map(level).approach_point(cells, g.site.home(level)) or cells[0]
+
+
 @app.route('/api/handle_request', methods=['POST'])
 def api_handle_request():
 	data = request.get_json() or {}
-	text = data.get('text', '')
-	party = parse_party_size(text)
-	if party is None:
-		return jsonify({'success': False, 'message': 'Sorry, I did not understand the party size.'})
-	tables = find_table_for_party(int(party))
-	if not tables:
-		return jsonify({'success': False, 'message': 'No table available for that party size.'})
-	# choose first table's coords as target
-	target_table = tables[0]
-	coords = TABLE_COORDS.get(target_table, (7,7))
-	return jsonify({'success': True, 'message': f'Got it, a table for {party}. Please follow me.', 'target_coords': {'x': coords[0], 'y': coords[1]}})
+	out, _ = _seat_request(data.get('text', ''), {})
+	return jsonify(out)
+
+
+@app.route('/api/guide', methods=['POST'])
+def api_guide():
+	"""parse -> allocate -> approach point -> path, in one round-trip.
+
+	Same fields as /api/handle_request plus 'path' and per-stage
+	'timings_ms', so the UI can start guiding without a /api/get_path call.
+	"""
+	start = time.perf_counter()
+	data = request.get_json() or {}
+	timings = {}
+	out, tables = _seat_request(data.get('text', ''), timings)
+	if tables:
+		target = (out['target_coords']['x'], out['target_coords']['y'])
+		level = out['floor']
+		out['path'] = _timed(timings, 'route', g.site.floor_map(level).path, g.site.home(level), target)
+		_record_navigation(out['path'], level, tables)
+		if not out['path']:
+			# nobody can be led there: undo the seating and hand the tables back
+			entry = out.get('waitlist')
+			if entry is not None:
+				out['waitlist'] = get_waitlist().unseat(entry['id']) or entry
+			eventlog.record('allocation_reversed', int(out['slots']['party_size']), tables)
+			lifecycle.release(tables)
+			out['success'], out['message'] = False, 'No path found.'
+	timings['total'] = round((time.perf_counter() - start) * 1000, 3)
+	out['timings_ms'] = timings
+	return jsonify(out)
+
+
+def _record_navigation(path, level, tables=None):
+	eventlog.record('navigation', tables=tables, floor=level, found=bool(path), steps=max(len(path) - 1, 0))
+
+
+def _waitlist_json(entry):
+	"""A waitlist entry plus its queue position and ETA while still waiting."""
+	if entry['status'] == 'Waiting':
+		now = time.time()
+		ahead = next((p for p in get_waitlist().snapshot(now) if p['id'] == entry['id']), None)
+		if ahead is not None:
+			return ahead
+	return entry
+
+
+@app.route('/api/waitlist', methods=['GET', 'POST'])
+def api_waitlist():
+	"""GET: waiting parties in order with position and eta_seconds.
+
+	POST {"size": 4, "name": optional, "priority": optional}: queue a party;
+	it is seated (status Seated, with tables) as soon as tables free up.
+	"""
+	wl = get_waitlist()
+	if request.method == 'GET':
+		parties = wl.snapshot()
+		return jsonify({'now': time.time(), 'waiting': len(parties), 'parties': parties})
+	data = request.get_json() or {}
+	try:
+		size = int(data['size'])
+		priority = int(data.get('priority', 0))
+	except (KeyError, TypeError, ValueError):
+		return jsonify({'error': 'integer size required'}), 400
+	if size < 1 or not fits_floor(size):
+		return jsonify({'error': 'no tables on this site can seat that party'}), 400
+	return jsonify(_waitlist_json(wl.enqueue(size, name=data.get('name'), priority=priority)))
+
+
+@app.route('/api/waitlist/<int:entry_id>', methods=['GET', 'DELETE'])
+def api_waitlist_entry(entry_id):
+	wl = get_waitlist()
+	if request.method == 'DELETE':
+		if not wl.cancel(entry_id):
+			return jsonify({'error': 'not waiting'}), 404
+		return jsonify({'success': True, 'id': entry_id})
+	entry = wl.get(entry_id)
+	if entry is None:
+		return jsonify({'error': 'unknown waitlist entry'}), 404
+	return jsonify(_waitlist_json(entry))
+
+
+@app.route('/api/nlu', methods=['POST'])
+def api_nlu():
+	data = request.get_json() or {}
+	return jsonify(interpret(data.get('text', '')))
+
+
+@app.route('/api/tts_cache')
+def api_tts_cache():
+	return jsonify(get_phrase_cache().stats())
 
 
 @app.route('/api/get_path', methods=['POST'])
 def api_get_path():
 	data = request.get_json() or {}
+	level = _level(data)
+	if level is None:
+		return _bad_level()
+	fmt = _path_format(data)
+	if fmt is None:
+		return _bad_format()
 	x = int(data.get('x', 5))
 	y = int(data.get('y', 5))
-	# robot start is (1,1)
-	path = plan_path((1,1), (x,y), obstacles=[])
+	fm = g.site.floor_map(level)
+	path = fm.path(g.site.home(level), (x,y))
+	_record_navigation(path, level)
 	if not path:
 		return jsonify({'success': False, 'message': 'No path found.'})
-	return jsonify({'success': True, 'path': path})
+	return jsonify({'success': True, **path_payload(path, fmt, fm.passable)})
 
 
 @app.route('/api/reset_sim', methods=['POST'])
 def api_reset_sim():
-	# reset DB
-	_init_db(force=True)
+	# reset this site's DB
+	g.site.reset()
 	return jsonify({'success': True, 'message': 'Simulation reset.'})
 
 
+def _table_json(r):
+	return {'name': r['table_id'], 'status': r['status'], 'floor': r['floor'], 'x_coord': r['x'], 'y_coord': r['y']}
+
+
 @app.route('/api/get_tables')
 def api_get_tables():
 	# return mapped table data with coords used by UI
-	rows = list(list_tables())
-	out = []
-	for r in rows:
-		tid = r['table_id']
-		x,y = TABLE_COORDS.get(tid, (0,0))
-		out.append({'name': tid, 'status': r['status'], 'x_coord': x, 'y_coord': y})
-	return jsonify(out)
+	# the floor version is the ETag: an unchanged floor costs one indexed read and a 304.
+	# Read it before the rows, so a racing write can only cause one extra refetch.
+	version = floor_version()
+	etag = f'floor-{version}'
+	if request.if_none_match.contains(etag):
+		return Response(status=304, headers={'ETag': f'"{etag}"'})
+	resp = jsonify([_table_json(r) for r in list_tables()])
+	resp.set_etag(etag)
+	resp.headers['X-Floor-Version'] = str(version)
+	return resp
+
+
+def _since_arg():
+	"""Client's last seen floor version (-1 asks for a full snapshot).
+
+	A reconnecting EventSource's Last-Event-ID is newer than the ?since= it
+	was first opened with, so it wins.
+	"""
+	return _parse_since(request.headers.get('Last-Event-ID'), request.args.get('since'))
+
+
+def _parse_since(last_event_id, since):
+	try:
+		return int(last_event_id or since or '')
+	except ValueError:
+		return -1
+
+
+def _poll_timeout(raw):
+	"""?timeout= for a long-poll, clamped to [0, 60] seconds (default 25); ValueError if not a number."""
+	return min(max(float(raw if raw is not None else 25), 0.0), 60.0)
+
+
+def _changes_json(version, reset, rows):
+	return {'version': version, 'reset': reset, 'changes': [_table_json(r) for r in rows]}
+
+
+def _sse_event(batch):
+	"""One server-sent event for a feed batch; None (an idle heartbeat) is a comment."""
+	if batch is None:
+		return ': keepalive\n\n'
+	data = _changes_json(*batch)
+	kind = 'reset' if data['reset'] else 'changes'
+	return f"id: {data['version']}\nevent: {kind}\ndata: {json.dumps(data)}\n\n"
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+@app.route('/api/floor/changes')
+def api_floor_changes():
+	"""Long-poll: table changes after ?since=<version>, waiting up to ?timeout= seconds.
+
+	Replies immediately if the floor already moved on, else when it next
+	changes or the timeout passes (with an empty change list).
+	"""
+	try:
+		timeout = _poll_timeout(request.args.get('timeout'))
+	except ValueError:
+		return jsonify({'error': 'timeout must be a number of seconds'}), 400
+	return jsonify(_changes_json(*get_feed().wait(_since_arg(), timeout)))
+
+
+@app.route('/api/floor/stream')
+def api_floor_stream():
+	"""Server-sent events: one 'changes' (or 'reset') event per floor change.
+
+	The event id is the floor version, so a reconnecting EventSource resumes
+	from Last-Event-ID without missing or repeating changes.
+	"""
+	feed, since = get_feed(), _since_arg()
+
+	def events():
+		yield 'retry: 2000\n\n'
+		for batch in feed.follow(since):
+			yield _sse_event(batch)
+
+	return Response(events(), mimetype='text/event-stream', headers=SSE_HEADERS)
 
 
 @app.route('/api/version')
@@ -96,8 +447,15 @@ def api_version():
 @app.route('/api/parse_party', methods=['POST'])
 def api_parse_party():
 	data = request.get_json() or {}
+	# batch mode: {"texts": [...]} -> {"party_sizes": [...]}
+	if isinstance(data.get('texts'), list):
+		sizes = parse_party_sizes(str(t) for t in data['texts'])
+		for party in sizes:
+			eventlog.record('parse', party, batch=True)
+		return jsonify({'party_sizes': sizes})
 	text = data.get('text', '')
 	party = parse_party_size(text)
+	eventlog.record('parse', party)
 	return jsonify({'party_size': party})
 
 @app.route('/api/find_table', methods=['POST'])
@@ -111,22 +469,255 @@ def api_find_table():
 		return jsonify({'available': False, 'tables': []})
 	return jsonify({'available': True, 'tables': tables})
 
+@app.route('/api/allocate_batch', methods=['POST'])
+def api_allocate_batch():
+	# body: {"parties": [{"size": 4, "priority": 1}, {"size": 2}, ...]}
+	data = request.get_json() or {}
+	parties = data.get('parties')
+	if not isinstance(parties, list):
+		return jsonify({'error': 'parties list required'}), 400
+	try:
+		sizes = [int(p['size']) for p in parties]
+		priorities = [int(p.get('priority', 0)) for p in parties]
+	except (KeyError, TypeError, ValueError):
+		return jsonify({'error': 'each party needs an integer size'}), 400
+	results = allocate_batch(sizes, priorities)
+	out = [{'size': s, 'priority': p, 'available': t is not None, 'tables': t or []}
+		for s, p, t in zip(sizes, priorities, results)]
+	return jsonify({'assignments': out, 'seated': sum(1 for t in results if t)})
+
+def _table_transition(action):
+	data = request.get_json() or {}
+	tables = data.get('tables')
+	if not isinstance(tables, list) or not tables:
+		return jsonify({'error': 'tables list required'}), 400
+	try:
+		status = action([str(t) for t in tables])
+	except lifecycle.InvalidTransition as e:
+		return jsonify({'success': False, 'message': str(e)}), 409
+	return jsonify({'success': True, 'tables': tables, 'status': status})
+
+@app.route('/api/seat', methods=['POST'])
+def api_seat():
+	return _table_transition(lambda ids: lifecycle.seat(ids) or 'Seated')
+
+@app.route('/api/release', methods=['POST'])
+def api_release():
+	return _table_transition(lifecycle.release)
+
+@app.route('/api/clean', methods=['POST'])
+def api_clean():
+	return _table_transition(lambda ids: lifecycle.mark_clean(ids) or 'Available')
+
+@app.route('/api/free_times')
+def api_free_times():
+	# predicted epoch seconds at which each table is Available again
+	return jsonify({'now': time.time(), 'tables': lifecycle.predict_free_times()})
+
 @app.route('/api/plan_path', methods=['POST'])
 def api_plan_path():
-	data = request.get_json() or {}
-	start = tuple(data.get('start', (0,0)))
-	goal = tuple(data.get('goal', (5,5)))
-	obstacles = [tuple(o) for o in data.get('obstacles', [])]
-	path = plan_path(start, goal, obstacles)
-	return jsonify({'path': path})
+	try:
+		plan = plan_request(g.site, request.get_json(silent=True) or {}, request.args.get('floor'))
+	except ValueError as e:
+		return jsonify({'error': str(e)}), 400
+	start, goal, obstacles, _, _, fm = plan
+	path = fm.path(start, goal) if fm is not None else plan_path(start, goal, obstacles)
+	return jsonify(plan_response(g.site, plan, path))
+
+
+# shared with asgi.py, which answers /api/plan_path on its own thread and process pools
+def plan_request(site, data, floor_arg=None):
+	"""A checked /api/plan_path body: (start, goal, obstacles, level, format, floor map).
+
+	The floor map is set when the site's cached map of that level can answer
+	the query; otherwise the caller runs plan_path(). Raises ValueError with
+	a message for the client.
+	"""
+	if not isinstance(data, dict):
+		raise ValueError('invalid JSON body')
+	try:
+		start = _cell(data.get('start', (0, 0)))
+		goal = _cell(data.get('goal', (5, 5)))
+		obstacles = [_cell(o) for o in data.get('obstacles', [])]
+	except (TypeError, ValueError):
+		raise ValueError('start, goal and obstacles must be [x, y] cells')
+	_, _, width, height = OccupancyGrid.extent([start, goal, *obstacles])
+	if width * height > MAX_GRID_CELLS:
+		raise ValueError(f'start, goal and obstacles span {width}x{height} cells, more than {MAX_GRID_CELLS}')
+	fmt = _path_format(data)
+	if fmt is None:
+		raise ValueError(f"format must be one of {', '.join(PATH_FORMATS)}")
+	level = _site_level(site, data, floor_arg)
+	fm = site.floor_map(level) if level is not None else None
+	if fm is not None and not fm.covers(start, goal, obstacles):
+		fm = None
+	return start, goal, obstacles, level, fmt, fm
+
+
+def plan_response(site, plan, path):
+	"""Log the route in site's event log and shape it as the request's format asked."""
+	_, _, obstacles, level, fmt, fm = plan
+	with db.use_db(site.db_path):
+		_record_navigation(path, level)
+	if fm is not None:
+		return path_payload(path, fmt, fm.passable)
+	blocked = set(obstacles)
+	return path_payload(path, fmt, lambda pos: pos not in blocked)
+
+
+def _cell(value):
+	x, y = value
+	return int(x), int(y)
+
 
 @app.route('/api/avoid', methods=['POST'])
 def api_avoid():
+	"""Dynamic obstacle avoidance.
+
+	Stateless: {"path": [...], "obstacle": [x, y]} -> one-cell sidestep.
+	Stateful: {"start": [x, y], "goal": [x, y]} opens a route session backed
+	by an incremental D* Lite planner; later calls send {"session_id": ...}
+	with any of "position", "obstacle"/"obstacles" and "cleared" and get the
+	repaired path back. {"session_id": ..., "close": true} ends the session.
+	"""
+	data = request.get_json(silent=True) or {}
+	if not isinstance(data, dict):
+		return jsonify({'error': 'invalid JSON body'}), 400
+	sid = data.get('session_id')
+	if sid is None and 'start' not in data:
+		try:
+			path = [_cell(p) for p in data.get('path', [])]
+			obs = _cell(data.get('obstacle'))
+		except (TypeError, ValueError):
+			return jsonify({'error': 'path and obstacle must be [x, y] cells'}), 400
+		return jsonify({'path': avoid_obstacle(path, obs)})
+	if sid is not None and not isinstance(sid, str):
+		return jsonify({'error': 'session_id must be a string'}), 400
+
+	try:
+		if sid is None:
+			start, goal = _cell(data['start']), _cell(data.get('goal'))
+		position = data.get('position')
+		if position is not None:
+			position = _cell(position)
+		blocked = [_cell(o) for o in data.get('obstacles', [])]
+		if data.get('obstacle') is not None:
+			blocked.append(_cell(data['obstacle']))
+		cleared = [_cell(c) for c in data.get('cleared', [])]
+	except (TypeError, ValueError):
+		return jsonify({'error': 'start, goal, position, obstacles and cleared must be [x, y] cells'}), 400
+	sessions = g.site.route_sessions
+	if sid is None:
+		level = _level(data)
+		if level is None:
+			return _bad_level()
+		grid = g.site.floor_map(level).grid
+		if not (grid.in_bounds(start) and grid.in_bounds(goal)):
+			return jsonify({'error': 'start/goal outside the floor map'}), 400
+		sid, _ = sessions.create(grid.copy(), start, goal)
+	entry = sessions.get(sid)
+	if entry is None:
+		return jsonify({'error': 'unknown or expired session_id'}), 404
+	if data.get('close'):
+		sessions.close(sid)
+		return jsonify({'session_id': sid, 'closed': True})
+	planner, lock = entry
+
+	if position is not None and not planner.grid.in_bounds(position):
+		return jsonify({'error': 'position outside the floor map'}), 400
+	with lock:
+		if position is not None:
+			planner.move_to(position)
+		planner.set_cells(blocked, cleared)
+		path = planner.path()
+	return jsonify({'session_id': sid, 'path': path, 'success': bool(path)})
+
+@app.route('/api/analytics')
+def api_analytics():
+	"""Guest-flow analytics for ?from=&to= (epoch seconds; default the last 24 hours).
+
+	covers_per_hour: parties and covers seated per local clock hour;
+	table_utilisation: share of the window each table was not Available;
+	avg_party_size: mean size of the parties seated.
+	"""
+	now = time.time()
+	try:
+		end = float(request.args.get('to', now))
+		start = float(request.args.get('from', end - 86400))
+	except ValueError:
+		return jsonify({'error': 'from and to must be epoch seconds'}), 400
+	if start >= end:
+		return jsonify({'error': 'from must be before to'}), 400
+	eventlog.flush(g.site.db_path)
+	return jsonify({'site': g.site.id, 'from': start, 'to': end,
+		'covers_per_hour': eventlog.covers_per_hour(start, end),
+		'table_utilisation': eventlog.table_utilisation(start, end),
+		'avg_party_size': eventlog.average_party_size(start, end),
+		'compacted_through': eventlog.watermark()})
+
+@app.route('/api/analytics/compact', methods=['POST'])
+def api_analytics_compact():
+	# normally done once a day by the turnover scheduler
+	return jsonify({'days': eventlog.compact(), 'compacted_through': eventlog.watermark()})
+
+@app.route('/api/fleet')
+def api_fleet():
+	level = _level({})
+	if level is None:
+		return _bad_level()
+	fleet = g.site.fleet(level)
+	return jsonify({'floor': level, 'step': fleet.now_step(), 'step_seconds': fleet.step_seconds,
+		'robots': fleet.status()})
+
+@app.route('/api/fleet/dispatch', methods=['POST'])
+def api_fleet_dispatch():
+	"""Allocate tables for each party and send the nearest idle robot to escort it.
+
+	Body: {"parties": [4, 2, ...]} (or {"size": 4}). Each escort path is timed:
+	path[k] is the robot's cell at fleet step t0 + k.
+	"""
 	data = request.get_json() or {}
-	path = [tuple(p) for p in data.get('path', [])]
-	obs = tuple(data.get('obstacle'))
-	new = avoid_obstacle(path, obs)
-	return jsonify({'path': new})
+	sizes = data.get('parties', [data['size']] if 'size' in data else None)
+	if not isinstance(sizes, list) or not sizes:
+		return jsonify({'error': 'parties list or size required'}), 400
+	try:
+		sizes = [int(n) for n in sizes]
+	except (TypeError, ValueError):
+		return jsonify({'error': 'each party size must be an integer'}), 400
+	if min(sizes) < 1:
+		return jsonify({'error': 'party sizes must be at least 1'}), 400
+	allocations = [find_table_for_party(n) for n in sizes]
+	out = [{'size': n, 'tables': tables or [], 'floor': None, 'robot': None, 'path': [], 't0': None}
+		for n, tables in zip(sizes, allocations)]
+	# each level's robots escort the parties seated on that level
+	by_level = {}
+	for i, tables in enumerate(allocations):
+		if tables:
+			level, target = _approach(tables)
+			out[i]['floor'] = level
+			by_level.setdefault(level, []).append((i, target))
+	for level, seated in by_level.items():
+		plans = g.site.fleet(level).dispatch([target for _, target in seated])
+		for (i, _), plan in zip(seated, plans):
+			if plan:
+				out[i].update(plan)
+			_record_navigation(plan['path'] if plan else [], level, allocations[i])
+	return jsonify({'assignments': out})
+
+@app.route('/api/fleet/release', methods=['POST'])
+def api_fleet_release():
+	data = request.get_json(silent=True) or {}
+	robot = data.get('robot') if isinstance(data, dict) else None
+	if not isinstance(robot, str):
+		return jsonify({'error': 'robot name required'}), 400
+	level = next((lv for lv, f in g.site.floors.items() if robot in f['robots']), None)
+	if level is None:
+		return jsonify({'error': 'unknown robot'}), 404
+	g.site.fleet(level).release(robot)
+	return jsonify({'success': True, 'robot': robot})
 
 if __name__ == '__main__':
+	# the reloader runs this block in two processes; only schedule in the serving one
+	if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+		lifecycle.TurnoverScheduler(db_paths=sites.open_db_paths, hooks=[eventlog.compact_if_due]).start()
 	app.run(debug=True, port=5000)
@@ -0,0 +1,291 @@
+"""ASGI serving mode for the receptionist API.
+
+Serves the same endpoints as app.py. Requests are handed to the Flask app on
+a thread pool, so blocking SQLite work never runs on the event loop, while
+general A* queries on /api/plan_path go to a process pool so a large search
+from one kiosk cannot hold the GIL against everyone else. The floor change
+feed (/api/floor/changes long-polls and /api/floor/stream SSE) is served on
+the event loop itself, so idle dashboards cost a parked coroutine, not one of
+the pool's threads.
+
+Run with several worker processes (needs uvicorn):
+
+    python asgi.py --workers 4 --port 8000
+
+Each worker keeps its own in-memory caches (per-site floor indexes, route
+sessions, fleets); SQLite remains the shared source of truth, and reservations stay
+race-free across workers through the compare-and-set writes.
+"""
+import argparse
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+from urllib.parse import parse_qs
+
+import app as flask_app
+from receptionist import db, eventlog, lifecycle, metrics, sites
+from receptionist.feed import get_feed
+from receptionist.navigation import plan_path
+
+THREAD_WORKERS = 32
+# served on the event loop: an idle long-poll or SSE client must not hold a pool thread
+FEED_PATHS = ('/api/floor/changes', '/api/floor/stream')
+PROCESS_WORKERS = max(2, (os.cpu_count() or 2) // 2)
+
+
+class ReceptionistASGI:
+    def __init__(self, wsgi_app=flask_app.app.wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.threads = ThreadPoolExecutor(THREAD_WORKERS, thread_name_prefix='asgi-io')
+        self._procs: Optional[ProcessPoolExecutor] = None
+        self._scheduler: Optional[lifecycle.TurnoverScheduler] = None
+
+    @property
+    def procs(self) -> ProcessPoolExecutor:
+        if self._procs is None:
+            # spawn: forking a process that already runs threads is unsafe
+            self._procs = ProcessPoolExecutor(PROCESS_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return self._procs
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            body = await self._read_body(receive)
+            if scope['path'] == '/api/plan_path' and scope['method'] == 'POST':
+                await self._plan_path(scope, body, send)
+            elif scope['path'] in FEED_PATHS and scope['method'] == 'GET':
+                await self._floor_feed(scope, receive, send)
+            else:
+                await self._call_wsgi(scope, body, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # tick() uses compare-and-set writes, so one per worker is safe
+                self._scheduler = lifecycle.TurnoverScheduler(db_paths=sites.open_db_paths,
+                                                             hooks=[eventlog.compact_if_due])
+                self._scheduler.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def close(self) -> None:
+        if self._scheduler is not None:
+            self._scheduler.stop()
+        self.threads.shutdown(wait=False)
+        if self._procs is not None:
+            self._procs.shutdown(wait=False)
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    @staticmethod
+    def _site_id(scope) -> str:
+        # same lookup as app.py: ?site=, then X-Site, then the default site
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        if query.get('site'):
+            return query['site'][0]
+        headers = dict(scope.get('headers', []))
+        return headers.get(b'x-site', b'').decode('latin-1') or sites.DEFAULT_SITE
+
+    async def _plan_path(self, scope, body: bytes, send) -> None:
+        """app.api_plan_path, with searches moved off the event loop.
+
+        Parsing, checks, event logging and the response shape are app.py's
+        own (plan_request / plan_response). While profiling is on, the
+        request goes through the Flask app instead, so its dump covers it.
+        """
+        if metrics.profile_dir is not None:
+            await self._call_wsgi(scope, body, send)
+            return
+        start_time = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        site_id = self._site_id(scope)
+        # opening a site for the first time seeds its DB, so not on the event loop
+        site = await loop.run_in_executor(self.threads, sites.get_site, site_id)
+        if site is None:
+            await self._send_json(send, 404, {'error': f'unknown site {site_id!r}'})
+            metrics.HTTP_LATENCY.observe(time.perf_counter() - start_time, 'api_plan_path', 'POST', '404')
+            return
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        try:
+            data = json.loads(body or b'{}')
+            plan = await loop.run_in_executor(self.threads, flask_app.plan_request, site, data,
+                                              query.get('floor', [None])[0])
+        except ValueError as e:  # json.JSONDecodeError is one too
+            error = 'invalid JSON body' if isinstance(e, json.JSONDecodeError) else str(e)
+            await self._send_json(send, 400, {'error': error})
+            metrics.HTTP_LATENCY.observe(time.perf_counter() - start_time, 'api_plan_path', 'POST', '400')
+            return
+        start, goal, obstacles, _, fmt, fm = plan
+        if fm is not None:
+            path = await loop.run_in_executor(self.threads, fm.path, start, goal)
+        else:
+            # planner stats for these are recorded in the pool process, not here
+            path = await loop.run_in_executor(self.procs, plan_path, start, goal, obstacles)
+        # line-of-sight checks for waypoints are CPU work too: keep them off the event loop
+        payload = await loop.run_in_executor(self.threads, flask_app.plan_response, site, plan, path)
+        await self._send_json(send, 200, payload)
+        metrics.HTTP_LATENCY.observe(time.perf_counter() - start_time, 'api_plan_path', 'POST', '200')
+
+    async def _floor_feed(self, scope, receive, send) -> None:
+        """/api/floor/changes and /api/floor/stream, as in app.py, without a thread per client."""
+        start_time = time.perf_counter()
+        endpoint = 'api_floor_changes' if scope['path'] == FEED_PATHS[0] else 'api_floor_stream'
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        headers = dict(scope.get('headers', []))
+        since = flask_app._parse_since(headers.get(b'last-event-id', b'').decode('latin-1'),
+                                       query.get('since', [None])[0])
+        loop = asyncio.get_running_loop()
+        site_id = self._site_id(scope)
+        site = await loop.run_in_executor(self.threads, sites.get_site, site_id)
+        if site is None:
+            await self._send_json(send, 404, {'error': f'unknown site {site_id!r}'})
+            metrics.HTTP_LATENCY.observe(time.perf_counter() - start_time, endpoint, 'GET', '404')
+            return
+        with db.use_db(site.db_path):
+            feed = get_feed()
+        if endpoint == 'api_floor_changes':
+            try:
+                timeout = flask_app._poll_timeout(query.get('timeout', [None])[0])
+            except ValueError:
+                await self._send_json(send, 400, {'error': 'timeout must be a number of seconds'})
+                metrics.HTTP_LATENCY.observe(time.perf_counter() - start_time, endpoint, 'GET', '400')
+                return
+            batch = await feed.await_changes(since, timeout)
+            await self._send_json(send, 200, flask_app._changes_json(*batch))
+            metrics.HTTP_LATENCY.observe(time.perf_counter() - start_time, endpoint, 'GET', '200')
+            return
+
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'text/event-stream; charset=utf-8'),
+                                *((k.lower().encode(), v.encode()) for k, v in flask_app.SSE_HEADERS.items())]})
+        metrics.HTTP_LATENCY.observe(time.perf_counter() - start_time, endpoint, 'GET', '200')
+        await send({'type': 'http.response.body', 'body': b'retry: 2000\n\n', 'more_body': True})
+        batches = feed.afollow(since)
+        disconnected = asyncio.ensure_future(self._until_disconnect(receive))
+        try:
+            while True:
+                nxt = asyncio.ensure_future(batches.__anext__())
+                await asyncio.wait({nxt, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if disconnected.done():
+                    nxt.cancel()
+                    try:
+                        await nxt
+                    except asyncio.CancelledError:
+                        pass
+                    return
+                event = flask_app._sse_event(nxt.result())
+                await send({'type': 'http.response.body', 'body': event.encode(), 'more_body': True})
+        finally:
+            disconnected.cancel()
+            await batches.aclose()
+
+    @staticmethod
+    async def _until_disconnect(receive) -> None:
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    @staticmethod
+    async def _send_json(send, status: int, payload) -> None:
+        body = json.dumps(payload).encode()
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': [(b'content-type', b'application/json'),
+                                (b'content-length', str(len(body)).encode())]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _call_wsgi(self, scope, body: bytes, send) -> None:
+        """Run the Flask app for one request on the thread pool (WSGI -> ASGI)."""
+        loop = asyncio.get_running_loop()
+        environ = self._environ(scope, body)
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+        result = await loop.run_in_executor(self.threads, self.wsgi_app, environ, start_response)
+        chunks = iter(result)
+        try:
+            await send({'type': 'http.response.start', 'status': started['status'],
+                        'headers': started['headers']})
+            # pull the body chunk by chunk on the pool so streamed responses flow
+            while True:
+                chunk = await loop.run_in_executor(self.threads, next, chunks, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(result, 'close'):
+                await loop.run_in_executor(self.threads, result.close)
+
+    @staticmethod
+    def _environ(scope, body: bytes) -> dict:
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': scope['path'],
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+            'REMOTE_ADDR': client[0],
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            key = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if key == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            elif key != 'CONTENT_LENGTH':
+                key = 'HTTP_' + key
+                environ[key] = environ[key] + ',' + value if key in environ else value
+        return environ
+
+
+app = ReceptionistASGI()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Serve the receptionist API over ASGI.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit('uvicorn is required for the ASGI server: pip install uvicorn')
+    uvicorn.run('asgi:app', host=args.host, port=args.port, workers=args.workers,
+                log_level='warning', access_log=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Throughput of /api/find_table: pooled WAL layer + floor index vs per-call SQL.
+
+Run from the repo root:
+
+    python benchmarks/bench_find_table.py [--requests 2000]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from receptionist import allocator, db  # noqa: E402
+from receptionist.floor import FloorIndex  # noqa: E402
+
+
+def _legacy_list_tables():
+    conn = sqlite3.connect(db.DB_FILE)
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute("SELECT * FROM tables").fetchall()
+    conn.close()
+    for r in rows:
+        yield dict(r)
+
+
+def _legacy_get_floor():
+    # the pre-index behaviour: re-read every row on each allocation
+    return FloorIndex(_legacy_list_tables())
+
+
+def _legacy_reserve_tables(table_ids, status='Reserved'):
+    # the pre-pool behaviour: one connection and one commit per table
+    for tid in table_ids:
+        conn = sqlite3.connect(db.DB_FILE)
+        conn.execute("UPDATE tables SET status = ? WHERE table_id = ?", (status, tid))
+        conn.commit()
+        conn.close()
+
+
+def run(client, n: int) -> float:
+    sizes = [2, 4, 8, 6]
+    start = time.perf_counter()
+    for i in range(n):
+        if i % len(sizes) == 0:
+            db.init_db(force=True)
+        client.post('/api/find_table', json={'size': sizes[i % len(sizes)]})
+    return n / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_FILE = os.path.join(tmp, 'bench.db')
+        db.init_db(force=True)
+        import app as app_module
+        client = app_module.app.test_client()
+
+        pooled = run(client, args.requests)
+
+        orig = allocator.get_floor, allocator.reserve_tables
+        allocator.get_floor = _legacy_get_floor
+        allocator.reserve_tables = _legacy_reserve_tables
+        try:
+            legacy = run(client, args.requests)
+        finally:
+            allocator.get_floor, allocator.reserve_tables = orig
+        db.close_connection()
+
+    print(f"per-call connections: {legacy:8.0f} req/s")
+    print(f"pooled + floor index: {pooled:8.0f} req/s  ({pooled / legacy:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
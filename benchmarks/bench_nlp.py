@@ -0,0 +1,74 @@
+"""Per-utterance cost of parse_party_size and the NLU pipeline over a kiosk corpus.
+
+    python benchmarks/bench_nlp.py [--repeat 2000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from receptionist.nlp import NLUPipeline, IntentClassifier, parse_party_size, parse_party_sizes  # noqa: E402
+
+CORPUS = [
+    "a table for six",
+    "table for 2 please",
+    "just me",
+    "just me and my wife",
+    "I have two friends with me",
+    "two friends and me",
+    "me, my wife and three kids",
+    "a table for two adults and three kids",
+    "we are twenty two people",
+    "there are 5 of us",
+    "a couple of friends and me",
+    "hi, can we get a table for four people by the window",
+    "my husband and I",
+    "party of eight",
+    "just the two of us",
+    "I want a table",
+    "can we sit outside",
+    "we have a booking under Silva",
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for text in CORPUS:
+            parse_party_size(text)
+    single = (time.perf_counter() - start) / (args.repeat * len(CORPUS))
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        parse_party_sizes(CORPUS)
+    batch = (time.perf_counter() - start) / (args.repeat * len(CORPUS))
+
+    nlu = NLUPipeline(IntentClassifier.from_jsonl(), cache_size=0)
+    start = time.perf_counter()
+    for _ in range(args.repeat // 10 or 1):
+        for text in CORPUS:
+            nlu.interpret(text)
+    uncached = (time.perf_counter() - start) / ((args.repeat // 10 or 1) * len(CORPUS))
+
+    nlu = NLUPipeline(IntentClassifier.from_jsonl())
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for text in CORPUS:
+            nlu.interpret(text)
+    cached = (time.perf_counter() - start) / (args.repeat * len(CORPUS))
+
+    print(f"{len(CORPUS)} utterances x {args.repeat}")
+    print(f"parse_party_size:  {single * 1e6:6.2f} us/utterance")
+    print(f"parse_party_sizes: {batch * 1e6:6.2f} us/utterance")
+    print(f"NLU, uncached:     {uncached * 1e6:6.2f} us/utterance")
+    print(f"NLU, LRU hits:     {cached * 1e6:6.2f} us/utterance")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Incremental D* Lite repair vs full A* replanning under moving obstacles.
+
+A robot walks across a cluttered grid; after every step a new obstacle
+drops onto its upcoming path (and the oldest one clears). Both
+planners must produce an equally short route each time.
+
+    python benchmarks/bench_replan.py [--size 100] [--steps 150]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from receptionist.navigation import OccupancyGrid  # noqa: E402
+from receptionist.replanner import DStarLite  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=100)
+    parser.add_argument('--steps', type=int, default=150)
+    parser.add_argument('--density', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    n = args.size
+    start, goal = (0, n // 2), (n - 1, n // 2)
+    static = {(rng.randrange(n), rng.randrange(n)) for _ in range(int(n * n * args.density))}
+    static -= {start, goal}
+
+    dstar_grid = OccupancyGrid(n, n, static)
+    full_grid = OccupancyGrid(n, n, static)
+    planner = DStarLite(dstar_grid, start, goal)
+    t_dstar = t_full = 0.0
+    pos = start
+    path = planner.path()
+    if not path:
+        sys.exit('no initial path; try another --seed')
+    dynamic = []
+    replans = 0
+    for _ in range(args.steps):
+        if len(path) < 3:
+            break
+        pos = path[1]
+        cell = path[min(6, len(path) - 1)]
+        blocked, cleared = [], []
+        if cell != goal:
+            blocked.append(cell)
+            dynamic.append(cell)
+        if len(dynamic) > 4:
+            # guests move on: keep only a handful of live obstacles
+            cleared.append(dynamic.pop(0))
+
+        t0 = time.perf_counter()
+        planner.move_to(pos)
+        planner.set_cells(blocked, cleared)
+        path = planner.path()
+        t_dstar += time.perf_counter() - t0
+
+        for c in blocked:
+            full_grid.set_blocked(c, True)
+        for c in cleared:
+            full_grid.set_blocked(c, False)
+        t0 = time.perf_counter()
+        full = full_grid.astar(full_grid.index(pos), full_grid.index(goal))
+        t_full += time.perf_counter() - t0
+
+        assert len(full) == len(path), 'planners disagree on path length'
+        replans += 1
+
+    print(f"{replans} replans on a {n}x{n} grid")
+    print(f"full A* replan: {t_full / replans * 1000:8.3f} ms/replan")
+    print(f"D* Lite repair: {t_dstar / replans * 1000:8.3f} ms/replan  ({t_full / t_dstar:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""Throughput and tail latency: threaded Flask dev server vs the ASGI server.
+
+Starts each server as a subprocess on a scratch DB, then drives it with
+concurrent clients (one connection per request: the Flask dev server
+speaks HTTP/1.0). Most clients hit fast endpoints; a few send
+large off-map path queries, the slow kiosk requests that should not stall
+everyone else.
+
+    python benchmarks/bench_server.py [--clients 32] [--slow-clients 4] [--seconds 5] [--workers 4]
+
+The ASGI run needs uvicorn installed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FAST = [
+    ('GET', '/api/version', None),
+    ('GET', '/api/get_tables', None),
+    ('POST', '/api/parse_party', {'text': 'a table for four please'}),
+    ('POST', '/api/find_table', {'size': 2}),
+]
+# a walled-in goal on a big open grid: A* explores every cell before giving up
+SLOW = ('POST', '/api/plan_path', {
+    'start': [0, 0], 'goal': [248, 248],
+    'obstacles': [[248 + dx, 248 + dy] for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy],
+})
+
+WSGI_SERVER = """
+import sys
+sys.path.insert(0, {root!r})
+import app
+app.app.run(host='127.0.0.1', port={port}, threaded=True)
+"""
+
+ASGI_SERVER = """
+import sys
+sys.path.insert(0, {root!r})
+import uvicorn
+uvicorn.run('asgi:app', host='127.0.0.1', port={port}, workers={workers},
+            log_level='warning', access_log=False)
+"""
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port: int, timeout: float = 20.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('server on port %d did not start' % port)
+
+
+async def request(port, method, path, payload):
+    body = json.dumps(payload).encode() if payload is not None else b''
+    head = ('%s %s HTTP/1.1\r\nHost: 127.0.0.1\r\nContent-Type: application/json\r\n'
+            'Content-Length: %d\r\nConnection: close\r\n\r\n' % (method, path, len(body))).encode()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        writer.write(head + body)
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    return int(response.split(None, 2)[1]) if response else 599
+
+
+async def client(port, plan, deadline, latencies, errors):
+    i = 0
+    while time.monotonic() < deadline:
+        method, path, payload = plan[i % len(plan)]
+        i += 1
+        start = time.perf_counter()
+        if await request(port, method, path, payload) >= 500:
+            errors.append(path)
+        latencies.append(time.perf_counter() - start)
+
+
+async def load(port, clients, slow_clients, seconds):
+    fast, slow, errors = [], [], []
+    deadline = time.monotonic() + seconds
+    tasks = [client(port, FAST, deadline, fast, errors) for _ in range(clients)]
+    tasks += [client(port, [SLOW], deadline, slow, errors) for _ in range(slow_clients)]
+    await asyncio.gather(*tasks)
+    return fast, slow, errors
+
+
+def pct(values, q):
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)] * 1000 if values else float('nan')
+
+
+def run(name, script, args, scratch):
+    port = free_port()
+    env = dict(os.environ, RECEPTIONIST_DB=os.path.join(scratch, name + '.db'))
+    code = script.format(root=ROOT, port=port, workers=args.workers)
+    proc = subprocess.Popen([sys.executable, '-c', code], cwd=scratch, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port)
+        fast, slow, errors = asyncio.run(load(port, args.clients, args.slow_clients, args.seconds))
+    finally:
+        proc.terminate()
+        proc.wait()
+    print('%-6s %8.0f req/s   fast p50 %7.1f ms  p99 %7.1f ms   slow p50 %7.1f ms   errors %d'
+          % (name, (len(fast) + len(slow)) / args.seconds, pct(fast, 0.5), pct(fast, 0.99),
+             pct(slow, 0.5), len(errors)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--slow-clients', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+    scratch = tempfile.mkdtemp(prefix='bench-server-')
+    run('flask', WSGI_SERVER, args, scratch)
+    try:
+        import uvicorn  # noqa: F401
+    except ImportError:
+        print('asgi   skipped (pip install uvicorn)')
+        return
+    run('asgi', ASGI_SERVER, args, scratch)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Time-to-first-partial and time-to-first-audio: streaming vs whole-buffer speech.
+
+Uses LocalEngine with simulated per-byte decode and per-character synthesis
+cost, and audio arriving in 20 ms chunks as it would from a microphone.
+
+    python benchmarks/bench_speech.py [--stt-delay 0.0005] [--tts-delay 0.002]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from receptionist.speech import LocalEngine, stream_speech_to_text, stream_text_to_speech  # noqa: E402
+
+UTTERANCE = 'hi, could we get a table for four people by the window please'
+REPLY = 'Good evening. Got it, a table for 4. Please follow me to table two by the window.'
+CHUNK_BYTES = 8
+CHUNK_SECONDS = 0.02
+
+
+def mic(data: bytes):
+    for i in range(0, len(data), CHUNK_BYTES):
+        time.sleep(CHUNK_SECONDS)
+        yield data[i:i + CHUNK_BYTES]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stt-delay', type=float, default=0.0005)
+    parser.add_argument('--tts-delay', type=float, default=0.002)
+    args = parser.parse_args()
+    engine = LocalEngine(stt_delay=args.stt_delay, tts_delay=args.tts_delay)
+    audio = UTTERANCE.encode('utf-8')
+
+    # whole buffer: wait for the full utterance, then decode it in one go
+    start = time.perf_counter()
+    blob = b''.join(mic(audio))
+    decoder = engine.stt_decoder()
+    decoder.feed(blob)
+    whole_stt = time.perf_counter() - start
+
+    start = time.perf_counter()
+    first_partial = None
+    for _ in stream_speech_to_text(mic(audio), engine):
+        if first_partial is None:
+            first_partial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine.synthesize(REPLY)
+    whole_tts = time.perf_counter() - start
+
+    start = time.perf_counter()
+    first_audio = None
+    for _ in stream_text_to_speech(REPLY, engine):
+        if first_audio is None:
+            first_audio = time.perf_counter() - start
+
+    print(f"STT first text:  whole-buffer {whole_stt * 1000:7.1f} ms   streaming {first_partial * 1000:7.1f} ms")
+    print(f"TTS first audio: whole-buffer {whole_tts * 1000:7.1f} ms   streaming {first_audio * 1000:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Cold start: import-time breakdown and time to first response, against a budget.
+
+Every sample is a fresh interpreter on a scratch DB and TTS cache, like a
+kiosk restarting or an on-demand worker spinning up, and is timed from just
+before the process is spawned: interpreter start-up, imports, DB creation
+and seeding on the first request, and that request itself.
+
+    python benchmarks/bench_startup.py [--runs 5] [--budget-ms 1000] [--top 12]
+
+Exits 1 if the median time to first response is over the budget.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from statistics import median
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_RESPONSE = """
+import sys, time, json
+t0 = float(sys.argv[1])
+sys.path.insert(0, {root!r})
+from receptionist import speech
+speech.TTS_CACHE_DIR = {tts!r}
+import receptionist
+package = time.time()
+import app
+imported = time.time()
+resp = app.app.test_client().get('/api/get_tables')
+assert resp.status_code == 200, resp.status_code
+print(json.dumps({{'package': package - t0, 'import': imported - t0, 'first_response': time.time() - t0}}))
+"""
+
+# "import time: <self us> | <cumulative us> | <indent><module>"
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+
+def _env(scratch: str) -> Dict[str, str]:
+    return {**os.environ, 'RECEPTIONIST_DB': os.path.join(scratch, 'receptionist.db'),
+            'RECEPTIONIST_METRICS': os.environ.get('RECEPTIONIST_METRICS', '1')}
+
+
+def first_response() -> Dict[str, float]:
+    """One cold start; seconds from spawn to each milestone."""
+    scratch = tempfile.mkdtemp(prefix='bench-startup-')
+    try:
+        code = FIRST_RESPONSE.format(root=ROOT, tts=os.path.join(scratch, 'tts_cache'))
+        t0 = time.time()
+        out = subprocess.run([sys.executable, '-c', code, repr(t0)], env=_env(scratch), cwd=scratch,
+                             check=True, capture_output=True, text=True).stdout
+        return json.loads(out.splitlines()[-1])
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def import_breakdown() -> Tuple[List[Tuple[str, float]], float]:
+    """(top-level package -> self import ms, largest first), total ms for `import app`."""
+    scratch = tempfile.mkdtemp(prefix='bench-startup-')
+    try:
+        err = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                              f'import sys; sys.path.insert(0, {ROOT!r}); import app'],
+                             env=_env(scratch), cwd=scratch, check=True, capture_output=True, text=True).stderr
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    by_package: Dict[str, float] = {}
+    total = 0.0
+    for line in err.splitlines():
+        m = _IMPORTTIME_RE.match(line)
+        if not m:
+            continue
+        self_us, cumulative_us, indent, name = int(m[1]), int(m[2]), m[3], m[4]
+        top = name.split('.')[0]
+        by_package[top] = by_package.get(top, 0.0) + self_us / 1000
+        if name == 'app' and not indent:
+            total = cumulative_us / 1000
+    return sorted(by_package.items(), key=lambda kv: -kv[1]), total
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=1000.0,
+                        help='median time to first response allowed (default 1000)')
+    parser.add_argument('--top', type=int, default=12, help='packages to list in the breakdown')
+    args = parser.parse_args()
+
+    packages, total = import_breakdown()
+    print(f'import app: {total:7.1f} ms (self time by top-level package)')
+    for name, ms in packages[:args.top]:
+        print(f'  {name:<24}{ms:7.1f} ms  {ms / total:6.1%}' if total else f'  {name:<24}{ms:7.1f} ms')
+
+    samples = [first_response() for _ in range(args.runs)]
+    print(f'\ncold start, median of {args.runs} fresh processes:')
+    for key, label in (('package', 'import receptionist'), ('import', 'import app'),
+                       ('first_response', 'first response')):
+        print(f'  {label:<24}{median(s[key] for s in samples) * 1000:7.1f} ms')
+
+    first = median(s['first_response'] for s in samples) * 1000
+    if first > args.budget_ms:
+        print(f'\nFAIL: first response {first:.1f} ms is over the {args.budget_ms:.0f} ms budget')
+        return 1
+    print(f'\nOK: within the {args.budget_ms:.0f} ms budget')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Seeded synthetic workloads for the benchmark suite.
+
+Everything is derived from a random.Random(seed), so the same seed always
+yields the same floor, grid and corpus.
+"""
+import random
+from typing import List, Sequence, Tuple
+
+from receptionist import db, floor
+from receptionist.navigation import FloorMap
+
+GridPos = Tuple[int, int]
+
+NUMBER_WORDS = ['one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten', 'twelve']
+PEOPLE = ['friends', 'kids', 'colleagues', 'adults', 'guests', 'people']
+TEMPLATES = [
+    'a table for {n} please',
+    'table for {n}',
+    'we are {n}',
+    'just me and my {rel}',
+    'me, my {rel} and {n} {people}',
+    'i have {n} {people} with me',
+    'there will be {d} of us tonight',
+    'can we get a table for {d} by the window',
+    'hi there, could we sit outside, {n} {people} and me',
+    'booking under {name} for {n}',
+    'how long is the wait',
+    'good evening',
+]
+RELATIONS = ['wife', 'husband', 'partner', 'friend', 'mom', 'dad']
+NAMES = ['silva', 'perera', 'fernando', 'smith', 'khan', 'garcia']
+
+
+def utterances(count: int, seed: int = 0) -> List[str]:
+    """Kiosk-style phrases mixing number words, digits, relations and noise."""
+    rng = random.Random(seed)
+    return [rng.choice(TEMPLATES).format(n=rng.choice(NUMBER_WORDS), d=rng.randint(1, 30),
+                                         rel=rng.choice(RELATIONS), people=rng.choice(PEOPLE),
+                                         name=rng.choice(NAMES))
+            for _ in range(count)]
+
+
+def floor_rows(tables: int, seed: int = 0, sync_share: float = 0.2) -> List[tuple]:
+    """(table_id, capacity, status, is_combinable, sync_id) rows for a large floor.
+
+    About sync_share of the tables sit in sync groups of 2-3 (not
+    combinable, seated together); the rest are combinable 2-8 tops.
+    """
+    rng = random.Random(seed)
+    rows = []
+    group = 0
+    while len(rows) < tables:
+        if rng.random() < sync_share:
+            group += 1
+            cap = rng.choice([4, 6])
+            for k in range(min(rng.randint(2, 3), tables - len(rows))):
+                rows.append((f'S{group}_{k}', cap, 'Available', 0, f'S{group}'))
+        else:
+            rows.append((f'T{len(rows)}', rng.choice([2, 2, 4, 4, 4, 6, 8]), 'Available', 1, None))
+    return rows
+
+
+def seed_floor(rows: Sequence[tuple]) -> None:
+    """Replace the current DB's tables with rows and drop the cached index."""
+    db.init_db(force=True)
+    with db.transaction() as conn:
+        conn.execute('DELETE FROM tables')
+        conn.executemany('INSERT INTO tables(table_id, capacity, status, is_combinable, sync_id) '
+                         'VALUES (?, ?, ?, ?, ?)', rows)
+    floor.invalidate()
+
+
+def obstacle_grid(size: int, density: float, seed: int = 0,
+                  keep_clear: Sequence[GridPos] = ()) -> List[GridPos]:
+    """Random obstacle cells on a size x size grid, never on keep_clear."""
+    rng = random.Random(seed)
+    clear = set(keep_clear)
+    return [(x, y) for x in range(size) for y in range(size)
+            if rng.random() < density and (x, y) not in clear]
+
+
+def reachable_pairs(size: int, obstacles: Sequence[GridPos], count: int,
+                    seed: int = 0) -> List[Tuple[GridPos, GridPos]]:
+    """count (start, goal) pairs in the same open region, far apart."""
+    rng = random.Random(seed)
+    fm = FloorMap(size, size, obstacles, max_fields=1)
+    blocked = set(obstacles)
+    free = [(x, y) for x in range(size) for y in range(size) if (x, y) not in blocked]
+    pairs: List[Tuple[GridPos, GridPos]] = []
+    while len(pairs) < count:
+        start = rng.choice(free)
+        field = fm.distance_field(start)
+        goal = rng.choice(free)
+        if field[fm.grid.index(goal)] >= size:
+            pairs.append((start, goal))
+    return pairs
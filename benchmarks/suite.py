@@ -0,0 +1,268 @@
+"""Reproducible benchmark suite with JSON baselines and regression checks.
+
+Runs every case on seeded synthetic workloads against a scratch DB and
+records the per-operation time of each round. Each case runs in several
+fresh processes, because memory layout alone can shift a microbenchmark
+by 2x from one process to the next; comparisons use the fastest round,
+the least noisy estimate of what the code costs.
+
+    python benchmarks/suite.py run [--out results.json] [--only nav.]
+    python benchmarks/suite.py compare BASELINE.json RESULTS.json [--threshold 0.2]
+    python benchmarks/suite.py check [--baseline benchmarks/baseline.json]
+
+`check` runs the suite and compares it against the baseline, exiting 1 on
+any case slower than the threshold: run it before deploying. Record the
+baseline on the deploy machine with `run --out benchmarks/baseline.json`;
+timings are only comparable on the same hardware.
+"""
+import argparse
+import atexit
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from statistics import median
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# scratch locations before anything opens the DB or the TTS cache
+_SCRATCH = tempfile.mkdtemp(prefix='bench-suite-')
+atexit.register(shutil.rmtree, _SCRATCH, ignore_errors=True)
+os.environ['RECEPTIONIST_DB'] = os.path.join(_SCRATCH, 'receptionist.db')
+
+from receptionist import db, speech  # noqa: E402
+speech.TTS_CACHE_DIR = os.path.join(_SCRATCH, 'tts_cache')
+
+from receptionist.allocator import find_table_for_party  # noqa: E402
+from receptionist.navigation import avoid_obstacle, plan_path  # noqa: E402
+from receptionist.nlp import parse_party_size  # noqa: E402
+
+import generators as gen  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+ROUNDS = 7
+PROCESSES = 3
+WARMUP_SECONDS = 0.5  # long enough for CPU clocks and caches to settle
+
+# name -> setup() returning (ops per round, run_round())
+CASES: Dict[str, Callable[[], tuple]] = {}
+
+
+def case(name: str):
+    def register(fn):
+        CASES[name] = fn
+        return fn
+    return register
+
+
+@case('nlp.parse_party_size')
+def _parse():
+    corpus = gen.utterances(2000, seed=1)
+
+    def run():
+        for text in corpus:
+            parse_party_size(text)
+    return len(corpus), run
+
+
+def _allocation(tables: int, sizes: List[int]):
+    gen.seed_floor(gen.floor_rows(tables, seed=2))
+
+    def run():
+        for size in sizes:
+            ids = find_table_for_party(size)
+            if ids:
+                db.update_table_statuses(ids, 'Available')
+    return len(sizes), run
+
+
+@case('alloc.find_table_single')
+def _alloc_single():
+    # 400 tables, parties that a single table (or sync group) seats
+    rng = random.Random(3)
+    return _allocation(400, [rng.choice([2, 3, 4, 5, 6, 8]) for _ in range(300)])
+
+
+@case('alloc.find_table_combination')
+def _alloc_combination():
+    # parties larger than any table: the knapsack solver runs every time
+    rng = random.Random(4)
+    return _allocation(400, [rng.randint(14, 40) for _ in range(100)])
+
+
+@case('nav.plan_path')
+def _plan():
+    size = 100
+    obstacles = gen.obstacle_grid(size, 0.2, seed=5)
+    pairs = gen.reachable_pairs(size, obstacles, 40, seed=6)
+
+    def run():
+        for start, goal in pairs:
+            plan_path(start, goal, obstacles)
+    return len(pairs), run
+
+
+@case('nav.avoid_obstacle')
+def _avoid():
+    size = 100
+    obstacles = gen.obstacle_grid(size, 0.2, seed=5)
+    paths = [plan_path(s, g, obstacles) for s, g in gen.reachable_pairs(size, obstacles, 40, seed=6)]
+    blockers = [p[len(p) // 2] for p in paths]
+
+    def run():
+        for _ in range(25):
+            for path, blocker in zip(paths, blockers):
+                avoid_obstacle(path, blocker)
+    return 25 * len(paths), run
+
+
+def _http(requests):
+    import app as app_module
+    db.init_db(force=True)
+    client = app_module.app.test_client()
+
+    def run():
+        for method, url, payload in requests:
+            client.open(url, method=method, json=payload)
+    return len(requests), run
+
+
+@case('http.get_tables')
+def _http_tables():
+    return _http([('GET', '/api/get_tables', None)] * 300)
+
+
+@case('http.parse_party')
+def _http_parse():
+    return _http([('POST', '/api/parse_party', {'text': t}) for t in gen.utterances(300, seed=7)])
+
+
+@case('http.find_and_reset')
+def _http_find():
+    return _http([('POST', '/api/find_table', {'size': 2}), ('POST', '/api/reset_sim', None)] * 100)
+
+
+def run_case(name: str, rounds: int = ROUNDS) -> dict:
+    ops, run = CASES[name]()
+    warm_until = time.perf_counter() + WARMUP_SECONDS
+    run()  # lazy imports, caches
+    while time.perf_counter() < warm_until:
+        run()
+    times = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            run()
+            times.append((time.perf_counter() - start) / ops)
+    finally:
+        gc.enable()
+    return {'ops': ops, 'rounds': rounds,
+            'median_us': round(median(times) * 1e6, 3), 'min_us': round(min(times) * 1e6, 3)}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _run_isolated(name: str, rounds: int, processes: int) -> dict:
+    runs = []
+    for _ in range(processes):
+        out = subprocess.run([sys.executable, os.path.abspath(__file__), '_case', name, str(rounds)],
+                             capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(out.splitlines()[-1]))
+    best = min(runs, key=lambda r: r['min_us'])
+    return dict(best, processes=processes, median_us=round(median(r['median_us'] for r in runs), 3))
+
+
+def run_suite(only: str = '', rounds: int = ROUNDS, processes: int = PROCESSES) -> dict:
+    results = {}
+    for name in CASES:
+        if name.startswith(only):
+            results[name] = _run_isolated(name, rounds, processes)
+            print(f"{name:32s} {results[name]['min_us']:12.2f} us/op", flush=True)
+    from receptionist import metrics
+    return {
+        'meta': {'python': platform.python_version(), 'machine': platform.machine(),
+                 'platform': platform.platform(), 'commit': _git_commit(),
+                 'metrics': metrics.enabled, 'at': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'results': results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> List[str]:
+    """Print a comparison table; returns the names of regressed cases."""
+    regressed = []
+    print(f"{'case':32s} {'baseline':>12s} {'current':>12s} {'change':>8s}")
+    for name, cur in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print(f"{name:32s} {'-':>12s} {cur['min_us']:12.2f}      new")
+            continue
+        change = cur['min_us'] / base['min_us'] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressed.append(name)
+        print(f"{name:32s} {base['min_us']:12.2f} {cur['min_us']:12.2f} {change:+8.1%}{flag}")
+    return regressed
+
+
+def main() -> None:
+    if sys.argv[1:2] == ['_case']:
+        # worker: one case in a fresh process, result as a JSON line
+        print(json.dumps(run_case(sys.argv[2], int(sys.argv[3]))))
+        return
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_run = sub.add_parser('run', help='run the suite and write results as JSON')
+    p_run.add_argument('--out')
+    p_run.add_argument('--only', default='', help='run cases whose name starts with this')
+    p_run.add_argument('--rounds', type=int, default=ROUNDS)
+    p_run.add_argument('--processes', type=int, default=PROCESSES)
+    p_cmp = sub.add_parser('compare', help='compare two result files')
+    p_cmp.add_argument('baseline')
+    p_cmp.add_argument('current')
+    p_cmp.add_argument('--threshold', type=float, default=0.2)
+    p_chk = sub.add_parser('check', help='run the suite and compare against a baseline')
+    p_chk.add_argument('--baseline', default=DEFAULT_BASELINE)
+    p_chk.add_argument('--threshold', type=float, default=0.2)
+    p_chk.add_argument('--rounds', type=int, default=ROUNDS)
+    p_chk.add_argument('--processes', type=int, default=PROCESSES)
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        with open(args.baseline) as fh, open(args.current) as fc:
+            regressed = compare(json.load(fh), json.load(fc), args.threshold)
+    else:
+        if args.command == 'check' and not os.path.exists(args.baseline):
+            sys.exit(f'no baseline at {args.baseline}; record one with: run --out {args.baseline}')
+        results = run_suite(getattr(args, 'only', ''), args.rounds, args.processes)
+        if args.command == 'run':
+            if args.out:
+                with open(args.out, 'w') as fh:
+                    json.dump(results, fh, indent=2)
+                print(f'wrote {args.out}')
+            return
+        with open(args.baseline) as fh:
+            print()
+            regressed = compare(json.load(fh), results, args.threshold)
+    if regressed:
+        sys.exit(f"{len(regressed)} case(s) slower than the baseline by more than {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,44 @@
-"""Receptionist robot core package."""
-
-from .greeting import get_greeting
-from .nlp import parse_party_size
-from .db import init_db, get_db_path
-from .allocator import find_table_for_party
-from .navigation import plan_path, avoid_obstacle
-
-__all__ = [
-    "get_greeting",
-    "parse_party_size",
-    "init_db",
-    "get_db_path",
-    "find_table_for_party",
-    "plan_path",
-    "avoid_obstacle",
-]
+"""Receptionist robot core package.
+
+The names below are loaded lazily: ``import receptionist`` is cheap, and a
+submodule (with its own dependencies -- SQLite, the floor index, ...) is only
+imported the first time one of its names is used.
+"""
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+# public name -> submodule that defines it
+_EXPORTS = {
+    "get_greeting": "greeting",
+    "parse_party_size": "nlp",
+    "parse_party_sizes": "nlp",
+    "init_db": "db",
+    "get_db_path": "db",
+    "find_table_for_party": "allocator",
+    "allocate_batch": "allocator",
+    "plan_path": "navigation",
+    "avoid_obstacle": "navigation",
+    "FloorMap": "navigation",
+}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:
+    from .allocator import allocate_batch, find_table_for_party
+    from .db import get_db_path, init_db
+    from .greeting import get_greeting
+    from .navigation import FloorMap, avoid_obstacle, plan_path
+    from .nlp import parse_party_size, parse_party_sizes
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -1,54 +1,203 @@
-from typing import List, Optional, Tuple
-from .db import list_tables, update_table_status
+import random
+import sqlite3
+import time
+from typing import List, Optional, Sequence, Tuple
+from . import eventlog, metrics
+from .db import reserve_tables, ReservationConflict
+from .floor import FloorIndex, get_floor
 
-def find_table_for_party(group_size: int) -> Optional[List[str]]:
-    """Find and reserve tables for a party of group_size.
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 0.002  # seconds; doubled per attempt, with jitter
+SOLVER_BUDGET = 0.02  # seconds allowed for the combination search
+INDEX_MAX_AGE = 1.0  # seconds before a "no table" answer is rechecked against SQLite
+
+def choose_tables(tables: List[dict], group_size: int) -> Optional[List[str]]:
+    """Pick table_ids for a party from a snapshot of table rows (no side effects)."""
+    return choose_from_index(FloorIndex(tables), group_size)
+
+def choose_from_index(floor: FloorIndex, group_size: int, record: bool = True,
+                      stats: Optional[dict] = None) -> Optional[List[str]]:
+    """Pick table_ids for a party from the in-memory floor index.
+
+    record=False leaves the allocation metrics alone (e.g. for what-if probes
+    or planning passes); pass a stats dict to get the 'stage' and 'scanned'
+    count that would have been recorded, to count them later.
 
     Strategy:
       1. Look for single table with capacity >= group_size and Available.
-      2. Look for combinations of combinable tables whose sum >= group_size.
+      2. Otherwise pick the combination of combinable tables (and whole sync
+         groups) with the fewest wasted seats, then the fewest tables.
       3. Respect sync_id: if a table has sync_id, all with same id must be free to use.
-
-    Returns list of table_ids reserved or None if not found.
+      4. Never split a party across floor levels: combinations are solved
+         per level and the best level's answer wins.
     """
-    tables = list(list_tables())
-    available = [t for t in tables if t['status'] == 'Available']
-
-    # 1) Perfect fit: prefer smallest capacity that fits
-    fits = sorted([t for t in available if t['capacity'] >= group_size], key=lambda x: x['capacity'])
-    for t in fits:
-        # if synced, ensure all sync group are available
-        if t['sync_id']:
-            sync_id = t['sync_id']
-            sync_group = [s for s in available if s['sync_id'] == sync_id]
-            # require all with that sync_id to be present
-            # (for simplicity) - if not, skip
-            if not sync_group or any(s['status'] != 'Available' for s in sync_group):
-                continue
-            ids = [s['table_id'] for s in sync_group]
-            for tid in ids:
-                update_table_status(tid, 'Reserved')
-            return ids
-        # otherwise reserve single table
-        update_table_status(t['table_id'], 'Reserved')
-        return [t['table_id']]
-
-    # 2) combinable: try combinations of combinable tables (greedy)
-    combinable = [t for t in available if t['is_combinable']]
-    # sort descending to use bigger tables first to reduce number of tables
-    combinable = sorted(combinable, key=lambda x: x['capacity'], reverse=True)
+    scanned = 0
+    with floor.lock:
+        # 1) Perfect fit: prefer smallest capacity that fits
+        for t in floor.fit_candidates(group_size):
+            scanned += 1
+            # if synced, the whole sync group must be free and is taken together
+            if t['sync_id']:
+                if not floor.sync_group_free(t['sync_id']):
+                    continue
+                _choice(record, stats, 'single', scanned)
+                return list(floor.sync_members[t['sync_id']])
+            _choice(record, stats, 'single', scanned)
+            return [t['table_id']]
+
+        # 2) combinable: fewest wasted seats, then fewest tables
+        units = floor.combination_units()
+        levels = {}
+        for unit in units:
+            levels.setdefault(floor.level(unit[1][0]), []).append(unit)
+        caps = {tid: floor.tables[tid]['capacity'] for _, ids in units for tid in ids}
+    ids = None
+    for level_units in levels.values():
+        found = best_combination(level_units, group_size)
+        if found and (ids is None or (sum(map(caps.get, found)), len(found)) < (sum(map(caps.get, ids)), len(ids))):
+            ids = found
+    _choice(record, stats, 'combination' if ids else 'none', scanned + len(units))
+    return ids
+
+def _choice(record: bool, stats: Optional[dict], stage: str, scanned: int) -> None:
+    if record:
+        _count_choice(stage, scanned)
+    if stats is not None:
+        stats['stage'], stats['scanned'] = stage, scanned
+
+def _count_choice(stage: str, scanned: int) -> None:
+    metrics.ALLOCATIONS.inc(stage)
+    metrics.TABLES_SCANNED.inc(amount=scanned)
+
+def _greedy_combination(units, group_size: int) -> Optional[List[str]]:
+    # largest-first; only used when the exact solver runs out of time
     selected = []
     cap_sum = 0
-    for t in combinable:
-        # skip sync groups in combinable stage for simplicity
-        if t['sync_id']:
-            continue
-        selected.append(t)
-        cap_sum += t['capacity']
+    for cap, ids in sorted(units, key=lambda u: u[0], reverse=True):
+        selected.extend(ids)
+        cap_sum += cap
         if cap_sum >= group_size:
-            ids = [s['table_id'] for s in selected]
-            for tid in ids:
-                update_table_status(tid, 'Reserved')
-            return ids
+            return selected
+    return None
+
+def best_combination(units: List[Tuple[int, List[str]]], group_size: int,
+                     budget: float = SOLVER_BUDGET) -> Optional[List[str]]:
+    """Choose (capacity, table_ids) units minimising wasted seats, then table count.
 
+    0/1 knapsack DP over seat totals. Any optimal set seats at most
+    group_size + max_unit - 1 (otherwise a unit could be dropped), which
+    bounds the DP width. If the DP exceeds ``budget`` seconds it falls back
+    to the largest-first greedy pick so latency stays bounded.
+    """
+    if not units or sum(u[0] for u in units) < group_size:
+        return None
+    deadline = time.perf_counter() + budget
+    limit = group_size + max(u[0] for u in units) - 1
+    inf = sum(len(u[1]) for u in units) + 1
+    count = [0] + [inf] * limit  # fewest tables reaching each seat total
+    taken = []
+    for cap, ids in units:
+        if time.perf_counter() > deadline:
+            return _greedy_combination(units, group_size)
+        row = bytearray(limit + 1)
+        n = len(ids)
+        for s in range(limit - cap, -1, -1):
+            c = count[s] + n
+            if c < count[s + cap]:
+                count[s + cap] = c
+                row[s + cap] = 1
+        taken.append(row)
+    best = next((s for s in range(group_size, limit + 1) if count[s] < inf), None)
+    if best is None:
+        return None
+    selected = []
+    for i in range(len(units) - 1, -1, -1):
+        if taken[i][best]:
+            cap, ids = units[i]
+            selected = ids + selected
+            best -= cap
+    return selected
+
+def find_table_for_party(group_size: int) -> Optional[List[str]]:
+    """Find and reserve tables for a party of group_size.
+
+    The choice is made on the in-memory floor index and then claimed with a
+    compare-and-set reservation in SQLite; if another request or worker won
+    any of those tables in between, the index re-reads just those rows and
+    we back off and retry, so concurrent callers never double-book.
+
+    Returns list of table_ids reserved or None if not found.
+    """
+    floor = get_floor()
+    for attempt in range(MAX_ATTEMPTS):
+        ids = choose_from_index(floor, group_size)
+        if ids is None:
+            if time.monotonic() - floor.loaded_at < INDEX_MAX_AGE:
+                break
+            # another worker process may have freed tables we never heard about
+            floor.reload()
+            ids = choose_from_index(floor, group_size)
+            if ids is None:
+                break
+        try:
+            reserve_tables(ids)
+            eventlog.record('allocation', group_size, ids)
+            return ids
+        except ReservationConflict:
+            # lost the race for one of the tables; resync those rows
+            metrics.ALLOCATION_CONFLICTS.inc()
+            floor.refresh(ids)
+        except sqlite3.OperationalError as e:
+            # write lock still held by another worker after the busy timeout
+            if 'locked' not in str(e):
+                raise
+        time.sleep(BACKOFF_BASE * (2 ** attempt) * random.random())
+    eventlog.record('no_table', group_size)
     return None
+
+def allocate_batch(sizes: Sequence[int],
+                   priorities: Optional[Sequence[int]] = None) -> List[Optional[List[str]]]:
+    """Place several parties at once and reserve all their tables together.
+
+    Parties are placed on a private copy of the floor index, highest priority
+    first and, within a priority, largest party first (first-fit decreasing
+    packs far better than seating parties in arrival order). The whole plan
+    is then claimed in one compare-and-set transaction; if another request
+    took any of its tables meanwhile, the batch is re-planned.
+
+    Returns the reserved table_ids for each party, in input order (None for
+    parties that could not be seated).
+    """
+    if priorities is None:
+        priorities = [0] * len(sizes)
+    order = sorted(range(len(sizes)), key=lambda i: (-priorities[i], -sizes[i], i))
+    floor = get_floor()
+    for attempt in range(MAX_ATTEMPTS):
+        with floor.lock:
+            plan = FloorIndex(floor.tables.values())
+        result: List[Optional[List[str]]] = [None] * len(sizes)
+        choices = []  # counted once the plan is committed, not per pass
+        for i in order:
+            stats: dict = {}
+            ids = choose_from_index(plan, sizes[i], record=False, stats=stats)
+            choices.append(stats)
+            if ids is not None:
+                plan.apply(ids, 'Reserved')
+                result[i] = ids
+        claimed = [tid for ids in result if ids for tid in ids]
+        try:
+            if claimed:
+                reserve_tables(claimed)
+            for size, ids in zip(sizes, result):
+                eventlog.record('allocation' if ids else 'no_table', size, ids, batch=True)
+            for stats in choices:
+                _count_choice(stats['stage'], stats['scanned'])
+            return result
+        except ReservationConflict:
+            metrics.ALLOCATION_CONFLICTS.inc()
+            floor.refresh(claimed)
+        except sqlite3.OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+        time.sleep(BACKOFF_BASE * (2 ** attempt) * random.random())
+    return [None] * len(sizes)
@@ -1,19 +1,201 @@
+import contextvars
+import json
 import os
+import re
 import sqlite3
-from typing import Iterable
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
-DB_FILE = os.path.join(os.path.dirname(__file__), "receptionist.db")
+from . import metrics
+
+# RECEPTIONIST_DB lets every worker process of a server share one chosen file
+DB_FILE = os.environ.get("RECEPTIONIST_DB") or os.path.join(os.path.dirname(__file__), "receptionist.db")
+
+# One reusable connection per (thread, db file). sqlite3 connections are not
+# safe to share across threads, but reusing them within a thread avoids the
+# connect + schema-load cost on every call and keeps the statement cache warm.
+_local = threading.local()
+_STATEMENT_CACHE_SIZE = 128
+
+# Called as fn(table_ids, status) after a status write commits, and as
+# fn(None, None) when the table set is re-seeded.
+StatusListener = Callable[[Optional[Sequence[str]], Optional[str]], None]
+_listeners: List[StatusListener] = []
+
+# The DB file calls in this context use: each site keeps its own file, and a
+# request (or scheduler pass) selects one with use_db(). Unset means DB_FILE.
+_active_db: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("active_db", default=None)
+# wall clock for every timestamp written (status_since, events, waitlist); a
+# simulation swaps in its simulated clock with use_clock()
+_clock: contextvars.ContextVar[Callable[[], float]] = contextvars.ContextVar("clock", default=time.time)
+
+# The single-room floor every DB starts with unless given another layout.
+DEFAULT_LAYOUT: Dict[str, Any] = {
+    "floors": [
+        {"floor": 0, "name": "Main room", "width": 15, "height": 12, "home": [1, 1],
+         "robots": {"R1": [1, 1], "R2": [1, 3], "R3": [1, 5]}},
+    ],
+    "tables": [
+        {"table_id": "T1", "capacity": 4, "combinable": True, "x": 3, "y": 3},
+        {"table_id": "T2", "capacity": 4, "combinable": True, "x": 5, "y": 3},
+        {"table_id": "T3_A", "capacity": 6, "combinable": False, "sync_id": "S1", "x": 9, "y": 4},
+        {"table_id": "T3_B", "capacity": 6, "combinable": False, "sync_id": "S1", "x": 9, "y": 6},
+        {"table_id": "T4", "capacity": 2, "combinable": True, "x": 4, "y": 6},
+    ],
+}
+
+def current_db() -> str:
+    """Path of the DB file selected for this context."""
+    return _active_db.get() or DB_FILE
 
 def get_db_path() -> str:
-    return DB_FILE
+    return current_db()
+
+def activate(path: Optional[str]) -> contextvars.Token:
+    """Select path for this context until deactivate(token); prefer use_db()."""
+    return _active_db.set(path)
+
+def deactivate(token: contextvars.Token) -> None:
+    _active_db.reset(token)
+
+@contextmanager
+def use_db(path: Optional[str]) -> Iterator[None]:
+    """Run a block against the DB file at path (None: the default DB_FILE)."""
+    token = _active_db.set(path)
+    try:
+        yield
+    finally:
+        _active_db.reset(token)
+
+def now() -> float:
+    """Current epoch time on this context's clock."""
+    return _clock.get()()
+
+@contextmanager
+def use_clock(clock: Callable[[], float]) -> Iterator[None]:
+    """Stamp everything in a block with clock() instead of time.time()."""
+    token = _clock.set(clock)
+    try:
+        yield
+    finally:
+        _clock.reset(token)
+
+_TABLE_RE = re.compile(r"\b(?:FROM|INTO|UPDATE|TABLE)\s+(?:IF NOT EXISTS\s+)?(\w+)", re.I)
+
+class _TimedConnection(sqlite3.Connection):
+    """Connection that records each statement's latency by operation and table."""
+
+    _labels = {}  # sql -> (op, table); statements are a small fixed set
+
+    def _observe(self, sql: str, start: float) -> None:
+        labels = self._labels.get(sql)
+        if labels is None:
+            m = _TABLE_RE.search(sql)
+            labels = self._labels[sql] = (sql.split(None, 1)[0].lower(), m.group(1) if m else "")
+        metrics.DB_QUERY_LATENCY.observe(time.perf_counter() - start, *labels)
 
-def init_db(force: bool = False) -> None:
-    """Create a small SQLite DB with table metadata for the restaurant."""
-    if os.path.exists(DB_FILE) and not force:
+    def execute(self, sql, *args):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, *args)
+        finally:
+            self._observe(sql, start)
+
+    def executemany(self, sql, *args):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, *args)
+        finally:
+            self._observe(sql, start)
+
+def _open(path: str) -> sqlite3.Connection:
+    # isolation_level=None: we issue BEGIN/COMMIT ourselves in transaction()
+    # timing is chosen per connection, so with metrics off queries pay nothing
+    conn = sqlite3.connect(path, timeout=5.0, isolation_level=None,
+                           cached_statements=_STATEMENT_CACHE_SIZE,
+                           factory=_TimedConnection if metrics.enabled else sqlite3.Connection)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    # WAL + NORMAL only fsyncs at checkpoints, not on every commit
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+def get_connection() -> sqlite3.Connection:
+    """Return this thread's pooled connection to the current DB file."""
+    pool = getattr(_local, "pool", None)
+    if pool is None:
+        pool = _local.pool = {}
+    path = current_db()
+    conn = pool.get(path)
+    if conn is None:
+        conn = pool[path] = _open(path)
+    return conn
+
+def close_connection() -> None:
+    """Close this thread's pooled connections (e.g. at worker shutdown)."""
+    pool = getattr(_local, "pool", None) or {}
+    for conn in pool.values():
+        conn.close()
+    pool.clear()
+
+@contextmanager
+def transaction(immediate: bool = False) -> Iterator[sqlite3.Connection]:
+    """Run a block of statements in one transaction on the pooled connection.
+
+    Nested calls join the outer transaction instead of opening a new one;
+    status notifications raised inside it are held back until it commits
+    (and dropped if it rolls back), so listeners never see uncommitted rows.
+    """
+    conn = get_connection()
+    if conn.in_transaction:
+        yield conn
         return
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    cur.execute("""
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    deferred = _deferred_notifications()
+    deferred.pop(current_db(), None)  # left over from a COMMIT that failed
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        deferred.pop(current_db(), None)
+        raise
+    conn.execute("COMMIT")
+    for table_ids, status in deferred.pop(current_db(), ()):
+        _notify(table_ids, status)
+
+def subscribe(listener: StatusListener) -> None:
+    """Register a callback for table status changes (in-process caches).
+
+    Listeners run in the writer's context, so current_db() names the file
+    that changed.
+    """
+    _listeners.append(listener)
+
+def unsubscribe(listener: StatusListener) -> None:
+    """Remove a callback registered with subscribe(); unknown ones are ignored."""
+    try:
+        _listeners.remove(listener)
+    except ValueError:
+        pass
+
+def _deferred_notifications() -> Dict[str, list]:
+    deferred = getattr(_local, "deferred", None)
+    if deferred is None:
+        deferred = _local.deferred = {}
+    return deferred
+
+def _notify(table_ids: Optional[Sequence[str]], status: Optional[str]) -> None:
+    if get_connection().in_transaction:
+        # inside a caller's transaction: wait for its COMMIT
+        _deferred_notifications().setdefault(current_db(), []).append((table_ids, status))
+        return
+    for listener in _listeners:
+        listener(table_ids, status)
+
+def _ensure_schema(conn: sqlite3.Connection) -> None:
+    conn.execute("""
     CREATE TABLE IF NOT EXISTS tables (
         table_id TEXT PRIMARY KEY,
         capacity INTEGER NOT NULL,
@@ -22,32 +204,216 @@ def init_db(force: bool = False) -> None:
         sync_id TEXT
     )
     """)
-    # seed data
-    cur.execute("DELETE FROM tables")
-    seed = [
-        ("T1", 4, "Available", 1, None),
-        ("T2", 4, "Available", 1, None),
-        ("T3_A", 6, "Available", 0, "S1"),
-        ("T3_B", 6, "Available", 0, "S1"),
-        ("T4", 2, "Available", 1, None),
-    ]
-    cur.executemany("INSERT INTO tables(table_id, capacity, status, is_combinable, sync_id) VALUES (?, ?, ?, ?, ?)", seed)
-    conn.commit()
-    conn.close()
+    # added with the Reserved -> Seated -> Cleaning -> Available lifecycle
+    cols = {r["name"] for r in conn.execute("PRAGMA table_info(tables)")}
+    if "status_since" not in cols:
+        conn.execute("ALTER TABLE tables ADD COLUMN status_since REAL")
+    conn.execute("CREATE INDEX IF NOT EXISTS tables_by_status ON tables(status, status_since)")
+    # change feed: every status write stamps its rows with the next floor version
+    if "version" not in cols:
+        conn.execute("ALTER TABLE tables ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    conn.execute("CREATE INDEX IF NOT EXISTS tables_by_version ON tables(version)")
+    # site layout: which level each table stands on and where
+    if "floor" not in cols:
+        conn.execute("ALTER TABLE tables ADD COLUMN floor INTEGER NOT NULL DEFAULT 0")
+        conn.execute("ALTER TABLE tables ADD COLUMN x INTEGER")
+        conn.execute("ALTER TABLE tables ADD COLUMN y INTEGER")
+        # tables from before the layout columns are the default room's
+        conn.executemany("UPDATE tables SET x = ?, y = ? WHERE table_id = ?",
+                         [(t["x"], t["y"], t["table_id"]) for t in DEFAULT_LAYOUT["tables"]])
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS floors (
+        floor INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        width INTEGER NOT NULL,
+        height INTEGER NOT NULL,
+        home_x INTEGER NOT NULL,
+        home_y INTEGER NOT NULL,
+        obstacles TEXT NOT NULL DEFAULT '[]',
+        robots TEXT NOT NULL DEFAULT '{}'
+    )
+    """)
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    conn.execute("INSERT OR IGNORE INTO meta(key, value) VALUES ('version', 0), ('reset_version', 0)")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS table_events (
+        id INTEGER PRIMARY KEY,
+        table_id TEXT NOT NULL,
+        status TEXT NOT NULL,
+        at REAL NOT NULL
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS table_events_by_table ON table_events(table_id, at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS table_events_by_time ON table_events(at)")
+    # parties waiting for a table; status is Waiting, Seated or Cancelled
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS waitlist (
+        id INTEGER PRIMARY KEY,
+        party_size INTEGER NOT NULL,
+        priority INTEGER NOT NULL DEFAULT 0,
+        name TEXT,
+        status TEXT NOT NULL,
+        enqueued_at REAL NOT NULL,
+        seated_at REAL,
+        tables TEXT
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS waitlist_by_status ON waitlist(status, id)")
+    # append-only guest-flow log (eventlog.py) and its daily rollups
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS guest_events (
+        id INTEGER PRIMARY KEY,
+        at REAL NOT NULL,
+        kind TEXT NOT NULL,
+        party_size INTEGER,
+        tables TEXT,
+        detail TEXT
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS guest_events_by_kind ON guest_events(kind, at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS guest_events_by_time ON guest_events(at)")
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS daily_flow (
+        day TEXT NOT NULL,
+        hour INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        events INTEGER NOT NULL,
+        parties INTEGER NOT NULL,
+        covers INTEGER NOT NULL,
+        PRIMARY KEY (kind, day, hour)
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS daily_tables (
+        day TEXT NOT NULL,
+        table_id TEXT NOT NULL,
+        busy_seconds REAL NOT NULL,
+        seatings INTEGER NOT NULL,
+        PRIMARY KEY (day, table_id)
+    )
+    """)
+
+def init_db(force: bool = False, layout: Optional[Dict[str, Any]] = None) -> None:
+    """Create the current SQLite DB and seed it with a site layout.
+
+    layout has "floors" (level, name, grid size, robot home, obstacles,
+    robots) and "tables" (id, capacity, position, combinability); it
+    defaults to DEFAULT_LAYOUT. An existing DB is left alone unless force.
+    """
+    exists = os.path.exists(current_db())
+    with transaction() as conn:
+        _ensure_schema(conn)
+        if exists and not force:
+            if conn.execute("SELECT 1 FROM floors").fetchone() is None:
+                _seed_floors(conn, layout or DEFAULT_LAYOUT)
+            return
+        # seed data
+        conn.execute("DELETE FROM tables")
+        conn.execute("DELETE FROM table_events")
+        conn.execute("DELETE FROM waitlist")
+        # a reseed is a new floor: feed clients older than this resync in full
+        version = _bump_version(conn)
+        conn.execute("UPDATE meta SET value = ? WHERE key = 'reset_version'", (version,))
+        layout = layout or DEFAULT_LAYOUT
+        _seed_floors(conn, layout)
+        conn.executemany("INSERT INTO tables(table_id, capacity, status, is_combinable, sync_id, version, floor, x, y) "
+                         "VALUES (?, ?, 'Available', ?, ?, ?, ?, ?, ?)",
+                         [(t["table_id"], t["capacity"], int(t.get("combinable", True)), t.get("sync_id"),
+                           version, t.get("floor", 0), t["x"], t["y"]) for t in layout["tables"]])
+    _notify(None, None)
+
+def _seed_floors(conn: sqlite3.Connection, layout: Dict[str, Any]) -> None:
+    conn.execute("DELETE FROM floors")
+    conn.executemany("INSERT INTO floors(floor, name, width, height, home_x, home_y, obstacles, robots) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                     [(f["floor"], f.get("name") or f"Floor {f['floor']}", f["width"], f["height"],
+                       f["home"][0], f["home"][1], json.dumps(f.get("obstacles", [])),
+                       json.dumps(f.get("robots", {}))) for f in layout["floors"]])
+
+def list_floors() -> List[dict]:
+    """Levels of the current site, with obstacles and robots decoded."""
+    rows = get_connection().execute("SELECT * FROM floors ORDER BY floor").fetchall()
+    out = []
+    for r in rows:
+        f = dict(r)
+        f["home"] = (f.pop("home_x"), f.pop("home_y"))
+        f["obstacles"] = [tuple(o) for o in json.loads(f["obstacles"])]
+        f["robots"] = {rid: tuple(pos) for rid, pos in json.loads(f["robots"]).items()}
+        out.append(f)
+    return out
 
 def list_tables() -> Iterable[dict]:
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM tables")
-    rows = cur.fetchall()
-    conn.close()
+    rows = get_connection().execute("SELECT * FROM tables").fetchall()
     for r in rows:
         yield dict(r)
 
+def get_tables(table_ids: Sequence[str]) -> List[dict]:
+    marks = ",".join("?" * len(table_ids))
+    rows = get_connection().execute(
+        f"SELECT * FROM tables WHERE table_id IN ({marks})", tuple(table_ids)).fetchall()
+    return [dict(r) for r in rows]
+
 def update_table_status(table_id: str, status: str) -> None:
-    conn = sqlite3.connect(DB_FILE)
-    cur = conn.cursor()
-    cur.execute("UPDATE tables SET status = ? WHERE table_id = ?", (status, table_id))
-    conn.commit()
-    conn.close()
+    update_table_statuses([table_id], status)
+
+def update_table_statuses(table_ids: Sequence[str], status: str) -> None:
+    """Set status on several tables in a single transaction."""
+    now = _clock.get()()
+    with transaction() as conn:
+        version = _bump_version(conn)
+        conn.executemany("UPDATE tables SET status = ?, status_since = ?, version = ? WHERE table_id = ?",
+                         [(status, now, version, tid) for tid in table_ids])
+        _record_events(conn, table_ids, status, now)
+    _notify(table_ids, status)
+
+def _bump_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version' RETURNING value").fetchone()[0]
+
+def floor_version() -> int:
+    """Current floor version; bumped by every committed status write."""
+    return get_connection().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+def changes_since(version: int) -> Tuple[int, bool, List[dict]]:
+    """(current version, reset, rows changed after version).
+
+    reset is True when the floor was re-seeded after version (or version
+    is from some other DB); rows then holds the whole table set and the
+    client should replace its copy.
+    """
+    with transaction() as conn:
+        meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        reset = not meta["reset_version"] <= version <= meta["version"]
+        rows = conn.execute("SELECT * FROM tables WHERE version > ?",
+                            (-1 if reset else version,)).fetchall()
+    return meta["version"], reset, [dict(r) for r in rows]
+
+def _record_events(conn: sqlite3.Connection, table_ids: Sequence[str], status: str, now: float) -> None:
+    conn.executemany("INSERT INTO table_events(table_id, status, at) VALUES (?, ?, ?)",
+                     [(tid, status, now) for tid in table_ids])
+
+class ReservationConflict(Exception):
+    """A table was no longer in the expected status when we tried to move it."""
+
+def set_status_if(table_ids: Sequence[str], status: str, expected: Sequence[str],
+                  now: Optional[float] = None) -> None:
+    """Atomically move all of table_ids to status, provided each is in expected.
+
+    Uses a compare-and-set UPDATE inside a BEGIN IMMEDIATE transaction, so
+    either every table moves or none does. Raises ReservationConflict if
+    another writer changed any of them first.
+    """
+    now = _clock.get()() if now is None else now
+    marks = ",".join("?" * len(expected))
+    sql = f"UPDATE tables SET status = ?, status_since = ?, version = ? WHERE table_id = ? AND status IN ({marks})"
+    with transaction(immediate=True) as conn:
+        version = _bump_version(conn)
+        for tid in table_ids:
+            cur = conn.execute(sql, (status, now, version, tid, *expected))
+            if cur.rowcount != 1:
+                raise ReservationConflict(tid)
+        _record_events(conn, table_ids, status, now)
+    _notify(table_ids, status)
+
+def reserve_tables(table_ids: Sequence[str], status: str = "Reserved") -> None:
+    """Atomically move all of table_ids from Available to status."""
+    set_status_if(table_ids, status, ("Available",))
@@ -0,0 +1,313 @@
+"""Append-only guest-flow event log with buffered writes and daily rollups.
+
+record() only appends to an in-memory buffer; a background thread writes the
+buffered events of each site DB in one executemany transaction every
+FLUSH_INTERVAL seconds (sooner once BATCH_SIZE events are waiting), so
+request handlers never wait on SQLite for logging.
+
+Analytics read two layers: the raw guest_events / table_events rows for as
+far back as they are kept, and the daily_flow / daily_tables summaries
+before that. compact() rolls finished days into the summaries and prunes
+raw rows older than the retention window, so dashboards stay fast after
+months of service. Summaries are hourly (flow) and daily (tables), so a
+window reaching past the retention window counts only the hours or days it
+fully covers there.
+
+Kinds: greeting, parse, allocation (a party got tables), allocation_reversed
+(those tables were handed back before the party was led to them; analytics
+net it out), no_table, waitlist, seat, release, clean, navigation.
+"""
+import atexit
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
+from . import db
+
+FLUSH_INTERVAL = 1.0  # seconds
+BATCH_SIZE = 256  # events that trigger an early flush
+RETAIN_DAYS = 8  # raw rows kept after compaction (lifecycle looks back 7 days)
+DAY = 86400
+
+
+class EventLog:
+    """Write buffer for one DB file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._buffer: deque = deque()
+        self._flush_lock = threading.Lock()
+
+    def append(self, row: tuple) -> int:
+        self._buffer.append(row)
+        return len(self._buffer)
+
+    def flush(self) -> int:
+        """Write everything buffered so far; returns the number of events written."""
+        with self._flush_lock:
+            rows = []
+            while self._buffer:
+                rows.append(self._buffer.popleft())
+            if rows:
+                try:
+                    with db.use_db(self.path):
+                        with db.transaction() as conn:
+                            conn.executemany("INSERT INTO guest_events(at, kind, party_size, tables, detail) "
+                                             "VALUES (?, ?, ?, ?, ?)", rows)
+                except Exception:
+                    self._buffer.extendleft(reversed(rows))  # keep them for the next flush
+                    raise
+            return len(rows)
+
+
+_logs: Dict[str, EventLog] = {}
+_logs_lock = threading.Lock()
+_wake = threading.Event()
+_flusher: Optional[threading.Thread] = None
+
+
+def _log_for(path: str) -> EventLog:
+    log = _logs.get(path)
+    if log is None:
+        with _logs_lock:
+            log = _logs.get(path)
+            if log is None:
+                log = _logs[path] = EventLog(path)
+                _start_flusher()
+    return log
+
+
+def _start_flusher() -> None:
+    global _flusher
+    if _flusher is None:
+        _flusher = threading.Thread(target=_flush_loop, name='event-log-flusher', daemon=True)
+        _flusher.start()
+        atexit.register(flush)
+
+
+def _flush_loop() -> None:
+    while True:
+        _wake.wait(FLUSH_INTERVAL)
+        _wake.clear()
+        for log in list(_logs.values()):
+            try:
+                log.flush()
+            except Exception:  # e.g. a locked DB: the rows stay buffered for the next round
+                pass
+
+
+def record(kind: str, party_size: Optional[int] = None, tables: Optional[Sequence[str]] = None,
+           **detail: Any) -> None:
+    """Log one guest-flow event against the current site; never touches SQLite."""
+    row = (db.now(), kind, party_size, json.dumps(list(tables)) if tables else None,
+           json.dumps(detail) if detail else None)
+    if _log_for(db.current_db()).append(row) >= BATCH_SIZE:
+        _wake.set()
+
+
+def flush(path: Optional[str] = None) -> int:
+    """Write buffered events now (all sites, or just path's)."""
+    if path is None:
+        logs = list(_logs.values())
+    else:
+        logs = [_logs[path]] if path in _logs else []
+    written = 0
+    for log in logs:
+        written += log.flush()
+    return written
+
+
+def close(path: str) -> None:
+    """Flush and forget path's buffer (e.g. a scratch DB about to be deleted)."""
+    flush(path)
+    with _logs_lock:
+        _logs.pop(path, None)
+
+
+def events(since: float = 0.0, kind: Optional[str] = None, limit: int = 1000) -> List[dict]:
+    """Raw events of the current site after since, oldest first."""
+    sql = "SELECT * FROM guest_events WHERE at > ?" + (" AND kind = ?" if kind else "") + " ORDER BY at LIMIT ?"
+    args = (since, kind, limit) if kind else (since, limit)
+    out = []
+    for r in db.get_connection().execute(sql, args):
+        e = dict(r)
+        e['tables'] = json.loads(e['tables']) if e['tables'] else None
+        e['detail'] = json.loads(e['detail']) if e['detail'] else {}
+        out.append(e)
+    return out
+
+
+# --- compaction and analytics -------------------------------------------------
+
+def day_start(ts: float) -> float:
+    """Local midnight at or before ts: service days follow the venue's clock."""
+    t = time.localtime(ts)
+    return time.mktime((t.tm_year, t.tm_mon, t.tm_mday, 0, 0, 0, 0, 0, -1))
+
+
+def _next_day(start: float) -> float:
+    # not start + DAY: days around a DST change are 23 or 25 hours long
+    return day_start(start + DAY + 3600 * 3)
+
+
+def watermark() -> float:
+    """Everything before this epoch time is answered from the daily summaries."""
+    row = db.get_connection().execute("SELECT value FROM meta WHERE key = 'compacted_through'").fetchone()
+    return float(row[0]) if row else 0.0
+
+
+def compact(now: Optional[float] = None, retain_days: int = RETAIN_DAYS) -> int:
+    """Roll every finished day into the summary tables and prune old raw rows.
+
+    Idempotent: days before the watermark are never summarised twice.
+    Returns the number of days summarised.
+    """
+    now = db.now() if now is None else now
+    flush(db.current_db())
+    today = day_start(now)
+    with db.transaction(immediate=True) as conn:
+        start = watermark()
+        if start == 0.0:
+            first = conn.execute("SELECT MIN(at) FROM (SELECT MIN(at) AS at FROM guest_events "
+                                 "UNION ALL SELECT MIN(at) FROM table_events)").fetchone()[0]
+            start = day_start(first) if first is not None else today
+        days = 0
+        while start < today:
+            end = _next_day(start)
+            label = time.strftime('%Y-%m-%d', time.localtime(start))
+            conn.execute("""
+                INSERT OR REPLACE INTO daily_flow(day, hour, kind, events, parties, covers)
+                SELECT ?, CAST(strftime('%H', at, 'unixepoch', 'localtime') AS INTEGER) AS hour, kind,
+                       COUNT(*), COUNT(party_size), COALESCE(SUM(party_size), 0)
+                FROM guest_events WHERE at >= ? AND at < ? GROUP BY hour, kind
+            """, (label, start, end))
+            conn.executemany("INSERT OR REPLACE INTO daily_tables(day, table_id, busy_seconds, seatings) "
+                             "VALUES (?, ?, ?, ?)",
+                             [(label, tid, busy, seatings)
+                              for tid, (busy, seatings) in _table_busy(conn, start, end).items()])
+            start, days = end, days + 1
+        conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('compacted_through', ?)", (int(start),))
+        # a midnight, so the summaries before it are whole hours and days
+        cutoff = min(day_start(today - retain_days * DAY + 3600 * 3), today)
+        if cutoff > raw_since():
+            conn.execute("DELETE FROM guest_events WHERE at < ?", (cutoff,))
+            # keep each table's last change before the cutoff: its status carries into the raw layer
+            conn.execute("""
+                DELETE FROM table_events WHERE at < :cutoff AND rowid NOT IN (
+                    SELECT rowid FROM (SELECT rowid, ROW_NUMBER() OVER (
+                                           PARTITION BY table_id ORDER BY at DESC) AS rn
+                                       FROM table_events WHERE at < :cutoff)
+                    WHERE rn = 1)
+            """, {'cutoff': cutoff})
+            conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('raw_since', ?)", (int(cutoff),))
+    return days
+
+
+def raw_since() -> float:
+    """Raw events are complete from this epoch time on; summaries answer before it."""
+    row = db.get_connection().execute("SELECT value FROM meta WHERE key = 'raw_since'").fetchone()
+    return float(row[0]) if row else 0.0
+
+
+def compact_if_due(now: Optional[float] = None) -> int:
+    """compact() once per day; cheap to call from a periodic scheduler."""
+    now = db.now() if now is None else now
+    if watermark() >= day_start(now):
+        return 0
+    return compact(now)
+
+
+def _table_busy(conn, start: float, end: float) -> Dict[str, tuple]:
+    """table_id -> (seconds not Available, times Seated) within [start, end)."""
+    rows = conn.execute("""
+        SELECT table_id,
+               SUM(CASE WHEN status != 'Available'
+                        THEN MIN(COALESCE(next_at, :end), :end) - MAX(at, :start) ELSE 0 END),
+               SUM(status = 'Seated' AND at >= :start)
+        FROM (SELECT table_id, status, at,
+                     LEAD(at) OVER (PARTITION BY table_id ORDER BY at) AS next_at
+              FROM table_events WHERE at < :end)
+        WHERE COALESCE(next_at, :end) > :start
+        GROUP BY table_id
+    """, {'start': start, 'end': end}).fetchall()
+    return {r[0]: (r[1] or 0.0, r[2] or 0) for r in rows}
+
+
+def _hour_start(day: str, hour: int) -> float:
+    t = time.strptime(day, '%Y-%m-%d')
+    return time.mktime((t.tm_year, t.tm_mon, t.tm_mday, hour, 0, 0, 0, 0, -1))
+
+
+def _labels(start: float, end: float):
+    """(first, last) day labels touching [start, end), or None if it is empty."""
+    if start >= end:
+        return None
+    return (time.strftime('%Y-%m-%d', time.localtime(start)),
+            time.strftime('%Y-%m-%d', time.localtime(end - 1)))
+
+
+def covers_per_hour(start: float, end: float) -> List[dict]:
+    """Seated parties and covers per local clock hour in [start, end)."""
+    conn = db.get_connection()
+    boundary = raw_since()
+    summary_end, raw_from = min(end, boundary), max(start, boundary)
+    out: Dict[str, List[int]] = {}
+    labels = _labels(start, summary_end)
+    if labels:
+        for r in conn.execute("""
+                SELECT day, hour, SUM(CASE kind WHEN 'allocation' THEN parties ELSE -parties END),
+                       SUM(CASE kind WHEN 'allocation' THEN covers ELSE -covers END)
+                FROM daily_flow WHERE kind IN ('allocation', 'allocation_reversed') AND day BETWEEN ? AND ?
+                GROUP BY day, hour
+                """, labels):
+            hour = _hour_start(r[0], r[1])
+            # only hours wholly inside the window: the summary cannot split one
+            if start <= hour and hour + 3600 <= summary_end:
+                out[f"{r[0]} {r[1]:02d}:00"] = [r[2], r[3]]
+    if raw_from < end:
+        for r in conn.execute("""
+                SELECT strftime('%Y-%m-%d %H:00', at, 'unixepoch', 'localtime') AS hour,
+                       SUM(CASE kind WHEN 'allocation' THEN 1 ELSE -1 END),
+                       SUM(CASE kind WHEN 'allocation' THEN party_size ELSE -party_size END)
+                FROM guest_events WHERE kind IN ('allocation', 'allocation_reversed') AND at >= ? AND at < ?
+                GROUP BY hour
+                """, (raw_from, end)):
+            acc = out.setdefault(r[0], [0, 0])
+            acc[0] += r[1]
+            acc[1] += r[2] or 0
+    return [{'hour': h, 'parties': p, 'covers': c} for h, (p, c) in sorted(out.items()) if p]
+
+
+def average_party_size(start: float, end: float) -> Optional[float]:
+    """Mean size of the parties seated in [start, end)."""
+    rows = covers_per_hour(start, end)
+    parties = sum(r['parties'] for r in rows)
+    return round(sum(r['covers'] for r in rows) / parties, 2) if parties else None
+
+
+def table_utilisation(start: float, end: float) -> Dict[str, dict]:
+    """Per table: fraction of [start, end) spent not Available, and seatings."""
+    conn = db.get_connection()
+    boundary = raw_since()
+    summary_end, raw_from = min(end, boundary), max(start, boundary)
+    busy: Dict[str, List[float]] = {}
+    # only days wholly inside the window: the summary cannot split one
+    first_day = day_start(start)
+    if first_day < start:
+        first_day = _next_day(first_day)
+    last_day = day_start(summary_end)
+    whole = _labels(first_day, last_day)
+    if whole:
+        for r in conn.execute("SELECT table_id, SUM(busy_seconds), SUM(seatings) FROM daily_tables "
+                              "WHERE day BETWEEN ? AND ? GROUP BY table_id", whole):
+            busy[r[0]] = [r[1], r[2]]
+    if raw_from < end:
+        for tid, (secs, seatings) in _table_busy(conn, raw_from, end).items():
+            acc = busy.setdefault(tid, [0.0, 0])
+            acc[0] += secs
+            acc[1] += seatings
+    span = max(end - start, 1e-9)
+    return {tid: {'utilisation': round(secs / span, 4), 'seatings': int(seatings)}
+            for tid, (secs, seatings) in sorted(busy.items())}
@@ -0,0 +1,138 @@
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from . import db
+
+# Writers in this process wake waiters immediately through db.subscribe;
+# writes from other processes sharing the DB file are picked up by
+# re-reading the floor version every POLL_INTERVAL seconds.
+POLL_INTERVAL = 0.5
+
+Changes = Tuple[int, bool, List[dict]]
+
+
+class ChangeFeed:
+    """Reads of one DB file's floor change log for long-poll and SSE clients.
+
+    wait()/follow() block a thread (the Flask server); await_changes()/
+    afollow() park a coroutine instead, so idle clients of the ASGI server
+    hold no thread at all.
+    """
+
+    def __init__(self, poll_interval: float = POLL_INTERVAL, path: Optional[str] = None):
+        self.poll_interval = poll_interval
+        self.path = path or db.current_db()
+        self._cond = threading.Condition()
+        self._local_writes = 0
+        self._async_waiters: Set[Tuple[Any, Any]] = set()  # (event loop, asyncio.Event)
+        db.subscribe(self._on_status_change)
+
+    def _on_status_change(self, table_ids: Optional[Sequence[str]], status: Optional[str]) -> None:
+        if db.current_db() != self.path:
+            return  # another site's floor
+        with self._cond:
+            self._local_writes += 1
+            self._cond.notify_all()
+            waiters = list(self._async_waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:  # that loop has closed
+                pass
+
+    def wait(self, since: int, timeout: float) -> Changes:
+        """Block until the floor moves past version since, or timeout.
+
+        Returns db.changes_since(since); on timeout the change list is empty.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._cond:
+                seen = self._local_writes
+            with db.use_db(self.path):
+                if db.floor_version() != since:
+                    return db.changes_since(since)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return since, False, []
+            with self._cond:
+                if self._local_writes == seen:
+                    self._cond.wait(min(remaining, self.poll_interval))
+
+    def follow(self, since: int, heartbeat: float = 15.0) -> Iterator[Optional[Changes]]:
+        """Endless stream of change batches after since; None marks an idle heartbeat."""
+        try:
+            while True:
+                version, reset, rows = self.wait(since, heartbeat)
+                if version == since:
+                    yield None
+                    continue
+                since = version
+                yield version, reset, rows
+        finally:
+            # streams run on their own (often short-lived) threads
+            db.close_connection()
+
+    async def await_changes(self, since: int, timeout: float) -> Changes:
+        """wait() for an event loop: the coroutine sleeps until a write or the poll tick.
+
+        The version check is one indexed read, cheap enough to run on the loop.
+        """
+        import asyncio  # only the ASGI server needs it; keep it off the import path
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = (loop, event)
+        deadline = loop.time() + timeout
+        with self._cond:
+            self._async_waiters.add(waiter)
+        try:
+            while True:
+                event.clear()
+                with db.use_db(self.path):
+                    if db.floor_version() != since:
+                        return db.changes_since(since)
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return since, False, []
+                try:
+                    await asyncio.wait_for(event.wait(), min(remaining, self.poll_interval))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._cond:
+                self._async_waiters.discard(waiter)
+
+    async def afollow(self, since: int, heartbeat: float = 15.0) -> AsyncIterator[Optional[Changes]]:
+        """follow() for an event loop."""
+        while True:
+            version, reset, rows = await self.await_changes(since, heartbeat)
+            if version == since:
+                yield None
+                continue
+            since = version
+            yield version, reset, rows
+
+
+_feeds: Dict[str, ChangeFeed] = {}
+_feed_lock = threading.Lock()
+
+
+def get_feed() -> ChangeFeed:
+    """The feed for the current DB file, created on first use."""
+    path = db.current_db()
+    feed = _feeds.get(path)
+    if feed is None:
+        with _feed_lock:
+            feed = _feeds.get(path)
+            if feed is None:
+                feed = _feeds[path] = ChangeFeed(path=path)
+    return feed
+
+
+def forget(path: str) -> None:
+    """Drop path's feed and its listener (e.g. a scratch DB about to be deleted)."""
+    with _feed_lock:
+        feed = _feeds.pop(path, None)
+    if feed is not None:
+        db.unsubscribe(feed._on_status_change)
@@ -0,0 +1,186 @@
+import threading
+import time
+from heapq import heappush, heappop
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from .navigation import FloorMap, GridPos
+
+# Paths in this module are timed: path[k] is the cell occupied at step t0 + k,
+# and a repeated cell means the robot waits.
+
+
+class ReservationTable:
+    """Space-time cell reservations shared by every robot on a floor."""
+
+    def __init__(self):
+        self.cells: Dict[Tuple[int, int], str] = {}  # (cell, t) -> robot
+        self.edges: Set[Tuple[int, int, int]] = set()  # (from, to, t) moves
+        self.parked: Dict[int, Tuple[int, str]] = {}  # cell -> (from t, robot)
+
+    def reserve(self, robot: str, path: Sequence[int], t0: int) -> None:
+        """Claim a timed index path; the robot then parks on its last cell."""
+        for k, cell in enumerate(path):
+            self.cells[(cell, t0 + k)] = robot
+            if k:
+                self.edges.add((path[k - 1], cell, t0 + k))
+        self.parked[path[-1]] = (t0 + len(path) - 1, robot)
+
+    def blocked(self, cell: int, t: int) -> bool:
+        if (cell, t) in self.cells:
+            return True
+        park = self.parked.get(cell)
+        return park is not None and t >= park[0]
+
+    def swap(self, a: int, b: int, t: int) -> bool:
+        """Would moving a -> b arriving at t swap places with another robot?"""
+        return (b, a, t) in self.edges
+
+    def last_claim(self, cell: int) -> int:
+        """Latest step at which cell is reserved by a passing robot (-1 if never)."""
+        return max((t for (c, t) in self.cells if c == cell), default=-1)
+
+
+def space_time_astar(fm: FloorMap, start: GridPos, goal: GridPos, table: ReservationTable,
+                     t0: int = 0, max_steps: Optional[int] = None) -> List[GridPos]:
+    """Shortest timed path start -> goal avoiding reserved cells and swaps.
+
+    Uses the goal's distance field as an exact (static-obstacle) heuristic,
+    so the search only widens where other robots are in the way. The robot
+    may only finish on the goal once nobody else will pass through it.
+    """
+    grid = fm.grid
+    field = fm.distance_field(goal)
+    s, g = grid.index(start), grid.index(goal)
+    if field[s] < 0 or table.blocked(s, t0) or g in table.parked:
+        return []
+    if max_steps is None:
+        max_steps = field[s] + grid.width + grid.height
+    goal_clear_from = table.last_claim(g) + 1
+    # ties on f are broken towards deeper states: with an exact heuristic
+    # that walks straight down one shortest path instead of fanning out
+    open_set = [(field[s], 0, s)]
+    came_from = {(s, 0): None}
+    while open_set:
+        _, neg_k, cell = heappop(open_set)
+        k = -neg_k
+        t = t0 + k
+        if cell == g and t >= goal_clear_from:
+            out = []
+            node = (cell, k)
+            while node is not None:
+                out.append(grid.pos(node[0]))
+                node = came_from[node]
+            out.reverse()
+            return out
+        if k >= max_steps:
+            continue
+        for n in [cell, *grid.neighbor_indices(cell)]:
+            state = (n, k + 1)
+            if state in came_from or table.blocked(n, t + 1) or table.swap(cell, n, t + 1):
+                continue
+            came_from[state] = (cell, k)
+            heappush(open_set, (k + 1 + field[n], -k - 1, n))
+    return []
+
+
+class Robot:
+    def __init__(self, robot_id: str, position: GridPos):
+        self.id = robot_id
+        self.position = position
+        self.path: List[GridPos] = []
+        self.t0 = 0
+        self.busy = False
+
+    def position_at(self, t: int) -> GridPos:
+        if not self.path:
+            return self.position
+        return self.path[min(max(t - self.t0, 0), len(self.path) - 1)]
+
+
+class Fleet:
+    """Several robots on one FloorMap, dispatched with prioritized planning.
+
+    Each new route is planned with space-time A* against a reservation table
+    holding every other robot's remaining timed path (and parked idle robots),
+    so routes are collision-free without replanning earlier ones.
+    """
+
+    def __init__(self, floor_map: FloorMap, robots: Dict[str, GridPos],
+                 step_seconds: float = 0.5, clock: Callable[[], float] = time.monotonic):
+        self.floor_map = floor_map
+        self.robots = {rid: Robot(rid, pos) for rid, pos in robots.items()}
+        self.step_seconds = step_seconds
+        self.clock = clock
+        self._epoch = clock()
+        self.lock = threading.Lock()
+
+    def now_step(self) -> int:
+        return int((self.clock() - self._epoch) / self.step_seconds)
+
+    def _reservations(self, t: int, exclude: Set[str]) -> ReservationTable:
+        table = ReservationTable()
+        grid = self.floor_map.grid
+        for r in self.robots.values():
+            if r.id in exclude:
+                continue
+            remaining = r.path[max(t - r.t0, 0):] if r.path else []
+            cells = [grid.index(p) for p in remaining] or [grid.index(r.position_at(t))]
+            table.reserve(r.id, cells, t)
+        return table
+
+    def dispatch(self, targets: Sequence[GridPos], t: Optional[int] = None) -> List[Optional[dict]]:
+        """Send the nearest idle robot to each target and plan collision-free routes.
+
+        Robot/target pairs are matched greedily by shortest static distance,
+        closest pair first. Returns, per target, {'robot', 'path', 't0'} or
+        None when no robot could be assigned or routed.
+        """
+        with self.lock:
+            t = self.now_step() if t is None else t
+            for r in self.robots.values():
+                r.position = r.position_at(t)
+            idle = [r for r in self.robots.values() if not r.busy]
+            pairs = []
+            for i, target in enumerate(targets):
+                field = self.floor_map.distance_field(target)
+                for r in idle:
+                    d = field[self.floor_map.grid.index(r.position)]
+                    if d >= 0:
+                        pairs.append((d, i, r.id))
+            pairs.sort()
+            assigned: Dict[int, str] = {}
+            used: Set[str] = set()
+            for _, i, rid in pairs:
+                if i not in assigned and rid not in used:
+                    assigned[i] = rid
+                    used.add(rid)
+
+            out: List[Optional[dict]] = [None] * len(targets)
+            for i in sorted(assigned, key=lambda i: -self._distance(assigned[i], targets[i])):
+                rid = assigned[i]
+                robot = self.robots[rid]
+                # robots not yet planned still hold their current cell
+                table = self._reservations(t, exclude={rid})
+                path = space_time_astar(self.floor_map, robot.position, targets[i], table, t)
+                if not path:
+                    continue
+                robot.path, robot.t0, robot.busy = path, t, True
+                out[i] = {'robot': rid, 'path': path, 't0': t}
+            return out
+
+    def _distance(self, rid: str, target: GridPos) -> int:
+        field = self.floor_map.distance_field(target)
+        return field[self.floor_map.grid.index(self.robots[rid].position)]
+
+    def release(self, robot_id: str) -> None:
+        """Mark a robot idle again where it currently stands."""
+        with self.lock:
+            robot = self.robots[robot_id]
+            robot.position = robot.position_at(self.now_step())
+            robot.path, robot.busy = [], False
+
+    def status(self, t: Optional[int] = None) -> List[dict]:
+        t = self.now_step() if t is None else t
+        return [{'robot': r.id, 'busy': r.busy, 'position': r.position_at(t),
+                 'arrives_in': max(r.t0 + len(r.path) - 1 - t, 0) if r.path else 0}
+                for r in self.robots.values()]
@@ -0,0 +1,149 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from . import db
+
+
+class FloorIndex:
+    """In-memory view of table state, kept in step with SQLite.
+
+    Holds capacity-bucketed free lists, a sync_id -> members map and the pool
+    of free combinable tables. Writes still go to SQLite first (write-through);
+    the index is updated incrementally from db status notifications, so the
+    allocator's hot path reads no rows.
+    """
+
+    def __init__(self, rows: Iterable[dict] = ()):
+        self.lock = threading.RLock()
+        self.load(rows)
+
+    @classmethod
+    def from_db(cls) -> "FloorIndex":
+        index = cls()
+        index.reload()
+        return index
+
+    def reload(self) -> None:
+        """Rebuild from the current DB file."""
+        rows = list(db.list_tables())
+        with self.lock:
+            self.load(rows, path=db.current_db())
+
+    def load(self, rows: Iterable[dict], path: Optional[str] = None) -> None:
+        self.path = path
+        self.loaded_at = time.monotonic()
+        self.tables: Dict[str, dict] = {}
+        self.order: Dict[str, int] = {}
+        self.caps: List[int] = []
+        self.free_by_cap: Dict[int, Set[str]] = {}
+        self.sync_members: Dict[str, List[str]] = {}
+        self.sync_busy: Dict[str, int] = {}
+        self.pool: Set[str] = set()
+        for i, r in enumerate(rows):
+            r = dict(r)
+            tid = r['table_id']
+            self.tables[tid] = r
+            self.order[tid] = i
+            if r['capacity'] not in self.free_by_cap:
+                self.free_by_cap[r['capacity']] = set()
+                insort(self.caps, r['capacity'])
+            if r['sync_id']:
+                self.sync_members.setdefault(r['sync_id'], []).append(tid)
+                self.sync_busy.setdefault(r['sync_id'], 0)
+            if r['status'] == 'Available':
+                self._mark_free(r)
+            elif r['sync_id']:
+                self.sync_busy[r['sync_id']] += 1
+
+    def _mark_free(self, r: dict) -> None:
+        self.free_by_cap[r['capacity']].add(r['table_id'])
+        if r['is_combinable'] and not r['sync_id']:
+            self.pool.add(r['table_id'])
+
+    def apply(self, table_ids: Sequence[str], status: str) -> None:
+        """Incrementally move table_ids to status."""
+        with self.lock:
+            for tid in table_ids:
+                r = self.tables.get(tid)
+                if r is None or r['status'] == status:
+                    continue
+                was_free = r['status'] == 'Available'
+                r['status'] = status
+                if status == 'Available':
+                    self._mark_free(r)
+                    if r['sync_id']:
+                        self.sync_busy[r['sync_id']] -= 1
+                elif was_free:
+                    self.free_by_cap[r['capacity']].discard(tid)
+                    self.pool.discard(tid)
+                    if r['sync_id']:
+                        self.sync_busy[r['sync_id']] += 1
+
+    def refresh(self, table_ids: Sequence[str]) -> None:
+        """Re-read a few rows from SQLite, e.g. after losing a reservation race."""
+        rows = db.get_tables(table_ids)
+        with self.lock:
+            for r in rows:
+                self.apply([r['table_id']], r['status'])
+
+    def fit_candidates(self, group_size: int) -> Iterator[dict]:
+        """Free tables seating group_size, smallest capacity first."""
+        for cap in self.caps[bisect_left(self.caps, group_size):]:
+            for tid in sorted(self.free_by_cap[cap], key=self.order.__getitem__):
+                yield self.tables[tid]
+
+    def level(self, table_id: str) -> int:
+        """Floor level a table stands on (0 for rows without one)."""
+        return self.tables[table_id].get('floor') or 0
+
+    def sync_group_free(self, sync_id: str) -> bool:
+        return self.sync_busy.get(sync_id, 0) == 0
+
+    def combination_units(self) -> List[Tuple[int, List[str]]]:
+        """Free units for combining: plain combinable tables and whole sync groups.
+
+        A sync group counts only when every member is free and combinable.
+        """
+        units = [(self.tables[tid]['capacity'], [tid])
+                 for tid in sorted(self.pool, key=self.order.__getitem__)]
+        for sync_id, members in self.sync_members.items():
+            rows = [self.tables[m] for m in members]
+            if self.sync_busy[sync_id] == 0 and all(r['is_combinable'] for r in rows):
+                units.append((sum(r['capacity'] for r in rows), list(members)))
+        return units
+
+
+# one index per DB file, so each site's allocations lock only its own floor
+_indexes: Dict[str, FloorIndex] = {}
+_index_lock = threading.Lock()
+
+
+def get_floor() -> FloorIndex:
+    """Return the process-wide index for the current DB, loading it on first use."""
+    path = db.current_db()
+    index = _indexes.get(path)
+    if index is None:
+        with _index_lock:
+            index = _indexes.get(path)
+            if index is None:
+                index = _indexes[path] = FloorIndex.from_db()
+    return index
+
+
+def invalidate(path: Optional[str] = None) -> None:
+    """Drop the current DB's index (or path's); the next get_floor() rebuilds it."""
+    _indexes.pop(path or db.current_db(), None)
+
+
+def _on_status_change(table_ids: Optional[Sequence[str]], status: Optional[str]) -> None:
+    if table_ids is None:
+        invalidate()
+        return
+    index = _indexes.get(db.current_db())
+    if index is not None:
+        index.apply(table_ids, status)
+
+
+db.subscribe(_on_status_change)
@@ -1,5 +1,8 @@
 from datetime import datetime
 
+# every phrase get_greeting() can return (used to pre-warm the TTS cache)
+GREETINGS = ("Good morning.", "Good afternoon.", "Good evening.")
+
 def get_greeting(now: datetime | None = None) -> str:
     """Return a greeting based on the time of day.
 
@@ -10,7 +13,7 @@ def get_greeting(now: datetime | None = None) -> str:
         now = datetime.now()
     hour = now.hour
     if 5 <= hour < 12:
-        return "Good morning."
+        return GREETINGS[0]
     if 12 <= hour < 18:
-        return "Good afternoon."
-    return "Good evening."
+        return GREETINGS[1]
+    return GREETINGS[2]
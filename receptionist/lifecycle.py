@@ -0,0 +1,157 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from . import db, eventlog
+
+logger = logging.getLogger(__name__)
+
+# status -> statuses it may move to next
+TRANSITIONS = {
+    'Available': ('Reserved',),
+    'Reserved': ('Seated', 'Available'),  # Reserved -> Available is a cancel/no-show
+    'Seated': ('Cleaning',),
+    'Cleaning': ('Available',),
+}
+
+# fallback phase durations (seconds) until there is turnover history
+DEFAULT_DURATIONS = {'Reserved': 5 * 60, 'Seated': 60 * 60, 'Cleaning': 5 * 60}
+RESERVATION_TTL = 15 * 60  # unseated reservations older than this are released
+CLEANING_TTL = 10 * 60  # Cleaning tables older than this are assumed reset
+HISTORY_WINDOW = 7 * 24 * 3600  # events considered for duration estimates
+
+
+class InvalidTransition(ValueError):
+    """Requested status change is not allowed from the table's current status."""
+
+
+def _predecessors(status: str) -> List[str]:
+    return [s for s, nxt in TRANSITIONS.items() if status in nxt]
+
+
+def transition(table_ids: Sequence[str], status: str, now: Optional[float] = None) -> None:
+    """Move every table in table_ids to status, atomically and only along TRANSITIONS."""
+    if status not in TRANSITIONS:
+        raise InvalidTransition(f'unknown status {status!r}')
+    try:
+        db.set_status_if(table_ids, status, _predecessors(status), now=now)
+    except db.ReservationConflict as e:
+        raise InvalidTransition(f'table {e.args[0]} cannot move to {status}') from None
+
+
+def seat(table_ids: Sequence[str]) -> None:
+    transition(table_ids, 'Seated')
+    eventlog.record('seat', tables=table_ids)
+
+
+def release(table_ids: Sequence[str]) -> str:
+    """Free tables after a party leaves (-> Cleaning) or cancels (-> Available).
+
+    Returns the new status.
+    """
+    rows = db.get_tables(table_ids)
+    if len(rows) != len(set(table_ids)):
+        raise InvalidTransition('unknown table')
+    status = 'Available' if all(r['status'] == 'Reserved' for r in rows) else 'Cleaning'
+    transition(table_ids, status)
+    eventlog.record('release', tables=table_ids, status=status)
+    return status
+
+
+def mark_clean(table_ids: Sequence[str]) -> None:
+    transition(table_ids, 'Available')
+    eventlog.record('clean', tables=table_ids)
+
+
+def phase_durations(now: Optional[float] = None) -> Dict[str, float]:
+    """Average seconds tables spend in each status, from recent table_events."""
+    now = db.now() if now is None else now
+    rows = db.get_connection().execute("""
+        SELECT status, AVG(next_at - at) AS avg_s FROM (
+            SELECT status, at, LEAD(at) OVER (PARTITION BY table_id ORDER BY at) AS next_at
+            FROM table_events WHERE at >= ?
+        ) WHERE next_at IS NOT NULL GROUP BY status
+    """, (now - HISTORY_WINDOW,)).fetchall()
+    durations = dict(DEFAULT_DURATIONS)
+    durations.update({r['status']: r['avg_s'] for r in rows if r['status'] in durations})
+    return durations
+
+
+def predict_free_times(now: Optional[float] = None) -> Dict[str, float]:
+    """Expected epoch time each table becomes Available (now for free tables)."""
+    now = db.now() if now is None else now
+    durations = phase_durations(now)
+    out = {}
+    for t in db.list_tables():
+        status, since = t['status'], t['status_since'] or now
+        if status == 'Available':
+            out[t['table_id']] = now
+            continue
+        # time left in the current phase, then the full length of the later ones
+        eta = max(now, since + durations.get(status, 0))
+        phases = list(DEFAULT_DURATIONS)
+        if status in phases:
+            eta += sum(durations[p] for p in phases[phases.index(status) + 1:])
+        out[t['table_id']] = eta
+    return out
+
+
+def tick(now: Optional[float] = None) -> Dict[str, List[str]]:
+    """Expire stale reservations and finish overdue cleaning.
+
+    Returns the table_ids freed, keyed by the status they were in.
+    """
+    now = db.now() if now is None else now
+    moved: Dict[str, List[str]] = {}
+    conn = db.get_connection()
+    for status, ttl in (('Reserved', RESERVATION_TTL), ('Cleaning', CLEANING_TTL)):
+        stale = [r['table_id'] for r in conn.execute(
+            "SELECT table_id FROM tables WHERE status = ? AND status_since <= ?",
+            (status, now - ttl))]
+        for tid in stale:
+            try:
+                # one at a time so a table seated meanwhile does not block the rest
+                db.set_status_if([tid], 'Available', (status,), now=now)
+                moved.setdefault(status, []).append(tid)
+            except db.ReservationConflict:
+                pass
+    return moved
+
+
+class TurnoverScheduler(threading.Thread):
+    """Background thread that calls tick() every ``interval`` seconds.
+
+    db_paths, if given, returns the DB files to tick on each pass (one per
+    site); otherwise only the default DB is ticked. Each of hooks is called
+    with no arguments after tick(), with the same DB active. A failing tick
+    or hook (e.g. a DB locked by another worker) is logged and retried on
+    the next pass; it never stops the thread.
+    """
+
+    def __init__(self, interval: float = 30.0, db_paths: Optional[Callable[[], Iterable[str]]] = None,
+                 hooks: Sequence[Callable[[], Any]] = ()):
+        super().__init__(name='turnover-scheduler', daemon=True)
+        self.interval = interval
+        self.db_paths = db_paths
+        self.hooks = list(hooks)
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                paths = list(self.db_paths()) if self.db_paths else [None]
+            except Exception:
+                logger.exception('turnover scheduler: listing DB files failed')
+                continue
+            for path in paths:
+                with db.use_db(path):
+                    for fn in (tick, *self.hooks):
+                        try:
+                            fn()
+                        except Exception:
+                            logger.exception('turnover scheduler: %s failed for %s',
+                                             getattr(fn, '__name__', fn), path or db.current_db())
+        db.close_connection()
+
+    def stop(self) -> None:
+        self._stop_event.set()
@@ -0,0 +1,190 @@
+"""In-process metrics in Prometheus text format, plus an on-demand profiler.
+
+Dependency-free counters and histograms shared by the API, allocator,
+planner and DB layer. Recording is switched off with RECEPTIONIST_METRICS=0
+(or set_enabled(False)); every record call then returns after one flag
+check. Each worker process keeps its own registry.
+"""
+import cProfile
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+enabled = os.environ.get("RECEPTIONIST_METRICS", "1") != "0"
+
+# seconds; API calls and SQLite statements are sub-millisecond when healthy
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# node / cell counts
+SIZE_BUCKETS = (1, 4, 16, 64, 256, 1024, 4096, 16384, 65536)
+
+
+REGISTRY: List[object] = []
+
+
+def set_enabled(flag: bool) -> None:
+    global enabled
+    enabled = flag
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        if not enabled:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, v in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {v:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *labels: str) -> None:
+        if not enabled:
+            return
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += n
+                    le = 'le="%s"' % ("+Inf" if bound == float("inf") else f"{bound:g}")
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total:g}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    """All metrics in Prometheus text exposition format (version 0.0.4)."""
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+# --- Metrics recorded across the package -----------------------------------
+
+HTTP_LATENCY = Histogram("receptionist_http_request_duration_seconds",
+                         "API request latency by endpoint.", ("endpoint", "method", "status"))
+ALLOCATIONS = Counter("receptionist_allocator_allocations_total",
+                      "Table choices by stage: single, combination or none.", ("stage",))
+ALLOCATION_CONFLICTS = Counter("receptionist_allocator_conflicts_total",
+                               "Reservations lost to a concurrent writer and retried.")
+WAITLIST_SEATED = Counter("receptionist_waitlist_seated_total",
+                          "Waitlisted parties seated automatically when tables came free.")
+TABLES_SCANNED = Counter("receptionist_allocator_tables_scanned_total",
+                         "Candidate tables and units examined while choosing.")
+PLANNER_EXPANDED = Histogram("receptionist_planner_nodes_expanded",
+                             "A* nodes expanded per plan_path call.", buckets=SIZE_BUCKETS)
+PLANNER_OPEN_PEAK = Histogram("receptionist_planner_open_set_peak",
+                              "Largest A* open set per plan_path call.", buckets=SIZE_BUCKETS)
+PLANNER_PATH_LENGTH = Histogram("receptionist_planner_path_length",
+                                "Cells in the returned path (0 if none).", buckets=SIZE_BUCKETS)
+DISTANCE_FIELDS = Counter("receptionist_floor_map_fields_built_total",
+                          "BFS distance fields built by FloorMap (cache misses).")
+DB_QUERY_LATENCY = Histogram("receptionist_db_query_duration_seconds",
+                             "SQLite statement latency by operation and table.", ("op", "table"))
+
+
+# --- Profiling ----------------------------------------------------------------
+
+profile_dir: Optional[str] = os.environ.get("RECEPTIONIST_PROFILE_DIR") or None
+# cProfile allows one active profiler per process on newer Pythons, so
+# concurrent requests are skipped rather than profiled
+_profile_lock = threading.Lock()
+_profile_seq = 0
+# dumps kept per process; older ones are deleted as new ones are written
+PROFILE_MAX_FILES = int(os.environ.get("RECEPTIONIST_PROFILE_MAX_FILES", "200"))
+_profile_files: Deque[str] = deque()
+
+
+def set_profiling(directory: Optional[str]) -> None:
+    """Dump a cProfile file per request into directory; None switches it off."""
+    global profile_dir
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    profile_dir = directory or None
+
+
+def start_profile() -> Optional[cProfile.Profile]:
+    if profile_dir is None or not _profile_lock.acquire(blocking=False):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # another profiler (e.g. a debugger) is active
+        _profile_lock.release()
+        return None
+    return profiler
+
+
+def finish_profile(profiler: cProfile.Profile, name: str) -> Optional[str]:
+    """Stop profiler and write its stats; returns the .prof path.
+
+    Nothing is written if profiling was switched off meanwhile. Only the
+    last PROFILE_MAX_FILES dumps are kept.
+    """
+    global _profile_seq
+    try:
+        profiler.disable()
+        if profile_dir is None:
+            return None
+        _profile_seq += 1
+        path = os.path.join(profile_dir, f"{name}-{int(time.time() * 1000)}-{_profile_seq}.prof")
+        profiler.dump_stats(path)
+        _profile_files.append(path)
+        while len(_profile_files) > PROFILE_MAX_FILES:
+            try:
+                os.remove(_profile_files.popleft())
+            except OSError:
+                pass  # already gone
+        return path
+    finally:
+        _profile_lock.release()
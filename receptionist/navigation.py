@@ -1,8 +1,17 @@
+import re
+from array import array
+from collections import OrderedDict, deque
 from heapq import heappush, heappop
-from typing import List, Tuple
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple
+
+from . import metrics
 
 GridPos = Tuple[int, int]
 
+# largest grid plan_path() sizes for itself: a thousand cells a side
+# covers any floor, and keeps one query's search (and memory) bounded
+MAX_GRID_CELLS = 1_000_000
+
 def heuristic(a: GridPos, b: GridPos) -> int:
     return abs(a[0]-b[0]) + abs(a[1]-b[1])
 
@@ -10,36 +19,247 @@ def neighbors(pos: GridPos) -> List[GridPos]:
     x, y = pos
     return [(x+1,y),(x-1,y),(x,y+1),(x,y-1)]
 
-def plan_path(start: GridPos, goal: GridPos, obstacles: List[GridPos] = []) -> List[GridPos]:
-    """Simple A* path planner on a grid with static obstacles.
+class OccupancyGrid:
+    """Bounded occupancy grid backed by a flat bytearray.
+
+    Cells are addressed by integer index ``y * width + x``. Searches on the
+    grid use preallocated flat arrays for scores and parents instead of
+    tuple-keyed dicts, so their cost is bounded by ``width * height``.
+    """
+
+    def __init__(self, width: int, height: int, obstacles: Iterable[GridPos] = ()):
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.blocked = bytearray(self.size)
+        for pos in obstacles:
+            if self.in_bounds(pos):
+                self.blocked[self.index(pos)] = 1
+
+    @classmethod
+    def around(cls, cells: Iterable[GridPos], margin: int = 1) -> Tuple["OccupancyGrid", GridPos]:
+        """Smallest grid covering cells plus a free margin, and its origin offset.
+
+        With a one-cell margin, a shortest path on this grid is as short as
+        on the unbounded plane: any detour outside it can be slid onto the
+        obstacle-free border ring. Raises ValueError if that grid would have
+        more than MAX_GRID_CELLS cells.
+        """
+        min_x, min_y, width, height = cls.extent(cells, margin)
+        if width * height > MAX_GRID_CELLS:
+            raise ValueError(f'cells span {width}x{height}, more than {MAX_GRID_CELLS} cells')
+        return cls(width, height), (min_x, min_y)
+
+    @staticmethod
+    def extent(cells: Iterable[GridPos], margin: int = 1) -> Tuple[int, int, int, int]:
+        """(min x, min y, width, height) of the grid around() would build."""
+        cells = list(cells)
+        min_x = min(c[0] for c in cells) - margin
+        min_y = min(c[1] for c in cells) - margin
+        width = max(c[0] for c in cells) + margin - min_x + 1
+        height = max(c[1] for c in cells) + margin - min_y + 1
+        return min_x, min_y, width, height
+
+    def copy(self) -> "OccupancyGrid":
+        grid = OccupancyGrid(self.width, self.height)
+        grid.blocked[:] = self.blocked
+        return grid
+
+    def in_bounds(self, pos: GridPos) -> bool:
+        return 0 <= pos[0] < self.width and 0 <= pos[1] < self.height
+
+    def index(self, pos: GridPos) -> int:
+        return pos[1] * self.width + pos[0]
+
+    def pos(self, i: int) -> GridPos:
+        return (i % self.width, i // self.width)
+
+    def passable(self, pos: GridPos) -> bool:
+        return self.in_bounds(pos) and not self.blocked[self.index(pos)]
+
+    def set_blocked(self, pos: GridPos, blocked: bool = True) -> None:
+        self.blocked[self.index(pos)] = 1 if blocked else 0
+
+    def neighbor_indices(self, i: int) -> List[int]:
+        """In-bounds, unblocked 4-neighbours of cell i (same order as neighbors())."""
+        w = self.width
+        x = i % w
+        out = []
+        blocked = self.blocked
+        if x + 1 < w and not blocked[i + 1]:
+            out.append(i + 1)
+        if x > 0 and not blocked[i - 1]:
+            out.append(i - 1)
+        if i + w < self.size and not blocked[i + w]:
+            out.append(i + w)
+        if i >= w and not blocked[i - w]:
+            out.append(i - w)
+        return out
+
+    def astar(self, start: int, goal: int, stats: Optional[dict] = None) -> List[int]:
+        """A* between cell indices; returns the index path or [] if unreachable.
+
+        If stats is given, 'expanded' and 'open_peak' are stored in it.
+        """
+        if stats is not None:
+            stats['expanded'] = stats['open_peak'] = 0
+        if self.blocked[start] or self.blocked[goal]:
+            return []
+        w = self.width
+        gx, gy = goal % w, goal // w
+        gscore = array('i', [-1]) * self.size
+        came_from = array('i', [-1]) * self.size
+        gscore[start] = 0
+        open_set = [(abs(start % w - gx) + abs(start // w - gy), 0, start)]
+        expanded = peak = 0
+        while open_set:
+            if len(open_set) > peak:
+                peak = len(open_set)
+            _, cost, current = heappop(open_set)
+            if current == goal:
+                if stats is not None:
+                    stats['expanded'], stats['open_peak'] = expanded, peak
+                path = [current]
+                while current != start:
+                    current = came_from[current]
+                    path.append(current)
+                path.reverse()
+                return path
+            if cost > gscore[current]:
+                continue  # stale heap entry
+            expanded += 1
+            tentative = cost + 1
+            for n in self.neighbor_indices(current):
+                g = gscore[n]
+                if g < 0 or tentative < g:
+                    gscore[n] = tentative
+                    came_from[n] = current
+                    heappush(open_set, (tentative + abs(n % w - gx) + abs(n // w - gy), tentative, n))
+        if stats is not None:
+            stats['expanded'], stats['open_peak'] = expanded, peak
+        return []
+
+def plan_path(start: GridPos, goal: GridPos, obstacles: List[GridPos] = [],
+              grid: Optional[OccupancyGrid] = None) -> List[GridPos]:
+    """A* path planner on a bounded grid with static obstacles.
+
+    If no grid is given, one is sized to cover start, goal and obstacles
+    (plus a free border), so unreachable goals fail fast instead of
+    searching forever; ValueError if that grid would exceed MAX_GRID_CELLS.
+    """
+    offset = (0, 0)
+    if grid is None:
+        grid, offset = OccupancyGrid.around([start, goal, *obstacles])
+        ox, oy = offset
+        for x, y in obstacles:
+            grid.set_blocked((x - ox, y - oy))
+    ox, oy = offset
+    s, g = (start[0] - ox, start[1] - oy), (goal[0] - ox, goal[1] - oy)
+    if not (grid.in_bounds(s) and grid.in_bounds(g)):
+        return []
+    w = grid.width
+    if not metrics.enabled:
+        return [(i % w + ox, i // w + oy) for i in grid.astar(grid.index(s), grid.index(g))]
+    stats = {}
+    path = [(i % w + ox, i // w + oy) for i in grid.astar(grid.index(s), grid.index(g), stats)]
+    metrics.PLANNER_EXPANDED.observe(stats['expanded'])
+    metrics.PLANNER_OPEN_PEAK.observe(stats['open_peak'])
+    metrics.PLANNER_PATH_LENGTH.observe(len(path))
+    return path
+
+def line_of_sight(a: GridPos, b: GridPos, passable: Callable[[GridPos], bool]) -> bool:
+    """True if a robot can drive straight from cell a to cell b.
+
+    Walks every cell the segment between the two cell centres passes
+    through. Where it crosses exactly through a grid corner, both cells
+    beside the corner must be free too, so a route never clips an obstacle.
+    """
+    (x, y), (x1, y1) = a, b
+    dx, dy = abs(x1 - x), abs(y1 - y)
+    sx = 1 if x1 > x else -1
+    sy = 1 if y1 > y else -1
+    ix = iy = 0
+    while ix < dx or iy < dy:
+        d = (1 + 2 * ix) * dy - (1 + 2 * iy) * dx
+        if d == 0:
+            if not (passable((x + sx, y)) and passable((x, y + sy))):
+                return False
+            x, y, ix, iy = x + sx, y + sy, ix + 1, iy + 1
+        elif d < 0:
+            x, ix = x + sx, ix + 1
+        else:
+            y, iy = y + sy, iy + 1
+        if not passable((x, y)):
+            return False
+    return True
+
+def smooth_path(path: Sequence[GridPos], passable: Callable[[GridPos], bool]) -> List[GridPos]:
+    """Turning points of a cell path: line-of-sight pruning (string pulling).
+
+    Keeps the start, the goal and each cell the robot must turn at, so that
+    consecutive waypoints are joined by free straight segments. A staircase
+    across an open floor becomes a single segment.
+    """
+    if len(path) < 3:
+        return list(path)
+    out = [path[0]]
+    anchor = path[0]
+    for k in range(1, len(path) - 1):
+        if not line_of_sight(anchor, path[k + 1], passable):
+            anchor = path[k]
+            out.append(anchor)
+    out.append(path[-1])
+    return out
+
+# unit steps of a cell path as run-length codes: x grows to the right, y downwards
+_STEP_CODES = {(1, 0): 'R', (-1, 0): 'L', (0, 1): 'D', (0, -1): 'U'}
+_CODE_STEPS = {c: step for step, c in _STEP_CODES.items()}
+_RUN_RE = re.compile(r'([RLDU])(\d+)')
+
+def encode_runs(path: Sequence[GridPos]) -> str:
+    """Run-length direction codes for a 4-connected cell path, e.g. "R12D3L2"."""
+    out = []
+    prev, code, count = None, None, 0
+    for pos in path:
+        if prev is not None:
+            c = _STEP_CODES[(pos[0] - prev[0], pos[1] - prev[1])]
+            if c == code:
+                count += 1
+            else:
+                if code:
+                    out.append(f'{code}{count}')
+                code, count = c, 1
+        prev = pos
+    if code:
+        out.append(f'{code}{count}')
+    return ''.join(out)
 
-    This is a lightweight simulator for demonstration.
+def decode_runs(start: GridPos, runs: str) -> List[GridPos]:
+    """Inverse of encode_runs(): the cell path from start."""
+    x, y = start
+    path = [(x, y)]
+    for code, count in _RUN_RE.findall(runs):
+        sx, sy = _CODE_STEPS[code]
+        for _ in range(int(count)):
+            x, y = x + sx, y + sy
+            path.append((x, y))
+    return path
+
+# how /api/get_path and /api/plan_path can return a route
+PATH_FORMATS = ('cells', 'waypoints', 'runs')
+
+def path_payload(path: List[GridPos], fmt: str, passable: Callable[[GridPos], bool]) -> dict:
+    """A cell path as an API response body.
+
+    cells: every cell (the default); waypoints: only the turning points,
+    see smooth_path(); runs: the start cell plus encode_runs().
     """
-    obstacle_set = set(obstacles)
-    open_set = []
-    heappush(open_set, (0 + heuristic(start, goal), 0, start))
-    came_from = {start: None}
-    gscore = {start: 0}
-
-    while open_set:
-        _, cost, current = heappop(open_set)
-        if current == goal:
-            # reconstruct path
-            path = []
-            node = current
-            while node:
-                path.append(node)
-                node = came_from[node]
-            return list(reversed(path))
-        for n in neighbors(current):
-            if n in obstacle_set:
-                continue
-            tentative = gscore[current] + 1
-            if tentative < gscore.get(n, 1e9):
-                came_from[n] = current
-                gscore[n] = tentative
-                heappush(open_set, (tentative + heuristic(n, goal), tentative, n))
-    return []
+    if fmt == 'waypoints':
+        return {'format': fmt, 'path': smooth_path(path, passable)}
+    if fmt == 'runs':
+        return {'format': fmt, 'start': path[0] if path else None, 'runs': encode_runs(path),
+                'steps': max(len(path) - 1, 0)}
+    return {'path': path}
 
 def avoid_obstacle(path: List[GridPos], dynamic_obstacle: GridPos) -> List[GridPos]:
     """Given a planned path and a dynamic obstacle, compute a small detour.
@@ -59,3 +279,129 @@ def avoid_obstacle(path: List[GridPos], dynamic_obstacle: GridPos) -> List[GridP
             return new_path
     # fallback: return original but robot should stop
     return path
+
+class FloorMap:
+    """Static, bounded floor with cached BFS distance fields.
+
+    A distance field for cell g holds, per cell index, the step count from g
+    (-1 where unreachable), so a shortest path from any start to g is found
+    by walking downhill in O(path length) instead of running a search.
+    Fields for the landmarks (home position, tables) are built up front;
+    others are built on demand and kept in a small LRU. Changing the
+    obstacle set only drops the fields that the changed cells can affect.
+    """
+
+    def __init__(self, width: int, height: int, obstacles: Iterable[GridPos] = (),
+                 landmarks: Iterable[GridPos] = (), max_fields: int = 64):
+        self.obstacles = set(obstacles)
+        self.grid = OccupancyGrid(width, height, self.obstacles)
+        self.width = width
+        self.height = height
+        self.landmarks = set(landmarks)
+        self.max_fields = max_fields
+        self._fields: "OrderedDict[GridPos, array]" = OrderedDict()
+        for goal in self.landmarks:
+            self.distance_field(goal)
+
+    def passable(self, pos: GridPos) -> bool:
+        return self.grid.passable(pos)
+
+    def covers(self, start: GridPos, goal: GridPos, obstacles: Iterable[GridPos]) -> bool:
+        """Can plan_path(start, goal, obstacles) be answered from this map's fields?"""
+        return set(obstacles) == self.obstacles and self.passable(start) and self.passable(goal)
+
+    def distance_field(self, goal: GridPos) -> array:
+        field = self._fields.get(goal)
+        if field is not None:
+            self._fields.move_to_end(goal)
+            return field
+        metrics.DISTANCE_FIELDS.inc()
+        grid = self.grid
+        field = array('i', [-1]) * grid.size
+        if grid.passable(goal):
+            g = grid.index(goal)
+            field[g] = 0
+            queue = deque([g])
+            w, size, blocked = grid.width, grid.size, grid.blocked
+            # neighbour checks inlined: this loop touches every reachable cell
+            while queue:
+                cur = queue.popleft()
+                d = field[cur] + 1
+                x = cur % w
+                for n, ok in ((cur + 1, x + 1 < w), (cur - 1, x > 0),
+                              (cur + w, cur + w < size), (cur - w, cur >= w)):
+                    if ok and field[n] < 0 and not blocked[n]:
+                        field[n] = d
+                        queue.append(n)
+        self._fields[goal] = field
+        # evict least recently used non-landmark fields
+        while len(self._fields) > max(self.max_fields, len(self.landmarks)):
+            victim = next(g for g in self._fields if g not in self.landmarks)
+            del self._fields[victim]
+        return field
+
+    def path(self, start: GridPos, goal: GridPos) -> List[GridPos]:
+        """Shortest path start -> goal using whichever end already has a field."""
+        if not (self.grid.in_bounds(start) and self.grid.in_bounds(goal)):
+            return []
+        if goal in self._fields or start not in self._fields:
+            return self._descend(start, self.distance_field(goal))
+        return list(reversed(self._descend(goal, self.distance_field(start))))
+
+    def approach_point(self, targets: Sequence[GridPos], start: GridPos) -> Optional[GridPos]:
+        """Where to lead a guest seated across several tables.
+
+        The reachable cell that minimises the farthest (Manhattan) walk to
+        any target, then the robot's route length from start. For a single
+        target that is the target itself. On an open floor the minimax cell
+        lies in the targets' bounding box; the box is scanned with a one-cell
+        margin so a blocked centre still yields a neighbouring cell.
+        """
+        if not targets:
+            return None
+        field = self.distance_field(start)
+        grid = self.grid
+        best, best_key = None, None
+        for x in range(min(t[0] for t in targets) - 1, max(t[0] for t in targets) + 2):
+            for y in range(min(t[1] for t in targets) - 1, max(t[1] for t in targets) + 2):
+                if not grid.in_bounds((x, y)):
+                    continue
+                route = field[grid.index((x, y))]
+                if route < 0:
+                    continue
+                key = (max(heuristic((x, y), t) for t in targets), route)
+                if best_key is None or key < best_key:
+                    best, best_key = (x, y), key
+        return best
+
+    def _descend(self, start: GridPos, field: array) -> List[GridPos]:
+        grid = self.grid
+        cur = grid.index(start)
+        d = field[cur]
+        if d < 0:
+            return []
+        path = [start]
+        while d:
+            d -= 1
+            cur = next(n for n in grid.neighbor_indices(cur) if field[n] == d)
+            path.append(grid.pos(cur))
+        return path
+
+    def set_obstacles(self, obstacles: Iterable[GridPos]) -> None:
+        """Replace the static obstacle set, dropping only affected fields."""
+        new = {p for p in obstacles if self.grid.in_bounds(p)}
+        changed = new ^ self.obstacles
+        self.obstacles = new
+        if not changed:
+            return
+        for c in changed:
+            self.grid.set_blocked(c, c in new)
+        # a field changes only if a changed cell is in it (now blocked) or
+        # borders it (now open); unreachable regions are unaffected
+        touched = {self.grid.index(p) for c in changed for p in [c, *neighbors(c)]
+                   if self.grid.in_bounds(p)}
+        stale = [g for g, field in self._fields.items() if any(field[i] >= 0 for i in touched)]
+        for goal in stale:
+            del self._fields[goal]
+        for goal in self.landmarks:
+            self.distance_field(goal)
@@ -1,22 +1,58 @@
+import json
+import math
+import os
+import random
 import re
-from typing import Optional
+import threading
+import zlib
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
 NUMBER_WORDS = {
     "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4,
     "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9,
-    "ten": 10, "eleven": 11, "twelve": 12
+    "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13, "fourteen": 14,
+    "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18, "nineteen": 19,
+    "couple": 2, "dozen": 12,
 }
+TENS_WORDS = {
+    "twenty": 20, "thirty": 30, "forty": 40, "fifty": 50,
+    "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90,
+}
+# nouns that stand for people in the party; a preceding number multiplies them
+PEOPLE_WORDS = frozenset({
+    "wife", "husband", "partner", "friend", "friends", "guest", "guests",
+    "son", "sons", "daughter", "daughters", "child", "children", "kid", "kids",
+    "adult", "adults", "people", "person", "persons", "others", "colleague",
+    "colleagues", "mom", "mum", "dad", "mother", "father", "parents", "baby",
+    "boyfriend", "girlfriend", "brother", "sister", "grandma", "grandpa",
+})
+# nouns a number counts the whole party with ("for 3 people"): the speaker is in it
+TOTAL_WORDS = frozenset({"people", "person", "persons"})
+SELF_WORDS = frozenset({"me", "i", "myself"})
+# words allowed between a number and the noun it counts ("two of my friends")
+FILLER_WORDS = frozenset({"of", "my", "our", "more", "other", "little", "young", "small", "the"})
 
-def _word_to_number(token: str) -> Optional[int]:
-    token = token.lower()
-    if token.isdigit():
-        return int(token)
-    if token in NUMBER_WORDS:
-        return NUMBER_WORDS[token]
-    # handle 'a' as 1
-    if token in ("a", "an"):
-        return 1
-    return None
+_TOKEN_RE = re.compile(r"\d+|[a-z]+")
+# clock times ("8pm", "7:30 p.m.", "9 o'clock"), also as normalize() leaves them
+_TIME_RE = re.compile(r"\b\d{1,2}(?:[: ]\d{2})?\s*(?:[ap]\.?\s?m\b\.?|o'?\s?clock\b)")
+
+def _number_at(tokens: List[str], i: int) -> Tuple[Optional[int], int]:
+    """Read a number starting at tokens[i]; returns (value, next index)."""
+    tok = tokens[i]
+    if tok.isdigit():
+        return int(tok), i + 1
+    if tok in TENS_WORDS:
+        # compound: "twenty two" / "twenty-two"
+        value = TENS_WORDS[tok]
+        if i + 1 < len(tokens):
+            unit = NUMBER_WORDS.get(tokens[i + 1])
+            if unit is not None and 0 < unit < 10:
+                return value + unit, i + 2
+        return value, i + 1
+    if tok in NUMBER_WORDS:
+        return NUMBER_WORDS[tok], i + 1
+    return None, i + 1
 
 def parse_party_size(text: str) -> Optional[int]:
     """Basic heuristic NLP to extract party size from a phrase.
@@ -25,43 +61,230 @@ def parse_party_size(text: str) -> Optional[int]:
       - "a table for six" -> 6
       - "just me and my wife" -> 2
       - "I have two friends with me" -> 3
+      - "me, my wife and three kids" -> 5
+      - "twenty two people" -> 22
 
-    This is intentionally simple for an offline simulation. For production,
-    integrate a proper NLU engine (Dialogflow/Rasa).
+    Single pass over precompiled tokens: counted nouns ("three kids",
+    "my wife") are summed and the speaker is added once, unless a number
+    already counts everyone ("for 3 people", "for two adults"); failing
+    that, a number after "for", then any other number (+1 if "me" is said),
+    then a lone "me" decides. Clock times ("for 8pm") are not counts. This is intentionally simple for an offline
+    simulation. For production, integrate a proper NLU engine (Dialogflow/Rasa).
     """
     if not text:
         return None
-    text = text.lower()
-
-    # common patterns
-    # look for explicit "for X"
-    m = re.search(r"for (\w+)", text)
-    if m:
-        num = _word_to_number(m.group(1))
-        if num is not None:
-            return num
-
-    # look for explicit numbers
-    tokens = re.findall(r"\w+", text)
-    # count occurrences like 'me and my wife' -> count pronouns/people words
-    people_words = {"me", "i", "wife", "husband", "friend", "friends", "guest", "guests", "son", "daughter", "child", "kids"}
-    people_count = sum(1 for t in tokens if t in people_words)
-    # heuristics: if phrase contains 'me' plus another person words, count them
-    if people_count >= 2:
-        return people_count
-
-    # try to find any number word in tokens
-    for t in tokens:
-        n = _word_to_number(t)
-        if n is not None:
-            # special case: "two friends and me" -> friends(2) + me(1)
-            if 'me' in tokens and t not in ('me', 'i'):
-                # sum number + 1
-                return n + 1
-            return n
-
-    # fallback: if phrase mentions "just me" or "just me and my wife"
-    if 'just me' in text or text.strip() in ("me", "just me"):
+    tokens = _TOKEN_RE.findall(_TIME_RE.sub(" ", text.lower()))
+    people = 0
+    seen_people = False
+    total = False  # a number counted the whole party, speaker included
+    speaker = False  # "me"/"i"/"myself" said
+    me = False  # "me"/"myself" said; "i" alone is not a party of one
+    after_for = False
+    explicit: Optional[int] = None  # first number right after "for"
+    bare: Optional[int] = None  # first other number not counting a noun
+    pending: Optional[int] = None  # number waiting to see what it counts
+    pending_for = False
+    pending_article = False  # "a"/"an" only counts in front of a noun
+
+    tokens.append("")  # end marker: flushes any pending number
+    i, n = 0, len(tokens)
+    while i < n:
+        tok = tokens[i]
+        value, j = _number_at(tokens, i) if tok else (None, i + 1)
+        article = value is None and tok in ("a", "an")
+        if article:
+            value = 1
+        counts_pending = value is None and (tok in PEOPLE_WORDS or tok in FILLER_WORDS)
+        if pending is not None and not counts_pending:
+            # the pending number did not count a noun: keep it as a fallback
+            if not pending_article:
+                if pending_for and explicit is None:
+                    explicit = pending
+                elif bare is None:
+                    bare = pending
+            pending = None
+        if value is not None:
+            pending, pending_for, pending_article = value, after_for, article
+            after_for = False
+            i = j
+            continue
+        if tok in PEOPLE_WORDS:
+            if pending is not None and (pending_for or tok in TOTAL_WORDS):
+                total = True
+            people += 1 if pending is None else pending
+            seen_people = True
+            pending = None
+        elif tok in SELF_WORDS:
+            speaker = True
+            me = me or tok != "i"
+        after_for = tok == "for"
+        i += 1
+
+    if seen_people:
+        return people + (1 if speaker and not total else 0)
+    if explicit is not None:
+        return explicit
+    if bare is not None:
+        # "two and me" -> 3
+        return bare + 1 if me else bare
+    if me:
         return 1
+    return None
+
+def parse_party_sizes(texts: Iterable[str]) -> List[Optional[int]]:
+    """Batch form of parse_party_size, in input order."""
+    return [parse_party_size(t) for t in texts]
+
+
+# --- Offline NLU pipeline -------------------------------------------------
+#
+# normalize -> intent classifier -> slot extractors, memoized on the
+# normalized utterance. Everything runs locally in well under a millisecond.
+
+INTENTS_FILE = os.path.join(os.path.dirname(__file__), "intents.jsonl")
+_FEATURE_BITS = 14
+
+SEATING_WORDS = {
+    "outside": "outdoor", "outdoor": "outdoor", "outdoors": "outdoor", "terrace": "outdoor",
+    "patio": "outdoor", "garden": "outdoor", "inside": "indoor", "indoor": "indoor",
+    "indoors": "indoor", "window": "window", "booth": "booth", "bar": "bar",
+    "quiet": "quiet", "corner": "quiet",
+}
+_NAME_RE = re.compile(r"\b(?:under|name is|booking for|reservation for|booked for)"
+                      r"(?: the name)?\s+([a-z][a-z'-]+)")
+_NOT_NAMES = frozenset(NUMBER_WORDS) | frozenset(TENS_WORDS) | SELF_WORDS | {"a", "an", "the", "us", "my"}
+
+def normalize(text: str) -> str:
+    """Lowercase and collapse to word/number tokens; the NLU cache key."""
+    return " ".join(_TOKEN_RE.findall((text or "").lower()))
+
+def _features(tokens: Sequence[str]) -> List[int]:
+    """Hashed unigram + bigram feature ids (crc32, so stable across runs)."""
+    mask = (1 << _FEATURE_BITS) - 1
+    grams = list(tokens) + [a + " " + b for a, b in zip(tokens, tokens[1:])]
+    return [zlib.crc32(g.encode()) & mask for g in grams] + [mask + 1]  # + bias
+
+class IntentClassifier:
+    """Averaged multi-class perceptron over hashed n-gram features."""
+
+    def __init__(self, labels: Sequence[str] = ()):
+        self.labels = list(labels)
+        self.weights: Dict[str, Dict[int, float]] = {label: {} for label in self.labels}
+
+    @classmethod
+    def from_jsonl(cls, path: str = INTENTS_FILE, epochs: int = 12, seed: int = 0) -> "IntentClassifier":
+        with open(path) as fh:
+            rows = [json.loads(line) for line in fh if line.strip()]
+        return cls.train([(r["text"], r["intent"]) for r in rows], epochs=epochs, seed=seed)
 
+    @classmethod
+    def train(cls, examples: Sequence[Tuple[str, str]], epochs: int = 12, seed: int = 0) -> "IntentClassifier":
+        model = cls(sorted({label for _, label in examples}))
+        data = [(_features(normalize(t).split()), label) for t, label in examples]
+        rng = random.Random(seed)
+        # averaged perceptron: keep running totals so the final weights are a
+        # mean over all updates, which generalises much better on tiny corpora
+        totals = {label: {} for label in model.labels}
+        stamps = {label: {} for label in model.labels}
+        step = 0
+        for _ in range(epochs):
+            rng.shuffle(data)
+            for feats, gold in data:
+                step += 1
+                guess = model._best(feats)[0]
+                if guess == gold:
+                    continue
+                for label, delta in ((gold, 1.0), (guess, -1.0)):
+                    w, tot, st = model.weights[label], totals[label], stamps[label]
+                    for f in feats:
+                        tot[f] = tot.get(f, 0.0) + (step - st.get(f, 0)) * w.get(f, 0.0)
+                        st[f] = step
+                        w[f] = w.get(f, 0.0) + delta
+        for label in model.labels:
+            w, tot, st = model.weights[label], totals[label], stamps[label]
+            model.weights[label] = {
+                f: (tot.get(f, 0.0) + (step - st.get(f, 0)) * v) / step for f, v in w.items()}
+        return model
+
+    def _scores(self, feats: Sequence[int]) -> Dict[str, float]:
+        return {label: sum(w.get(f, 0.0) for f in feats) for label, w in self.weights.items()}
+
+    def _best(self, feats: Sequence[int]) -> Tuple[str, float]:
+        scores = self._scores(feats)
+        label = max(self.labels, key=scores.__getitem__)
+        return label, scores[label]
+
+    def predict(self, normalized: str) -> Tuple[str, float]:
+        """(intent, confidence) where confidence is the softmax of the scores."""
+        scores = self._scores(_features(normalized.split()))
+        top = max(scores.values())
+        exp = {label: math.exp(v - top) for label, v in scores.items()}
+        label = max(exp, key=exp.__getitem__)
+        return label, exp[label] / sum(exp.values())
+
+def extract_name(normalized: str) -> Optional[str]:
+    m = _NAME_RE.search(normalized)
+    if m and m.group(1) not in _NOT_NAMES:
+        return m.group(1).title()
     return None
+
+def extract_seating(normalized: str) -> Optional[str]:
+    for tok in normalized.split():
+        pref = SEATING_WORDS.get(tok)
+        if pref:
+            return pref
+    return None
+
+# slot name -> extractor(normalized text) -> value or None
+Extractor = Callable[[str], object]
+
+class NLUPipeline:
+    """Pluggable offline NLU: intent classifier plus named slot extractors.
+
+    Results are memoized in an LRU keyed on the normalized utterance, since
+    kiosks hear the same handful of phrases over and over.
+    """
+
+    def __init__(self, classifier: Optional[IntentClassifier] = None,
+                 extractors: Optional[Dict[str, Extractor]] = None, cache_size: int = 4096):
+        self.classifier = classifier
+        self.extractors: Dict[str, Extractor] = dict(extractors or {
+            "party_size": parse_party_size,
+            "name": extract_name,
+            "seating": extract_seating,
+        })
+        self._run_cached = lru_cache(maxsize=cache_size)(self._run)
+
+    def add_extractor(self, slot: str, fn: Extractor) -> None:
+        self.extractors[slot] = fn
+        self._run_cached.cache_clear()
+
+    def _run(self, normalized: str) -> Tuple[str, float, Tuple[Tuple[str, object], ...]]:
+        intent, confidence = ("unknown", 0.0)
+        if self.classifier is not None and normalized:
+            intent, confidence = self.classifier.predict(normalized)
+        slots = tuple((slot, fn(normalized)) for slot, fn in self.extractors.items())
+        return intent, confidence, slots
+
+    def interpret(self, text: str) -> dict:
+        intent, confidence, slots = self._run_cached(normalize(text))
+        return {"intent": intent, "confidence": round(confidence, 3), "slots": dict(slots)}
+
+    def cache_info(self):
+        return self._run_cached.cache_info()
+
+_pipeline: Optional[NLUPipeline] = None
+_pipeline_lock = threading.Lock()
+
+def get_pipeline() -> NLUPipeline:
+    """Default pipeline, trained from intents.jsonl on first use."""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = NLUPipeline(IntentClassifier.from_jsonl())
+    return _pipeline
+
+def interpret(text: str) -> dict:
+    """Intent + slots (party_size, name, seating) for an utterance."""
+    return get_pipeline().interpret(text)
@@ -0,0 +1,180 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from heapq import heappush, heappop
+from typing import Iterable, List, Optional, Tuple
+
+from .navigation import GridPos, OccupancyGrid
+
+INF = float('inf')
+
+
+class DStarLite:
+    """Incremental shortest-path planner (D* Lite, Koenig & Likhachev 2002).
+
+    Searches backwards from the goal on an OccupancyGrid and keeps its g/rhs
+    values between calls, so when cells become blocked or free only the part
+    of the search those cells influence is repaired. Cells are 4-connected
+    with unit cost; blocked cells are impassable.
+    """
+
+    def __init__(self, grid: OccupancyGrid, start: GridPos, goal: GridPos):
+        self.grid = grid
+        self.start = grid.index(start)
+        self.goal = grid.index(goal)
+        self._last = self.start
+        self.km = 0
+        self.g = [INF] * grid.size
+        self.rhs = [INF] * grid.size
+        self._open: List[Tuple[float, float, int]] = []
+        self._key = {}  # cell -> key it is queued with (lazy heap deletion)
+        self.expanded = 0
+        self.rhs[self.goal] = 0
+        self._push(self.goal)
+
+    def _h(self, a: int, b: int) -> int:
+        w = self.grid.width
+        return abs(a % w - b % w) + abs(a // w - b // w)
+
+    def _calc_key(self, s: int) -> Tuple[float, float]:
+        m = min(self.g[s], self.rhs[s])
+        return (m + self._h(self.start, s) + self.km, m)
+
+    def _push(self, s: int) -> None:
+        key = self._calc_key(s)
+        self._key[s] = key
+        heappush(self._open, (key[0], key[1], s))
+
+    def _top(self) -> Tuple[float, float, int]:
+        while self._open:
+            k1, k2, s = self._open[0]
+            if self._key.get(s) == (k1, k2):
+                return k1, k2, s
+            heappop(self._open)  # stale entry
+        return INF, INF, -1
+
+    def _update_vertex(self, u: int) -> None:
+        if u != self.goal:
+            if self.grid.blocked[u]:
+                self.rhs[u] = INF
+            else:
+                g = self.g
+                self.rhs[u] = min((g[s] + 1 for s in self.grid.neighbor_indices(u)), default=INF)
+        self._key.pop(u, None)
+        if self.g[u] != self.rhs[u]:
+            self._push(u)
+
+    def _neighbors_any(self, u: int) -> List[int]:
+        # all in-bounds neighbours, blocked or not (their rhs may depend on u)
+        w, size = self.grid.width, self.grid.size
+        x = u % w
+        out = []
+        if x + 1 < w:
+            out.append(u + 1)
+        if x > 0:
+            out.append(u - 1)
+        if u + w < size:
+            out.append(u + w)
+        if u >= w:
+            out.append(u - w)
+        return out
+
+    def _compute(self) -> None:
+        g, rhs = self.g, self.rhs
+        while True:
+            k1, k2, u = self._top()
+            if u < 0:
+                break
+            start_key = self._calc_key(self.start)
+            if (k1, k2) >= start_key and rhs[self.start] == g[self.start]:
+                break
+            self.expanded += 1
+            new_key = self._calc_key(u)
+            if (k1, k2) < new_key:
+                self._push(u)
+            elif g[u] > rhs[u]:
+                g[u] = rhs[u]
+                del self._key[u]
+                heappop(self._open)
+                for p in self.grid.neighbor_indices(u):
+                    self._update_vertex(p)
+            else:
+                g[u] = INF
+                for p in [u, *self.grid.neighbor_indices(u)]:
+                    self._update_vertex(p)
+
+    def path(self) -> List[GridPos]:
+        """Current shortest path from the robot position to the goal ([] if none)."""
+        self._compute()
+        cur = self.start
+        if self.g[cur] == INF or self.grid.blocked[cur]:
+            return []
+        grid = self.grid
+        out = [grid.pos(cur)]
+        while cur != self.goal and len(out) <= grid.size:
+            cur = min(grid.neighbor_indices(cur), key=self.g.__getitem__)
+            out.append(grid.pos(cur))
+        return out
+
+    def move_to(self, pos: GridPos) -> None:
+        """Tell the planner the robot has advanced to pos (ValueError if off the grid)."""
+        if not self.grid.in_bounds(pos):
+            raise ValueError(f'position {pos} is outside the grid')
+        self.start = self.grid.index(pos)
+        self.km += self._h(self._last, self.start)
+        self._last = self.start
+
+    def set_cells(self, blocked: Iterable[GridPos] = (), cleared: Iterable[GridPos] = ()) -> None:
+        """Mark cells blocked/free and queue the vertices whose costs changed."""
+        changed = []
+        for pos, value in [(p, True) for p in blocked] + [(p, False) for p in cleared]:
+            if not self.grid.in_bounds(pos):
+                continue
+            i = self.grid.index(pos)
+            if bool(self.grid.blocked[i]) != value:
+                self.grid.blocked[i] = 1 if value else 0
+                changed.append(i)
+        for i in changed:
+            for u in [i, *self._neighbors_any(i)]:
+                self._update_vertex(u)
+
+
+class RouteSessions:
+    """Live D* Lite planners keyed by session id, with LRU and idle expiry."""
+
+    def __init__(self, max_sessions: int = 256, ttl: float = 600.0):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, Tuple[DStarLite, threading.Lock, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, grid: OccupancyGrid, start: GridPos, goal: GridPos) -> Tuple[str, DStarLite]:
+        planner = DStarLite(grid, start, goal)
+        sid = uuid.uuid4().hex
+        with self._lock:
+            self._sessions[sid] = (planner, threading.Lock(), time.monotonic())
+            self._expire()
+        return sid, planner
+
+    def get(self, sid: str) -> Optional[Tuple[DStarLite, threading.Lock]]:
+        with self._lock:
+            self._expire()
+            entry = self._sessions.get(sid)
+            if entry is None:
+                return None
+            self._sessions[sid] = (entry[0], entry[1], time.monotonic())
+            self._sessions.move_to_end(sid)
+            return entry[0], entry[1]
+
+    def close(self, sid: str) -> None:
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl
+        while self._sessions:
+            sid, (_, _, seen) = next(iter(self._sessions.items()))
+            if seen >= cutoff and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[sid]
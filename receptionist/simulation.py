@@ -0,0 +1,329 @@
+"""Discrete-event simulation of a service evening, for capacity planning.
+
+Guests arrive (a Poisson stream or a recorded trace), say what they want,
+and go through the same code the API uses: parse_party_size, the allocator,
+the waitlist and the site's floor map for the robot's escort route. Time is
+simulated -- an event heap jumps from one arrival, escort, meal or cleanup to
+the next -- so an evening takes well under a second. Each scenario runs on its
+own scratch copy of a site DB, and independent scenarios run in parallel on a
+process pool.
+
+    python -m receptionist.simulation --site rooftop --rate 60 --hours 4 --runs 8
+    python -m receptionist.simulation --scenarios scenarios.json --out report.json
+
+A scenario is a plain dict (see DEFAULTS); the report gives seat utilisation,
+guest waits, turn-aways and robot travel distributions.
+"""
+import argparse
+import heapq
+import json
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from . import db, eventlog, feed, floor, lifecycle, metrics, sites, waitlist
+from .allocator import find_table_for_party
+from .nlp import parse_party_size
+from .waitlist import fits_floor, get_waitlist
+
+DEFAULTS: Dict[str, Any] = {
+    'name': 'evening',
+    'site': sites.DEFAULT_SITE,  # layout of this site (or give 'layout' directly)
+    'seed': 0,
+    'rate_per_hour': 40.0,  # Poisson arrivals, ignored when 'trace' is given
+    'hours': 4.0,
+    'trace': None,  # [[seconds since opening, "what the guest says"], ...]
+    'party_sizes': {'1': 10, '2': 40, '3': 10, '4': 25, '5': 5, '6': 7, '8': 3},  # weights
+    'dining_minutes': 60.0,  # mean of a lognormal
+    'dining_sigma': 0.35,
+    'cleaning_minutes': 5.0,
+    'patience_minutes': 45.0,  # waitlisted guests walk away after this
+    'seconds_per_cell': 1.0,  # robot speed
+    'policy': 'waitlist',  # or 'turn-away': no waitlist when full
+}
+
+POLICIES = ('waitlist', 'turn-away')
+
+NUMBER_WORDS = ['one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten',
+                'eleven', 'twelve']
+PHRASES = ['a table for {n} please', 'table for {n}', 'we are {n}', 'there will be {d} of us',
+           'can we get a table for {n}', 'hi, {n} of us tonight']
+
+
+def poisson_arrivals(rng: random.Random, rate_per_hour: float, hours: float,
+                     party_sizes: Dict[str, float]) -> List[Tuple[float, str]]:
+    """(time, utterance) pairs with exponential gaps over the opening hours."""
+    sizes = [int(k) for k in party_sizes]
+    weights = list(party_sizes.values())
+    out, t = [], 0.0
+    while True:
+        t += rng.expovariate(rate_per_hour / 3600.0)
+        if t >= hours * 3600:
+            return out
+        n = rng.choices(sizes, weights)[0]
+        word = NUMBER_WORDS[n - 1] if n <= len(NUMBER_WORDS) else str(n)
+        out.append((t, rng.choice(PHRASES).format(n=word, d=n)))
+
+
+def summarize(values: Sequence[float]) -> Dict[str, Optional[float]]:
+    """count, mean and nearest-rank percentiles of values."""
+    if not values:
+        return {'count': 0, 'mean': None, 'p50': None, 'p90': None, 'p99': None, 'max': None}
+    s = sorted(values)
+
+    def pct(p):
+        return round(s[min(len(s) - 1, max(0, math.ceil(p * len(s)) - 1))], 3)
+    return {'count': len(s), 'mean': round(sum(s) / len(s), 3), 'p50': pct(0.5), 'p90': pct(0.9),
+            'p99': pct(0.99), 'max': round(s[-1], 3)}
+
+
+class Simulation:
+    """One scenario on one site DB; run() replays it and returns the report."""
+
+    def __init__(self, scenario: Dict[str, Any], site: sites.Site):
+        self.cfg = {**DEFAULTS, **scenario}
+        if self.cfg['policy'] not in POLICIES:
+            raise ValueError(f"unknown policy {self.cfg['policy']!r}")
+        self.site = site
+        self.rng = random.Random(self.cfg['seed'])
+        self.now = 0.0
+        self.epoch = time.time()  # wall time of simulated second 0
+        self._events: List[tuple] = []
+        self._seq = 0
+        self.guests: Dict[int, dict] = {}
+        self.queued: Dict[int, int] = {}  # waitlist entry id -> guest id
+        # per level: idle robot count and escorts waiting for one
+        self.idle = {lv: len(f['robots']) or 1 for lv, f in site.floors.items()}
+        self.robot_queue: Dict[int, List[int]] = {lv: [] for lv in site.floors}
+        self.counts = {'arrivals': 0, 'unparsed': 0, 'seated': 0, 'waitlisted': 0,
+                       'turned_away': 0, 'abandoned': 0}
+        self.waits: List[float] = []  # arrival -> at the table, seconds
+        self.robot_waits: List[float] = []
+        self.travel_cells: List[int] = []
+        self.guest_seat_seconds = 0.0
+        self.table_seat_seconds = 0.0
+
+    def schedule(self, at: float, kind: str, *args) -> None:
+        self._seq += 1
+        heapq.heappush(self._events, (at, self._seq, kind, args))
+
+    def run(self) -> Dict[str, Any]:
+        cfg = self.cfg
+        if cfg['trace'] is not None:
+            arrivals = [(float(t), str(text)) for t, text in cfg['trace']]
+        else:
+            arrivals = poisson_arrivals(self.rng, cfg['rate_per_hour'], cfg['hours'], cfg['party_sizes'])
+        for t, text in arrivals:
+            self.schedule(t, 'arrive', text)
+        started = time.perf_counter()
+        # one clock for everything the scenario stamps: waitlist entries,
+        # table_events and guest_events all run on simulated time
+        with self.site.activate(), db.use_clock(lambda: self.epoch + self.now):
+            db.init_db(force=True, layout=self.site.layout)
+            wl = get_waitlist()
+            wl.on_seated.append(self._on_waitlist_seated)
+            try:
+                while self._events:
+                    self.now, _, kind, args = heapq.heappop(self._events)
+                    getattr(self, '_' + kind)(*args)
+            finally:
+                wl.on_seated.remove(self._on_waitlist_seated)
+        wall = time.perf_counter() - started
+        return self.report(wall)
+
+    # --- events ---------------------------------------------------------------
+
+    def _arrive(self, text: str) -> None:
+        self.counts['arrivals'] += 1
+        size = parse_party_size(text)
+        if size is None:
+            self.counts['unparsed'] += 1
+            return
+        gid = len(self.guests)
+        guest = self.guests[gid] = {'size': size, 'arrived': self.now}
+        tables = find_table_for_party(size)
+        if tables:
+            self._escort(gid, tables)
+        elif self.cfg['policy'] == 'waitlist' and fits_floor(size):
+            self.counts['waitlisted'] += 1
+            entry = get_waitlist().enqueue(size)
+            if entry['status'] == 'Seated':  # tables freed up meanwhile
+                self._escort(gid, entry['tables'])
+                return
+            self.queued[entry['id']] = gid
+            guest['entry'] = entry['id']
+            self.schedule(self.now + self.cfg['patience_minutes'] * 60, 'give_up', gid)
+        else:
+            self.counts['turned_away'] += 1
+
+    def _on_waitlist_seated(self, entry_id: int, tables: List[str]) -> None:
+        gid = self.queued.pop(entry_id, None)
+        if gid is not None:
+            self._escort(gid, tables)
+
+    def _give_up(self, gid: int) -> None:
+        entry_id = self.guests[gid].get('entry')
+        if entry_id in self.queued and get_waitlist().cancel(entry_id):
+            del self.queued[entry_id]
+            self.counts['abandoned'] += 1
+
+    def _escort(self, gid: int, tables: List[str]) -> None:
+        rows = db.get_tables(tables)
+        guest = self.guests[gid]
+        guest.update(tables=tables, level=rows[0]['floor'], seats=sum(r['capacity'] for r in rows),
+                     cells=[(r['x'], r['y']) for r in rows], ready=self.now)
+        if self.idle[guest['level']]:
+            self._start_trip(gid)
+        else:
+            self.robot_queue[guest['level']].append(gid)
+
+    def _start_trip(self, gid: int) -> None:
+        guest = self.guests[gid]
+        level = guest['level']
+        self.idle[level] -= 1
+        self.robot_waits.append(self.now - guest['ready'])
+        fm, home = self.site.floor_map(level), self.site.home(level)
+        target = fm.approach_point(guest['cells'], home) or guest['cells'][0]
+        steps = max(len(fm.path(home, target)) - 1, 0)
+        self.travel_cells.append(steps)
+        leg = steps * self.cfg['seconds_per_cell']
+        self.schedule(self.now + leg, 'at_table', gid)
+        self.schedule(self.now + 2 * leg, 'robot_home', level)
+
+    def _robot_home(self, level: int) -> None:
+        self.idle[level] += 1
+        if self.robot_queue[level]:
+            self._start_trip(self.robot_queue[level].pop(0))
+
+    def _at_table(self, gid: int) -> None:
+        guest = self.guests[gid]
+        lifecycle.seat(guest['tables'])
+        self.counts['seated'] += 1
+        self.waits.append(self.now - guest['arrived'])
+        mu = math.log(self.cfg['dining_minutes'] * 60) - self.cfg['dining_sigma'] ** 2 / 2
+        dining = self.rng.lognormvariate(mu, self.cfg['dining_sigma'])
+        self.guest_seat_seconds += guest['size'] * dining
+        self.table_seat_seconds += guest['seats'] * dining
+        self.schedule(self.now + dining, 'leave', gid)
+
+    def _leave(self, gid: int) -> None:
+        lifecycle.release(self.guests[gid]['tables'])
+        self.schedule(self.now + self.cfg['cleaning_minutes'] * 60, 'clean', gid)
+
+    def _clean(self, gid: int) -> None:
+        # Available again: the waitlist seats whoever fits, via _on_waitlist_seated
+        lifecycle.mark_clean(self.guests[gid]['tables'])
+
+    # --- report ---------------------------------------------------------------
+
+    def report(self, wall_seconds: float) -> Dict[str, Any]:
+        seats = self._total_seats()
+        horizon = max(self.now, 1.0)
+        return {
+            'name': self.cfg['name'], 'site': self.site.id, 'policy': self.cfg['policy'], 'seed': self.cfg['seed'],
+            'simulated_seconds': round(self.now, 1), 'wall_seconds': round(wall_seconds, 4),
+            'speedup': round(self.now / wall_seconds) if wall_seconds > 0 else None,
+            'counts': dict(self.counts),
+            # guests in seats, and seats at occupied tables, over all seats for the evening
+            'seat_utilisation': round(self.guest_seat_seconds / (seats * horizon), 4),
+            'table_occupancy': round(self.table_seat_seconds / (seats * horizon), 4),
+            'wait_minutes': summarize([w / 60 for w in self.waits]),
+            'robot_wait_seconds': summarize(self.robot_waits),
+            'robot_travel_cells': summarize(self.travel_cells),
+        }
+
+    def _total_seats(self) -> int:
+        with self.site.activate():
+            return sum(t['capacity'] for t in db.list_tables())
+
+
+def run_scenario(scenario: Dict[str, Any], workdir: Optional[str] = None) -> Dict[str, Any]:
+    """Run one scenario on a scratch DB under workdir (a temp dir if None)."""
+    cfg = {**DEFAULTS, **scenario}
+    layout = cfg.get('layout') or sites.load_layout(cfg['site'])
+    if layout is None:
+        raise ValueError(f"unknown site {cfg['site']!r}")
+    scratch = workdir or tempfile.mkdtemp(prefix='receptionist-sim-')
+    try:
+        path = os.path.join(scratch, f"{cfg['name']}-{cfg['seed']}.db")
+        site = sites.Site(cfg['site'], path, layout)
+        try:
+            return Simulation(cfg, site).run()
+        finally:
+            # the scratch DB is about to go: drop everything cached for it
+            eventlog.close(path)
+            floor.invalidate(path)
+            waitlist.forget(path)
+            feed.forget(path)
+    finally:
+        db.close_connection()
+        if workdir is None:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+
+def _run_in_worker(scenario: Dict[str, Any]) -> Dict[str, Any]:
+    # simulated traffic should not show up in a worker's request metrics
+    metrics.set_enabled(False)
+    return run_scenario(scenario)
+
+
+def run_scenarios(scenarios: Iterable[Dict[str, Any]], processes: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Run independent scenarios on a process pool; reports in input order.
+
+    processes=1 runs them one after another in this process.
+    """
+    scenarios = list(scenarios)
+    if processes == 1 or len(scenarios) <= 1:
+        return [run_scenario(s) for s in scenarios]
+    # spawn: forking a process that already runs threads is unsafe
+    with ProcessPoolExecutor(min(processes or os.cpu_count() or 1, len(scenarios)),
+                             mp_context=multiprocessing.get_context('spawn')) as pool:
+        return list(pool.map(_run_in_worker, scenarios))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', help='JSON file with a list of scenario dicts')
+    parser.add_argument('--site', default=DEFAULTS['site'])
+    parser.add_argument('--rate', type=float, default=DEFAULTS['rate_per_hour'], help='arrivals per hour')
+    parser.add_argument('--hours', type=float, default=DEFAULTS['hours'])
+    parser.add_argument('--policy', choices=POLICIES, default=DEFAULTS['policy'])
+    parser.add_argument('--trace', help='JSON lines of {"t": seconds, "text": "..."} to replay')
+    parser.add_argument('--runs', type=int, default=1, help='seeds 0..runs-1 of the scenario')
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--out', help='write the reports here as JSON')
+    args = parser.parse_args(argv)
+
+    if args.scenarios:
+        with open(args.scenarios) as f:
+            scenarios = json.load(f)
+    else:
+        base = {'site': args.site, 'rate_per_hour': args.rate, 'hours': args.hours, 'policy': args.policy}
+        if args.trace:
+            with open(args.trace) as f:
+                base['trace'] = [(r['t'], r['text']) for r in map(json.loads, filter(str.strip, f))]
+        scenarios = [{**base, 'seed': seed} for seed in range(args.runs)]
+    reports = run_scenarios(scenarios, args.processes)
+    for r in reports:
+        w = r['wait_minutes']
+        print(f"{r['name']:12s} seed={r['seed']:<3d} {r['counts']['seated']:4d} seated "
+              f"{r['counts']['turned_away'] + r['counts']['abandoned']:4d} lost  "
+              f"util={r['seat_utilisation']:.2f}  wait p50={w['p50']} p90={w['p90']} min  "
+              f"x{r['speedup']} real time", file=sys.stderr)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(reports, f, indent=2)
+    else:
+        json.dump(reports, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
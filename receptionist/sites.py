@@ -0,0 +1,138 @@
+"""Sites: the venues one server hosts, each with its own DB file and floor plans.
+
+A site's layout (levels, grid sizes, tables with positions, robots) lives in
+its SQLite file, seeded from receptionist/sites/<id>.json the first time the
+site is opened; the default site "main" is the original single room in
+db.DB_FILE. Everything a site mutates -- its DB file and write lock, floor
+index, change feed, floor maps, fleets and route sessions -- is its own, so
+a busy venue never waits on another's locks or evicts another's caches.
+"""
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import db
+from .fleet import Fleet
+from .navigation import FloorMap, GridPos
+from .replanner import RouteSessions
+
+SITES_DIR = os.path.join(os.path.dirname(__file__), 'sites')
+DEFAULT_SITE = 'main'
+_SITE_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def site_ids() -> List[str]:
+    """The default site plus one per layout file in SITES_DIR."""
+    ids = [DEFAULT_SITE]
+    if os.path.isdir(SITES_DIR):
+        ids += sorted(f[:-5] for f in os.listdir(SITES_DIR)
+                      if f.endswith('.json') and f[:-5] != DEFAULT_SITE)
+    return ids
+
+
+def state_path(site_id: str) -> str:
+    """DB file holding site_id's state; other sites sit beside the default DB."""
+    if site_id == DEFAULT_SITE:
+        return db.DB_FILE
+    return os.path.join(os.path.dirname(db.DB_FILE), 'sites', f'{site_id}.db')
+
+
+def load_layout(site_id: str) -> Optional[Dict[str, Any]]:
+    if site_id == DEFAULT_SITE:
+        return db.DEFAULT_LAYOUT
+    path = os.path.join(SITES_DIR, f'{site_id}.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+class Site:
+    """One venue: its DB file plus lazily built per-level maps and fleets."""
+
+    def __init__(self, site_id: str, db_path: str, layout: Dict[str, Any]):
+        self.id = site_id
+        self.name = layout.get('name') or site_id
+        self.db_path = db_path
+        self.layout = layout
+        self.route_sessions = RouteSessions()
+        self._maps: Dict[int, FloorMap] = {}
+        self._fleets: Dict[int, Fleet] = {}
+        self._lock = threading.Lock()
+        with self.activate():
+            db.init_db(layout=layout)
+            self.floors = {f['floor']: f for f in db.list_floors()}
+
+    def activate(self):
+        """Context manager directing db calls at this site's file."""
+        return db.use_db(self.db_path)
+
+    def home(self, level: int = 0) -> GridPos:
+        return self.floors[level]['home']
+
+    def floor_map(self, level: int = 0) -> FloorMap:
+        """Cached map of one level; its robot home and tables are landmarks."""
+        fm = self._maps.get(level)
+        if fm is None:
+            with self._lock:
+                fm = self._maps.get(level)
+                if fm is None:
+                    f = self.floors[level]
+                    with self.activate():
+                        coords = [(t['x'], t['y']) for t in db.list_tables()
+                                  if t['floor'] == level and t['x'] is not None]
+                    fm = self._maps[level] = FloorMap(f['width'], f['height'], f['obstacles'],
+                                                      landmarks=[f['home'], *coords])
+        return fm
+
+    def fleet(self, level: int = 0) -> Fleet:
+        """The robots working one level, created on first use."""
+        fleet = self._fleets.get(level)
+        if fleet is None:
+            fm = self.floor_map(level)
+            with self._lock:
+                fleet = self._fleets.get(level)
+                if fleet is None:
+                    fleet = self._fleets[level] = Fleet(fm, self.floors[level]['robots'])
+        return fleet
+
+    def reset(self) -> None:
+        """Re-seed the site's tables from its layout (all Available)."""
+        with self.activate():
+            db.init_db(force=True, layout=self.layout)
+
+    def describe(self) -> dict:
+        return {'id': self.id, 'name': self.name,
+                'floors': [{'floor': f['floor'], 'name': f['name'], 'width': f['width'],
+                            'height': f['height'], 'home': f['home']}
+                           for f in self.floors.values()]}
+
+
+_sites: Dict[Tuple[str, str], Site] = {}
+_sites_lock = threading.Lock()
+
+
+def get_site(site_id: str = DEFAULT_SITE) -> Optional[Site]:
+    """The Site for site_id, opening (and seeding) it on first use; None if unknown."""
+    if not _SITE_ID_RE.match(site_id):
+        return None
+    key = (site_id, state_path(site_id))
+    site = _sites.get(key)
+    if site is None:
+        layout = load_layout(site_id)
+        if layout is None:
+            return None
+        with _sites_lock:
+            site = _sites.get(key)
+            if site is None:
+                os.makedirs(os.path.dirname(key[1]) or '.', exist_ok=True)
+                site = _sites[key] = Site(site_id, key[1], layout)
+    return site
+
+
+def open_db_paths() -> List[str]:
+    """DB files of the sites opened so far, e.g. for the turnover scheduler."""
+    return [site.db_path for (site_id, path), site in list(_sites.items())
+            if path == state_path(site_id)]
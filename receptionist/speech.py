@@ -1,3 +1,13 @@
+import codecs
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional
+
 def speech_to_text(audio_blob: bytes) -> str:
     """Stub: convert audio blob to text. In demo, we'll accept raw text instead.
 
@@ -11,6 +21,298 @@ def speech_to_text(audio_blob: bytes) -> str:
 def text_to_speech(text: str) -> bytes:
     """Stub: return a bytes payload representing audio.
 
-    In production, integrate TTS (local or cloud) and stream audio to speakers.
+    Served from the phrase cache, so the fixed greetings and confirmations
+    are synthesized once. In production, integrate TTS (local or cloud) and
+    stream audio to speakers.
+    """
+    return get_phrase_cache().synthesize(text)
+
+
+# --- Streaming interface ---------------------------------------------------
+#
+# Audio arrives and leaves in chunks so the robot can show partial
+# transcripts while the guest is still talking and start speaking before the
+# whole reply is synthesized. A real engine only needs to provide
+# stt_decoder() and synthesize(); LocalEngine is the offline stand-in.
+
+# TTS is synthesized phrase by phrase: split after punctuation, or every few words
+_SEGMENT_RE = re.compile(r"[^,.;:!?]*(?:[,.;:!?]+\s*|$)")
+_MAX_SEGMENT_WORDS = 6
+
+
+class LocalEngine:
+    """Stand-in engine where "audio" is UTF-8 text.
+
+    stt_delay / tts_delay (seconds per byte / character) emulate decoder and
+    synthesizer compute so latency can be measured offline.
+    """
+
+    name = 'local'
+    version = '1'
+
+    def __init__(self, stt_delay: float = 0.0, tts_delay: float = 0.0, voice: str = 'default'):
+        self.stt_delay = stt_delay
+        self.tts_delay = tts_delay
+        self.voice = voice
+
+    def stt_decoder(self) -> "_LocalDecoder":
+        return _LocalDecoder(self.stt_delay)
+
+    def synthesize(self, text: str) -> bytes:
+        if self.tts_delay:
+            time.sleep(self.tts_delay * len(text))
+        return text.encode('utf-8')
+
+
+class _LocalDecoder:
+    def __init__(self, delay: float):
+        self._utf8 = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        self._delay = delay
+
+    def feed(self, chunk: bytes) -> str:
+        if self._delay:
+            time.sleep(self._delay * len(chunk))
+        return self._utf8.decode(chunk)
+
+    def flush(self) -> str:
+        return self._utf8.decode(b'', final=True)
+
+
+DEFAULT_ENGINE = LocalEngine()
+TTS_CACHE_DIR = os.path.join(os.path.dirname(__file__), 'tts_cache')
+
+
+class PhraseCache:
+    """Content-addressed TTS audio cache: memory LRU in front of a disk store.
+
+    Entries are keyed by sha256 of engine name/version, voice and text, so a
+    new voice or engine release never serves stale audio. The disk store is
+    shared across processes and restarts; writes are atomic renames. Streamed
+    replies put free text through here too, so the disk store is an LRU as
+    well: a file's mtime is its last use, and once it holds more than
+    max_disk_entries files the least recently used are deleted.
     """
-    return text.encode('utf-8')
+
+    def __init__(self, engine=None, directory: Optional[str] = TTS_CACHE_DIR, max_entries: int = 512,
+                 max_disk_entries: int = 4096):
+        self.engine = engine or DEFAULT_ENGINE
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._disk_entries: Optional[int] = None  # counted on the first write
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def key(self, text: str) -> str:
+        e = self.engine
+        ident = '\0'.join((getattr(e, 'name', type(e).__name__), str(getattr(e, 'version', '')),
+                           str(getattr(e, 'voice', '')), text))
+        return hashlib.sha256(ident.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + '.audio')
+
+    def synthesize(self, text: str) -> bytes:
+        key = self.key(text)
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return audio
+        audio = self._read(key)
+        if audio is not None:
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            audio = self.engine.synthesize(text)
+            self._write(key, audio)
+            with self._lock:
+                self.misses += 1
+        with self._lock:
+            self._memory[key] = audio
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+        return audio
+
+    def _read(self, key: str) -> Optional[bytes]:
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as fh:
+                audio = fh.read()
+        except OSError:
+            return None
+        try:
+            os.utime(path)  # recently used: evicted last
+        except OSError:
+            pass
+        return audio
+
+    def _write(self, key: str, audio: bytes) -> None:
+        if not self.directory:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, 'wb') as fh:
+                fh.write(audio)
+            created = not os.path.exists(path)  # overwriting a file adds no entry
+            os.replace(tmp, path)
+        except OSError:
+            return  # a read-only or full disk only costs us the on-disk tier
+        with self._lock:
+            if self._disk_entries is None:
+                self._disk_entries = len(self._disk_files())
+            elif created:
+                self._disk_entries += 1
+            over = self._disk_entries > self.max_disk_entries
+        if over:
+            self._evict()
+
+    def _disk_files(self) -> List[str]:
+        out = []
+        for sub in os.scandir(self.directory):
+            if sub.is_dir():
+                out.extend(e.path for e in os.scandir(sub.path) if e.name.endswith('.audio'))
+        return out
+
+    def _evict(self) -> None:
+        """Trim the disk store to 90% of max_disk_entries, least recently used first."""
+        try:
+            files = self._disk_files()
+        except OSError:
+            return
+        aged = []
+        for path in files:
+            try:
+                aged.append((os.stat(path).st_mtime, path))
+            except OSError:
+                pass  # another process evicted it already
+        aged.sort()
+        excess = len(aged) - self.max_disk_entries * 9 // 10
+        for _, path in aged[:max(excess, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_entries = len(aged) - max(excess, 0)
+
+    def prewarm(self, texts: Iterable[str]) -> None:
+        """Synthesize (or load) known phrases ahead of the first guest."""
+        for text in texts:
+            self.synthesize(text)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {'memory_hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                    'entries': len(self._memory),
+                    'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0}
+
+
+_phrase_cache: Optional[PhraseCache] = None
+
+
+def get_phrase_cache() -> PhraseCache:
+    global _phrase_cache
+    if _phrase_cache is None:
+        _phrase_cache = PhraseCache(directory=TTS_CACHE_DIR)
+    return _phrase_cache
+
+
+class BargeIn:
+    """Cancellation flag shared by a TTS stream and whoever hears the guest speak."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+def _segments(text: str) -> Iterator[str]:
+    for phrase in _SEGMENT_RE.findall(text):
+        words = phrase.split(' ')
+        for i in range(0, len(words), _MAX_SEGMENT_WORDS):
+            seg = ' '.join(words[i:i + _MAX_SEGMENT_WORDS])
+            if seg.strip():
+                yield seg if i + _MAX_SEGMENT_WORDS >= len(words) else seg + ' '
+
+
+def stream_speech_to_text(chunks: Iterable[bytes], engine=None,
+                          on_speech: Optional[Callable[[], None]] = None) -> Iterator[dict]:
+    """Decode audio chunks incrementally.
+
+    Yields {'text': transcript so far, 'final': False} after every chunk that
+    adds text, then one {'final': True} result when the stream ends.
+    on_speech is called once, at the first partial; pass a BargeIn's cancel
+    to stop the robot talking over the guest.
+    """
+    decoder = (engine or DEFAULT_ENGINE).stt_decoder()
+    text = ''
+    for chunk in chunks:
+        piece = decoder.feed(chunk)
+        if not piece:
+            continue
+        text += piece
+        if on_speech is not None and text.strip():
+            on_speech()
+            on_speech = None
+        yield {'text': text.strip(), 'final': False}
+    text += decoder.flush()
+    yield {'text': text.strip(), 'final': True}
+
+
+def stream_text_to_speech(text: str, engine=None, barge_in: Optional[BargeIn] = None) -> Iterator[bytes]:
+    """Synthesize text phrase by phrase, yielding audio as each phrase is ready.
+
+    Playback can start after the first phrase. Stops early, between phrases,
+    once barge_in is cancelled. Without an explicit engine, phrases come
+    from the shared phrase cache.
+    """
+    synthesize = engine.synthesize if engine else get_phrase_cache().synthesize
+    for seg in _segments(text):
+        if barge_in is not None and barge_in.cancelled:
+            return
+        yield synthesize(seg)
+
+
+async def astream_speech_to_text(chunks: AsyncIterable[bytes], engine=None,
+                                 on_speech: Optional[Callable[[], None]] = None) -> AsyncIterator[dict]:
+    """Async form of stream_speech_to_text; decoding runs off the event loop."""
+    import asyncio  # already loaded by any running event loop; kept off the import path
+    decoder = (engine or DEFAULT_ENGINE).stt_decoder()
+    text = ''
+    async for chunk in chunks:
+        piece = await asyncio.to_thread(decoder.feed, chunk)
+        if not piece:
+            continue
+        text += piece
+        if on_speech is not None and text.strip():
+            on_speech()
+            on_speech = None
+        yield {'text': text.strip(), 'final': False}
+    text += decoder.flush()
+    yield {'text': text.strip(), 'final': True}
+
+
+async def astream_text_to_speech(text: str, engine=None,
+                                 barge_in: Optional[BargeIn] = None) -> AsyncIterator[bytes]:
+    """Async form of stream_text_to_speech; synthesis runs off the event loop."""
+    import asyncio
+    synthesize = engine.synthesize if engine else get_phrase_cache().synthesize
+    for seg in _segments(text):
+        if barge_in is not None and barge_in.cancelled:
+            return
+        yield await asyncio.to_thread(synthesize, seg)
@@ -0,0 +1,299 @@
+"""Persistent priority waitlist for parties that could not be seated yet.
+
+Parties are stored in the site DB's waitlist table and mirrored in memory as
+one heap per party size, ordered by (-priority, enqueue time). Enqueue and
+removal are O(log n). When tables become Available only the head of each
+size bucket is tried -- a handful of distinct sizes, not every queued party
+-- and the best-placed head that now fits is reserved and marked Seated in
+one transaction. A larger party stuck at the front therefore never blocks
+a smaller one that fits.
+"""
+import heapq
+import json
+import sqlite3
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from . import db, eventlog, lifecycle, metrics
+from .allocator import choose_from_index
+from .floor import FloorIndex, get_floor
+
+# heap key: higher priority first, then first come, first served
+Key = Tuple[int, float, int]
+
+
+class Waitlist:
+    """Waiting parties of one DB file (site)."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or db.current_db()
+        self.lock = threading.RLock()
+        self._buckets: Dict[int, List[Key]] = {}  # party size -> heap
+        self._entries: Dict[int, dict] = {}  # waiting parties by id
+        self._last_id = 0
+        self._matching = False
+        self._pending = False
+        # called as fn(entry_id, table_ids) when a queued party is seated
+        self.on_seated: List[Callable[[int, List[str]], None]] = []
+        with db.use_db(self.path):
+            self._sync()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _key(entry: dict) -> Key:
+        return -entry['priority'], entry['enqueued_at'], entry['id']
+
+    def _push(self, entry: dict) -> None:
+        self._entries[entry['id']] = entry
+        heapq.heappush(self._buckets.setdefault(entry['party_size'], []), self._key(entry))
+        self._last_id = max(self._last_id, entry['id'])
+
+    def _sync(self) -> None:
+        """Pick up parties enqueued since the last look (e.g. by another worker)."""
+        rows = db.get_connection().execute(
+            "SELECT * FROM waitlist WHERE id > ? AND status = 'Waiting' ORDER BY id",
+            (self._last_id,)).fetchall()
+        with self.lock:
+            for r in rows:
+                self._push(dict(r))
+
+    def _head(self, size: int) -> Optional[dict]:
+        # removed parties are dropped lazily, when they surface at the top
+        heap = self._buckets[size]
+        while heap and heap[0][2] not in self._entries:
+            heapq.heappop(heap)
+        if not heap:
+            del self._buckets[size]
+            return None
+        return self._entries[heap[0][2]]
+
+    def enqueue(self, party_size: int, name: Optional[str] = None, priority: int = 0,
+                now: Optional[float] = None) -> dict:
+        """Add a party and try to seat it straight away; returns its entry."""
+        now = db.now() if now is None else now
+        with db.use_db(self.path):
+            with db.transaction() as conn:
+                cur = conn.execute("INSERT INTO waitlist(party_size, priority, name, status, enqueued_at) "
+                                   "VALUES (?, ?, ?, 'Waiting', ?)", (party_size, priority, name, now))
+            entry = {'id': cur.lastrowid, 'party_size': party_size, 'priority': priority, 'name': name,
+                     'status': 'Waiting', 'enqueued_at': now, 'seated_at': None, 'tables': None}
+            eventlog.record('waitlist', party_size, entry_id=entry['id'], priority=priority)
+            with self.lock:
+                self._push(entry)
+            self.match()
+            return self.get(entry['id'])
+
+    def cancel(self, entry_id: int) -> bool:
+        """Take a waiting party off the list; False if it was not waiting."""
+        with db.use_db(self.path):
+            with db.transaction() as conn:
+                cur = conn.execute("UPDATE waitlist SET status = 'Cancelled' WHERE id = ? AND status = 'Waiting'",
+                                   (entry_id,))
+        with self.lock:
+            self._entries.pop(entry_id, None)
+        return cur.rowcount == 1
+
+    def unseat(self, entry_id: int) -> Optional[dict]:
+        """Cancel a Seated party whose tables cannot be used after all.
+
+        The caller releases the tables. Returns the updated entry, or None if
+        it was not Seated.
+        """
+        with db.use_db(self.path):
+            with db.transaction() as conn:
+                cur = conn.execute("UPDATE waitlist SET status = 'Cancelled' WHERE id = ? AND status = 'Seated'",
+                                   (entry_id,))
+        return self.get(entry_id) if cur.rowcount == 1 else None
+
+    def get(self, entry_id: int) -> Optional[dict]:
+        with db.use_db(self.path):
+            row = db.get_connection().execute("SELECT * FROM waitlist WHERE id = ?", (entry_id,)).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry['tables'] = json.loads(entry['tables']) if entry['tables'] else None
+        return entry
+
+    def match(self) -> List[Tuple[int, List[str]]]:
+        """Seat waiting parties on free tables; returns (entry id, table_ids) per party seated.
+
+        Re-entrant calls (a table freed while matching) are folded into the
+        running pass instead of starting another.
+        """
+        with self.lock:
+            if self._matching:
+                self._pending = True
+                return []
+            self._matching = True
+            self._pending = False
+        seated: List[Tuple[int, List[str]]] = []
+        try:
+            with db.use_db(self.path):
+                while True:
+                    self._sync()
+                    seated += self._match_once()
+                    # check and hand over together: a caller that set _pending
+                    # before this either sees us still matching or runs itself
+                    with self.lock:
+                        if not self._pending:
+                            self._matching = False
+                            return seated
+                        self._pending = False
+        except BaseException:
+            with self.lock:
+                self._matching = False
+            raise
+
+    def _match_once(self) -> List[Tuple[int, List[str]]]:
+        floor = get_floor()
+        seated = []
+        while self._entries:
+            with self.lock:
+                heads = [h for h in map(self._head, list(self._buckets)) if h is not None]
+            heads.sort(key=self._key)
+            for entry in heads:
+                ids = choose_from_index(floor, entry['party_size'], record=False)
+                if ids is None:
+                    continue
+                try:
+                    claimed = self._claim(entry, ids)
+                except db.ReservationConflict:
+                    # the index was stale; resync those rows and look again
+                    metrics.ALLOCATION_CONFLICTS.inc()
+                    floor.refresh(ids)
+                    break
+                except sqlite3.OperationalError as e:
+                    # another worker holds the write lock; the next change retries
+                    if 'locked' not in str(e):
+                        raise
+                    return seated
+                if claimed:
+                    seated.append((entry['id'], ids))
+                    for fn in self.on_seated:
+                        fn(entry['id'], ids)
+                break
+            else:
+                return seated
+        return seated
+
+    def _claim(self, entry: dict, ids: Sequence[str]) -> bool:
+        """Mark the party Seated and reserve ids together; False if it left the list meanwhile."""
+        now = db.now()
+        with db.transaction(immediate=True) as conn:
+            cur = conn.execute("UPDATE waitlist SET status = 'Seated', seated_at = ?, tables = ? "
+                               "WHERE id = ? AND status = 'Waiting'", (now, json.dumps(list(ids)), entry['id']))
+            if cur.rowcount == 1:
+                db.reserve_tables(ids)
+        with self.lock:
+            self._entries.pop(entry['id'], None)
+        if cur.rowcount == 1:
+            metrics.WAITLIST_SEATED.inc()
+            eventlog.record('allocation', entry['party_size'], ids, entry_id=entry['id'],
+                            waited=round(now - entry['enqueued_at'], 1))
+        return cur.rowcount == 1
+
+    def snapshot(self, now: Optional[float] = None) -> List[dict]:
+        """Waiting parties in queue order with position and estimated seating time."""
+        now = db.now() if now is None else now
+        with db.use_db(self.path):
+            self._sync()
+            with self.lock:
+                queue = sorted(self._entries.values(), key=self._key)
+            etas = estimate_waits([e['party_size'] for e in queue], now)
+        return [{**e, 'position': i + 1, 'eta': eta,
+                 'eta_seconds': None if eta is None else round(eta - now, 1),
+                 'waiting_seconds': round(now - e['enqueued_at'], 1)}
+                for i, (e, eta) in enumerate(zip(queue, etas))]
+
+    def reset(self) -> None:
+        with self.lock:
+            self._buckets.clear()
+            self._entries.clear()
+            self._last_id = 0
+
+
+def fits_floor(party_size: int) -> bool:
+    """Could the allocator seat party_size at all, were every table free?
+
+    Asks choose_from_index() on an all-Available copy of the floor, so
+    combinability, sync groups and levels count: a party no allocation can
+    ever seat is turned away instead of waiting forever.
+    """
+    if party_size < 1:
+        return False
+    floor = get_floor()
+    with floor.lock:
+        rows = [{**t, 'status': 'Available'} for t in floor.tables.values()]
+    return choose_from_index(FloorIndex(rows), party_size, record=False) is not None
+
+
+def estimate_waits(sizes: Sequence[int], now: Optional[float] = None) -> List[Optional[float]]:
+    """Expected epoch time each party (in queue order) gets a table.
+
+    Replays the queue against lifecycle.predict_free_times(): each party takes
+    the earliest-free tables until its seats are covered, and those tables
+    come free again one average turnover (Reserved + Seated + Cleaning, from
+    recent table_events) later. Combinability, sync groups and levels are
+    ignored, so this is an estimate for guests, not an allocation.
+    None means the floor cannot seat the party at all (or it is not a party).
+    """
+    now = db.now() if now is None else now
+    durations = lifecycle.phase_durations(now)
+    turnover = sum(durations.values())
+    caps = {t['table_id']: t['capacity'] for t in db.list_tables()}
+    heap = [(t, tid) for tid, t in lifecycle.predict_free_times(now).items()]
+    heapq.heapify(heap)
+    total = sum(caps.values())
+    out: List[Optional[float]] = []
+    for size in sizes:
+        if size < 1 or size > total:
+            out.append(None)
+            continue
+        taken, seats = [], 0
+        while seats < size:
+            t, tid = heapq.heappop(heap)
+            taken.append(tid)
+            seats += caps[tid]
+            eta = t
+        for tid in taken:
+            heapq.heappush(heap, (eta + turnover, tid))
+        out.append(max(eta, now))
+    return out
+
+
+_waitlists: Dict[str, Waitlist] = {}
+_waitlist_lock = threading.Lock()
+
+
+def get_waitlist() -> Waitlist:
+    """The waitlist for the current DB file, loaded on first use."""
+    path = db.current_db()
+    wl = _waitlists.get(path)
+    if wl is None:
+        with _waitlist_lock:
+            wl = _waitlists.get(path)
+            if wl is None:
+                wl = _waitlists[path] = Waitlist(path)
+    return wl
+
+
+def forget(path: str) -> None:
+    """Drop path's waitlist (e.g. a scratch DB about to be deleted)."""
+    with _waitlist_lock:
+        _waitlists.pop(path, None)
+
+
+def _on_status_change(table_ids: Optional[Sequence[str]], status: Optional[str]) -> None:
+    wl = _waitlists.get(db.current_db())
+    if wl is None:
+        return
+    if table_ids is None:
+        wl.reset()  # a reseed empties the waitlist table too
+    elif status == 'Available' and len(wl):
+        wl.match()
+
+
+# registered after floor's listener, so the index already shows the freed tables
+db.subscribe(_on_status_change)
@@ -0,0 +1,18 @@
+import tempfile
+import pytest
+from receptionist import db, speech
+
+# app's first request pre-warms TTS in the background, and anything may open
+# the DB; point both at scratch locations for the whole session
+_scratch = tempfile.mkdtemp(prefix='receptionist-tests-')
+db.DB_FILE = _scratch + '/receptionist.db'
+speech.TTS_CACHE_DIR = _scratch + '/tts_cache'
+
+
+@pytest.fixture(autouse=True)
+def isolated_db(tmp_path, monkeypatch):
+    # keep the tracked receptionist.db untouched by test runs
+    monkeypatch.setattr(db, 'DB_FILE', str(tmp_path / 'receptionist.db'))
+    db.init_db(force=True)
+    yield
+    db.close_connection()
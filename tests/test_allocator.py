@@ -1,6 +1,7 @@
 import os
 from receptionist.db import init_db, get_db_path, list_tables
 from receptionist.allocator import find_table_for_party
+from receptionist import sites
 
 def setup_function():
     # reset DB before each test
@@ -18,3 +19,107 @@ def test_combination():
     # Expect combinable T2 + T1 or similar to be used
     assert res is not None
     assert sum(t.startswith('T') for t in res) >= 1
+
+def test_concurrent_requests_never_double_book():
+    import threading
+    from receptionist import db
+
+    results = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(16)
+
+    def worker():
+        barrier.wait()
+        for _ in range(4):
+            res = find_table_for_party(2)
+            if res:
+                with lock:
+                    results.append(res)
+        db.close_connection()
+
+    threads = [threading.Thread(target=worker) for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    reserved = [tid for res in results for tid in res]
+    assert len(reserved) == len(set(reserved))
+    assert {t['table_id'] for t in list_tables() if t['status'] == 'Reserved'} == set(reserved)
+
+
+def _table(tid, cap, combinable=1, sync_id=None, status='Available'):
+    return {'table_id': tid, 'capacity': cap, 'status': status,
+            'is_combinable': combinable, 'sync_id': sync_id}
+
+def test_combination_minimises_wasted_seats():
+    from receptionist.allocator import choose_tables
+    tables = [_table('A', 5), _table('B', 4), _table('C', 3), _table('D', 3)]
+    # largest-first would take 5+4 (3 spare seats); 3+3 seats everyone exactly
+    assert sorted(choose_tables(tables, 6)) == ['C', 'D']
+    assert sorted(choose_tables(tables, 11)) == ['A', 'C', 'D']
+
+def test_combination_uses_whole_sync_groups():
+    from receptionist.allocator import choose_tables
+    tables = [_table('A', 4), _table('S1a', 3, sync_id='S'), _table('S1b', 3, sync_id='S')]
+    assert sorted(choose_tables(tables, 10)) == ['A', 'S1a', 'S1b']
+    tables[2]['status'] = 'Reserved'
+    assert choose_tables(tables, 10) is None
+
+def test_large_floor_stays_fast():
+    import random
+    import time
+    from receptionist.allocator import choose_tables
+    rng = random.Random(1)
+    tables = [_table(f'T{i}', rng.choice([2, 4, 6, 8])) for i in range(250)]
+    start = time.perf_counter()
+    res = choose_tables(tables, 37)
+    assert time.perf_counter() - start < 0.1
+    assert sum(t['capacity'] for t in tables if t['table_id'] in res) == 38
+
+def test_batch_packs_better_than_arrival_order():
+    from receptionist.allocator import allocate_batch
+    # one call per party would put the 4 on T1 and leave the 8 unseated
+    res = allocate_batch([4, 2, 8])
+    assert all(res)
+    reserved = [tid for ids in res for tid in ids]
+    assert len(reserved) == len(set(reserved))
+    assert {t['table_id'] for t in list_tables() if t['status'] == 'Reserved'} == set(reserved)
+
+def test_batch_endpoint():
+    import app as app_module
+    client = app_module.app.test_client()
+    res = client.post('/api/allocate_batch', json={'parties': [{'size': 6, 'priority': 1}, {'size': 40}]})
+    j = res.get_json()
+    assert j['seated'] == 1
+    assert j['assignments'][1]['tables'] == []
+    assert client.post('/api/allocate_batch', json={}).status_code == 400
+
+def test_guide_endpoint_routes_to_the_whole_combination():
+    import app as app_module
+    client = app_module.app.test_client()
+    j = client.post('/api/guide', json={'text': 'a table for eight'}).get_json()
+    assert j['success'] and sorted(j['tables']) == ['T1', 'T2']
+    # between T1 (3, 3) and T2 (5, 3), not at tables[0]
+    assert j['target_coords'] == {'x': 4, 'y': 3}
+    assert j['path'][0] == list(sites.get_site().home(0)) and j['path'][-1] == [4, 3]
+    assert set(j['timings_ms']) == {'parse', 'allocate', 'approach', 'route', 'total'}
+    j = client.post('/api/guide', json={'text': 'hello there'}).get_json()
+    assert not j['success'] and 'path' not in j and 'allocate' not in j['timings_ms']
+
+
+def test_guide_without_a_route_undoes_the_seating(monkeypatch):
+    import app as app_module
+    from receptionist import eventlog
+    from receptionist.navigation import FloorMap
+    client = app_module.app.test_client()
+    monkeypatch.setattr(FloorMap, 'path', lambda self, start, goal: [])
+    j = client.post('/api/guide', json={'text': 'a table for four'}).get_json()
+    assert not j['success'] and j['message'] == 'No path found.'
+    # no table seen free by the allocator: the waitlist seats the party at once
+    monkeypatch.setattr(app_module, 'find_table_for_party', lambda size: [])
+    j = client.post('/api/guide', json={'text': 'a table for two'}).get_json()
+    assert not j['success'] and j['waitlist']['status'] == 'Cancelled'
+    assert all(t['status'] == 'Available' for t in list_tables())
+    eventlog.flush(get_db_path())
+    assert len(eventlog.events(kind='allocation_reversed')) == 2
+    assert client.get('/api/analytics').get_json()['covers_per_hour'] == []
@@ -0,0 +1,210 @@
+import asyncio
+import json
+
+import pytest
+
+import asgi
+
+
+@pytest.fixture
+def server():
+    s = asgi.ReceptionistASGI()
+    yield s
+    s.close()
+
+
+def call(server, method, path, payload=None, query=b''):
+    body = json.dumps(payload).encode() if payload is not None else b''
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query,
+             'headers': [(b'content-type', b'application/json')], 'http_version': '1.1'}
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(server(scope, receive, send))
+    assert sent[0]['type'] == 'http.response.start'
+    data = b''.join(m.get('body', b'') for m in sent[1:])
+    assert not sent[-1].get('more_body')
+    headers = dict(sent[0]['headers'])
+    if headers.get(b'content-type') != b'application/json':
+        return sent[0]['status'], data
+    return sent[0]['status'], json.loads(data)
+
+
+def test_bridge_serves_flask_routes(server):
+    status, data = call(server, 'GET', '/api/version')
+    assert status == 200 and 'v1.0' in data['versions']
+    status, data = call(server, 'POST', '/api/find_table', {'size': 2})
+    assert status == 200 and data['tables'] == ['T4']
+    status, data = call(server, 'POST', '/api/handle_request', {'text': 'a table for four please'})
+    assert status == 200 and data['success'] and data['intent'] == 'request_table'
+
+
+def test_bridge_passes_batches_and_errors(server):
+    status, _ = call(server, 'GET', '/api/no_such_route')
+    assert status == 404
+    status, data = call(server, 'POST', '/api/parse_party', {'texts': ['for six', 'me and my wife']})
+    assert status == 200 and data['party_sizes'] == [6, 2]
+
+
+def test_plan_path_on_floor_map_and_in_process_pool(server):
+    status, data = call(server, 'POST', '/api/plan_path', {'start': [1, 1], 'goal': [5, 5]})
+    assert status == 200
+    path = [tuple(p) for p in data['path']]
+    assert path[0] == (1, 1) and path[-1] == (5, 5) and len(path) == 9
+
+    wall = [[3, y] for y in range(0, 5)]
+    status, data = call(server, 'POST', '/api/plan_path', {'start': [1, 1], 'goal': [5, 1], 'obstacles': wall})
+    assert status == 200
+    path = [tuple(p) for p in data['path']]
+    assert path[0] == (1, 1) and path[-1] == (5, 1)
+    assert not set(path) & {tuple(c) for c in wall}
+
+
+def test_plan_path_uses_the_requested_site(server):
+    terrace = [[7, 4], [8, 4], [7, 5], [8, 5]]
+    status, data = call(server, 'POST', '/api/plan_path',
+                        {'start': [1, 8], 'goal': [12, 2], 'obstacles': terrace, 'floor': 1}, query=b'site=rooftop')
+    assert status == 200 and data['path'][0] == [1, 8] and data['path'][-1] == [12, 2]
+    assert server._procs is None  # answered from the terrace's floor map
+    status, _ = call(server, 'POST', '/api/plan_path', {}, query=b'site=nowhere')
+    assert status == 404
+
+
+def test_plan_path_rejects_bad_body(server):
+    status, data = call(server, 'POST', '/api/plan_path', ['not', 'an', 'object'])
+    assert status == 400
+    status, data = call(server, 'POST', '/api/plan_path', {'format': 'svg'})
+    assert status == 400 and 'format' in data['error']
+
+
+def test_plan_path_waypoints_in_process_pool(server):
+    wall = [[3, y] for y in range(0, 5)]
+    status, data = call(server, 'POST', '/api/plan_path',
+                        {'start': [1, 1], 'goal': [5, 1], 'obstacles': wall, 'format': 'waypoints'})
+    assert status == 200 and data['format'] == 'waypoints'
+    assert data['path'][0] == [1, 1] and data['path'][-1] == [5, 1] and len(data['path']) <= 4
+
+
+def test_lifespan_starts_and_stops_scheduler(server):
+    sent = []
+    messages = iter([{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}])
+
+    async def receive():
+        return next(messages)
+
+    async def send(message):
+        sent.append(message['type'])
+
+    asyncio.run(server({'type': 'lifespan'}, receive, send))
+    assert sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+    assert server._scheduler is not None
+
+
+async def _request(server, path, query=b'', receive=None):
+    scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query,
+             'headers': [], 'http_version': '1.1'}
+    sent = []
+
+    async def request_only():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    await server(scope, receive or request_only, send)
+    return sent
+
+
+def test_idle_long_polls_hold_no_pool_threads(monkeypatch):
+    import threading
+    from receptionist import db
+    monkeypatch.setattr(asgi, 'THREAD_WORKERS', 2)
+    small = asgi.ReceptionistASGI()
+    version = db.floor_version()
+
+    async def scenario():
+        polls = [asyncio.ensure_future(_request(small, '/api/floor/changes',
+                                                f'since={version}&timeout=5'.encode())) for _ in range(20)]
+        await asyncio.sleep(0.1)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        other = await _request(small, '/api/version')  # would queue behind 20 blocked threads
+        answered = loop.time() - start
+        # a write from another thread wakes every waiter
+        threading.Thread(target=db.reserve_tables, args=(['T4'],)).start()
+        results = await asyncio.wait_for(asyncio.gather(*polls), 3)
+        return other, answered, results
+
+    try:
+        other, answered, results = asyncio.run(scenario())
+    finally:
+        small.close()
+    assert other[0]['status'] == 200 and answered < 1
+    for sent in results:
+        data = json.loads(b''.join(m.get('body', b'') for m in sent[1:]))
+        assert data['version'] > version and [c['name'] for c in data['changes']] == ['T4']
+
+
+def test_sse_stream_on_the_event_loop_stops_on_disconnect(server):
+    import threading
+    from receptionist import db
+
+    async def scenario():
+        gone = asyncio.Event()
+        calls = []
+
+        async def receive():
+            calls.append(1)
+            if len(calls) == 1:
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await gone.wait()
+            return {'type': 'http.disconnect'}
+
+        task = asyncio.ensure_future(_request(server, '/api/floor/stream', b'since=-1', receive))
+        await asyncio.sleep(0.1)
+        threading.Thread(target=db.reserve_tables, args=(['T4'],)).start()
+        await asyncio.sleep(0.2)
+        gone.set()
+        return await asyncio.wait_for(task, 2)
+
+    sent = asyncio.run(scenario())
+    assert sent[0]['status'] == 200 and dict(sent[0]['headers'])[b'cache-control'] == b'no-cache'
+    body = b''.join(m.get('body', b'') for m in sent[1:]).decode()
+    assert body.startswith('retry: 2000') and body.index('event: reset') < body.index('event: changes')
+
+
+def test_plan_path_matches_the_flask_handler(server, tmp_path):
+    from receptionist import eventlog, metrics
+    terrace = [[7, 4], [8, 4], [7, 5], [8, 5]]
+    body = {'start': [1, 8], 'goal': [12, 2], 'obstacles': terrace}
+    # ?floor= works as in app.py: the terrace level answers from its floor map
+    status, data = call(server, 'POST', '/api/plan_path', body, query=b'site=rooftop&floor=1')
+    assert status == 200 and data['path'][-1] == [12, 2] and server._procs is None
+    rooftop = asgi.sites.get_site('rooftop')
+    eventlog.flush(rooftop.db_path)
+    with rooftop.activate():
+        assert eventlog.events(kind='navigation')[-1]['detail']['floor'] == 1
+    status, data = call(server, 'POST', '/api/plan_path', {'start': 'nowhere'})
+    assert status == 400 and 'cells' in data['error']
+
+    metrics.set_profiling(str(tmp_path))
+    try:
+        scope = {'type': 'http', 'method': 'POST', 'path': '/api/plan_path', 'query_string': b'',
+                 'headers': [(b'content-type', b'application/json')], 'http_version': '1.1'}
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': json.dumps(body).encode(), 'more_body': False}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(server(scope, receive, send))
+    finally:
+        metrics.set_profiling(None)
+    assert b'x-profile-file' in dict(sent[0]['headers'])
@@ -0,0 +1,13 @@
+from receptionist.db import get_connection, list_tables, update_table_statuses
+
+
+def test_connection_is_reused_per_thread():
+    assert get_connection() is get_connection()
+    assert get_connection().execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+
+def test_batch_status_update():
+    update_table_statuses(['T1', 'T2'], 'Reserved')
+    status = {t['table_id']: t['status'] for t in list_tables()}
+    assert status['T1'] == status['T2'] == 'Reserved'
+    assert status['T4'] == 'Available'
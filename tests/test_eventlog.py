@@ -0,0 +1,91 @@
+import time
+
+from receptionist import db, eventlog
+
+
+def _stats(start, end):
+    return (eventlog.covers_per_hour(start, end), eventlog.table_utilisation(start, end),
+            eventlog.average_party_size(start, end))
+
+
+def test_record_is_buffered_until_flushed():
+    # hold the flusher off so the check cannot race its next round
+    with eventlog._log_for(db.current_db())._flush_lock:
+        for n in (2, 4, 3):
+            eventlog.record('allocation', n, ['T1'])
+        assert eventlog.events(kind='allocation') == []
+    eventlog.flush(db.current_db())
+    got = eventlog.events(kind='allocation')
+    assert [e['party_size'] for e in got] == [2, 4, 3] and got[0]['tables'] == ['T1']
+
+
+def test_compaction_keeps_analytics_and_prunes_old_rows():
+    now = time.time()
+    first = eventlog.day_start(now) - 20 * eventlog.DAY
+    days = [first]
+    for _ in range(2):
+        days.append(eventlog._next_day(days[-1]))
+    with db.transaction() as conn:
+        for i, day in enumerate(days):
+            conn.executemany("INSERT INTO guest_events(at, kind, party_size) VALUES (?, 'allocation', ?)",
+                             [(day + 19 * 3600, 2), (day + 19 * 3600 + 60, 4 + i), (day + 20 * 3600, 6)])
+            conn.executemany("INSERT INTO table_events(table_id, status, at) VALUES ('T4', ?, ?)",
+                             [('Reserved', day + 19 * 3600), ('Seated', day + 19 * 3600 + 300),
+                              ('Cleaning', day + 21 * 3600), ('Available', day + 21 * 3600 + 900)])
+    span = (first, eventlog._next_day(days[-1]))
+    everything = (first, now)
+    before = _stats(*span), _stats(*everything)
+    covers, util, avg = before[0]
+    assert len(covers) == 6 and sum(r['covers'] for r in covers) == 3 * 12 + 3
+    assert util['T4']['seatings'] == 3 and avg == round(39 / 9, 2)
+
+    assert eventlog.compact(now) >= 20
+    assert eventlog.watermark() == eventlog.day_start(now)
+    assert (_stats(*span), _stats(*everything)) == before
+    conn = db.get_connection()
+    assert conn.execute("SELECT COUNT(*) FROM guest_events WHERE at < ?", (span[1],)).fetchone()[0] == 0
+    # only T4's last change survives, so its status is still known at the cutoff
+    assert [tuple(r) for r in conn.execute("SELECT table_id, status FROM table_events WHERE at < ?",
+                                           (span[1],))] == [('T4', 'Available')]
+    # running again (e.g. from a second worker) changes nothing
+    assert eventlog.compact(now) == 0 and eventlog.compact_if_due(now) == 0
+    assert (_stats(*span), _stats(*everything)) == before
+
+
+def test_windows_off_day_boundaries_count_only_what_they_cover():
+    now = time.time()
+    today = eventlog.day_start(now)
+    old = today - 20 * eventlog.DAY
+    recent = eventlog.day_start(today - 2 * eventlog.DAY + 3600 * 3)
+    with db.transaction() as conn:
+        for day in (old, recent):
+            conn.executemany("INSERT INTO guest_events(at, kind, party_size) VALUES (?, 'allocation', ?)",
+                             [(day + 9 * 3600, 3), (day + 19 * 3600 + 600, 4), (day + 20 * 3600 + 60, 2)])
+            conn.executemany("INSERT INTO table_events(table_id, status, at) VALUES ('T1', ?, ?)",
+                             [('Seated', day + 9 * 3600), ('Available', day + 12 * 3600)])
+    # retained days: any window is answered exactly, from raw rows
+    evening = (recent + 18.5 * 3600, recent + 20.5 * 3600)
+    before = _stats(*evening)
+    assert [r['covers'] for r in before[0]] == [4, 2] and before[1]['T1']['utilisation'] == 0.0
+    # past the retention window: only the hours and days the window wholly covers
+    old_evening = (old + 19 * 3600, old + 20 * 3600 + 1800)
+    assert [r['covers'] for r in eventlog.covers_per_hour(*old_evening)] == [4, 2]
+    eventlog.compact(now)
+    assert _stats(*evening) == before
+    assert [r['covers'] for r in eventlog.covers_per_hour(*old_evening)] == [4]
+    assert eventlog.table_utilisation(*old_evening) == {}
+    assert eventlog.table_utilisation(old + 3600, eventlog._next_day(old) + 3600) == {}
+    whole_day = eventlog.table_utilisation(old, eventlog._next_day(old) + 3600)
+    assert whole_day['T1']['seatings'] == 1
+
+
+def test_analytics_endpoint_reports_the_guest_flow():
+    import app as app_module
+    client = app_module.app.test_client()
+    client.get('/api/greeting')
+    assert client.post('/api/handle_request', json={'text': 'table for two please'}).get_json()['success']
+    j = client.get('/api/analytics').get_json()
+    assert [(r['parties'], r['covers']) for r in j['covers_per_hour']] == [(1, 2)]
+    assert j['avg_party_size'] == 2.0
+    assert eventlog.events(kind='greeting') and eventlog.events(kind='parse')[0]['party_size'] == 2
+    assert client.get('/api/analytics?from=10&to=5').status_code == 400
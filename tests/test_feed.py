@@ -0,0 +1,88 @@
+import json
+import threading
+import time
+
+from receptionist import db
+from receptionist.feed import ChangeFeed
+
+
+def test_writes_bump_version_and_stamp_rows():
+    v0 = db.floor_version()
+    db.reserve_tables(['T1', 'T2'])
+    db.update_table_status('T4', 'Seated')
+    assert db.floor_version() == v0 + 2
+    version, reset, rows = db.changes_since(v0)
+    assert version == v0 + 2 and not reset
+    assert {r['table_id']: r['status'] for r in rows} == {'T1': 'Reserved', 'T2': 'Reserved', 'T4': 'Seated'}
+    assert [r['table_id'] for r in db.changes_since(v0 + 1)[2]] == ['T4']
+    assert db.changes_since(v0 + 2)[2] == []
+
+
+def test_reseed_resets_clients_without_going_backwards():
+    db.reserve_tables(['T1'])
+    before = db.floor_version()
+    db.init_db(force=True)
+    version, reset, rows = db.changes_since(before)
+    assert version > before and reset
+    assert {r['status'] for r in rows} == {'Available'} and len(rows) == 5
+    # a version from some other DB file is treated the same way
+    assert db.changes_since(version + 100)[1]
+
+
+def test_wait_wakes_on_write_and_times_out():
+    feed = ChangeFeed(poll_interval=5.0)
+    since = db.floor_version()
+    start = time.monotonic()
+    assert feed.wait(since, 0.05) == (since, False, [])
+    assert time.monotonic() - start < 1.0
+
+    timer = threading.Timer(0.05, db.reserve_tables, [['T4']])
+    timer.start()
+    start = time.monotonic()
+    version, _, rows = feed.wait(since, 5.0)
+    timer.join()
+    # woken by the local write, not by the 5 s poll
+    assert time.monotonic() - start < 1.0
+    assert version == since + 1 and [r['table_id'] for r in rows] == ['T4']
+
+
+def test_get_tables_etag():
+    import app as app_module
+    client = app_module.app.test_client()
+    res = client.get('/api/get_tables')
+    etag = res.headers['ETag']
+    assert res.status_code == 200 and len(res.get_json()) == 5
+    res = client.get('/api/get_tables', headers={'If-None-Match': etag})
+    assert res.status_code == 304 and not res.data
+    db.reserve_tables(['T1'])
+    res = client.get('/api/get_tables', headers={'If-None-Match': etag})
+    assert res.status_code == 200 and res.headers['ETag'] != etag
+
+
+def test_long_poll_endpoint():
+    import app as app_module
+    client = app_module.app.test_client()
+    j = client.get('/api/floor/changes').get_json()
+    assert j['reset'] and len(j['changes']) == 5
+    db.reserve_tables(['T2'])
+    j2 = client.get(f"/api/floor/changes?since={j['version']}").get_json()
+    assert j2 == {'version': j['version'] + 1, 'reset': False,
+                  'changes': [{'name': 'T2', 'status': 'Reserved', 'floor': 0, 'x_coord': 5, 'y_coord': 3}]}
+    j3 = client.get(f"/api/floor/changes?since={j2['version']}&timeout=0").get_json()
+    assert j3['changes'] == [] and j3['version'] == j2['version']
+
+
+def test_sse_stream_resumes_from_last_event_id():
+    import app as app_module
+    client = app_module.app.test_client()
+    since = db.floor_version()
+    db.reserve_tables(['T1'])
+    res = client.get('/api/floor/stream', headers={'Last-Event-ID': str(since)}, buffered=False)
+    assert res.mimetype == 'text/event-stream'
+    chunks = res.response
+    assert next(chunks).startswith(b'retry:')
+    event = next(chunks).decode()
+    assert f'id: {since + 1}\nevent: changes\n' in event
+    data = json.loads(event.split('data: ', 1)[1])
+    assert [c['name'] for c in data['changes']] == ['T1']
+    res.close()
@@ -0,0 +1,67 @@
+import random
+import time
+from receptionist.fleet import Fleet
+from receptionist.navigation import FloorMap
+
+
+def _assert_collision_free(plans):
+    horizon = max(p['t0'] + len(p['path']) for p in plans)
+    for t in range(horizon):
+        cells = {}
+        for p in plans:
+            k = min(max(t - p['t0'], 0), len(p['path']) - 1)
+            cell = tuple(p['path'][k])
+            assert cell not in cells, f'vertex conflict at {cell} t={t}'
+            cells[cell] = p['robot']
+
+
+def test_crossing_robots_do_not_collide():
+    fm = FloorMap(7, 3, obstacles=[(x, 0) for x in range(7) if x != 3] + [(x, 2) for x in range(7) if x != 3])
+    fleet = Fleet(fm, {'R1': (0, 1), 'R2': (6, 1)})
+    plans = fleet.dispatch([(6, 1), (0, 1)], t=0)
+    assert {p['robot'] for p in plans} == {'R1', 'R2'}
+    _assert_collision_free(plans)
+
+
+def test_nearest_idle_robot_is_assigned():
+    fm = FloorMap(15, 12)
+    fleet = Fleet(fm, {'R1': (1, 1), 'R2': (13, 10)})
+    assert fleet.dispatch([(12, 10)], t=0)[0]['robot'] == 'R2'
+    # R2 is busy now; R1 takes the next party even though it is far away
+    assert fleet.dispatch([(12, 9)], t=1)[0]['robot'] == 'R1'
+    assert fleet.dispatch([(5, 5)], t=2) == [None]
+    fleet.release('R2')
+    assert fleet.dispatch([(5, 5)], t=3)[0]['robot'] == 'R2'
+
+
+def test_ten_robots_on_large_grid():
+    rng = random.Random(3)
+    n = 100
+    obstacles = {(rng.randrange(n), rng.randrange(n)) for _ in range(1000)}
+    homes = {f'R{i}': (i * 2, 0) for i in range(12)}
+    targets = [(rng.randrange(20, n), rng.randrange(20, n)) for _ in range(12)]
+    obstacles -= set(homes.values()) | set(targets)
+    fleet = Fleet(FloorMap(n, n, obstacles), homes)
+    start = time.perf_counter()
+    plans = fleet.dispatch(targets, t=0)
+    assert time.perf_counter() - start < 2.0
+    plans = [p for p in plans if p]
+    assert len(plans) >= 10
+    _assert_collision_free(plans)
+
+
+def test_dispatch_endpoint():
+    import app as app_module
+    client = app_module.app.test_client()
+    j = client.post('/api/fleet/dispatch', json={'parties': [2, 4, 50]}).get_json()
+    a = j['assignments']
+    assert a[0]['robot'] and a[1]['robot'] and a[0]['robot'] != a[1]['robot']
+    assert a[2]['tables'] == [] and a[2]['robot'] is None
+    _assert_collision_free([x for x in a if x['robot']])
+    for x in a[:2]:
+        assert client.post('/api/fleet/release', json={'robot': x['robot']}).get_json()['success']
+    for body in ({'parties': [2, 'four']}, {'size': None}, {'parties': [[2]]}, {'size': 0}):
+        assert client.post('/api/fleet/dispatch', json=body).status_code == 400
+    for body in ({'robot': ['R1']}, {'robot': 7}, {}):
+        assert client.post('/api/fleet/release', json=body).status_code == 400
+    assert client.post('/api/fleet/release', json={'robot': 'nobody'}).status_code == 404
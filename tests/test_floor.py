@@ -0,0 +1,24 @@
+from receptionist import floor
+from receptionist.db import init_db, update_table_statuses
+from receptionist.allocator import find_table_for_party
+
+
+def test_index_tracks_reservations_incrementally():
+    index = floor.get_floor()
+    res = find_table_for_party(2)
+    assert floor.get_floor() is index
+    assert res[0] not in index.free_by_cap[index.tables[res[0]]['capacity']]
+
+    update_table_statuses(['T3_A'], 'Reserved')
+    assert not index.sync_group_free('S1')
+    update_table_statuses(['T3_A'], 'Available')
+    assert index.sync_group_free('S1')
+
+
+def test_reset_invalidates_index():
+    index = floor.get_floor()
+    find_table_for_party(10)
+    init_db(force=True)
+    fresh = floor.get_floor()
+    assert fresh is not index
+    assert all(t['status'] == 'Available' for t in fresh.tables.values())
@@ -0,0 +1,77 @@
+import pytest
+from receptionist import lifecycle
+from receptionist.allocator import find_table_for_party
+from receptionist.db import get_tables
+
+
+def _status(tid):
+    return get_tables([tid])[0]['status']
+
+
+def test_full_lifecycle():
+    ids = find_table_for_party(2)
+    lifecycle.seat(ids)
+    assert lifecycle.release(ids) == 'Cleaning'
+    lifecycle.mark_clean(ids)
+    assert _status(ids[0]) == 'Available'
+
+
+def test_invalid_transition_is_rejected():
+    with pytest.raises(lifecycle.InvalidTransition):
+        lifecycle.seat(['T1'])
+    assert _status('T1') == 'Available'
+
+
+def test_tick_expires_stale_reservations():
+    ids = find_table_for_party(2)
+    now = get_tables(ids)[0]['status_since']
+    assert lifecycle.tick(now + 60) == {}
+    assert lifecycle.tick(now + lifecycle.RESERVATION_TTL + 1) == {'Reserved': ids}
+    assert _status(ids[0]) == 'Available'
+
+
+def test_free_time_prediction_uses_history():
+    lifecycle.transition(['T1'], 'Reserved', now=1000)
+    lifecycle.transition(['T1'], 'Seated', now=1100)
+    lifecycle.transition(['T1'], 'Cleaning', now=1100 + 1800)
+    lifecycle.transition(['T1'], 'Available', now=1100 + 1800 + 120)
+    lifecycle.transition(['T2'], 'Reserved', now=5000)
+    lifecycle.transition(['T2'], 'Seated', now=5000)
+    free = lifecycle.predict_free_times(now=5600)
+    # 30 min average meal from T1's history, then 2 min cleaning
+    assert free['T2'] == pytest.approx(5000 + 1800 + 120)
+    assert free['T4'] == 5600
+
+
+def test_release_endpoint():
+    import app as app_module
+    client = app_module.app.test_client()
+    ids = find_table_for_party(2)
+    j = client.post('/api/release', json={'tables': ids}).get_json()
+    assert j['status'] == 'Available'
+    assert client.post('/api/clean', json={'tables': ids}).status_code == 409
+
+
+def test_scheduler_survives_failing_hooks(caplog):
+    import sqlite3
+    import threading
+    from receptionist import db
+    calls = []
+    done = threading.Event()
+
+    def locked():
+        raise sqlite3.OperationalError('database is locked')
+
+    def count():
+        calls.append(db.current_db())
+        if len(calls) == 3:
+            done.set()
+
+    scheduler = lifecycle.TurnoverScheduler(interval=0.01, db_paths=lambda: [db.DB_FILE], hooks=[locked, count])
+    scheduler.start()
+    try:
+        assert done.wait(5)
+    finally:
+        scheduler.stop()
+        scheduler.join(5)
+    assert 'locked failed' in caplog.text and calls[0] == db.DB_FILE
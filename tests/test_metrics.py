@@ -0,0 +1,100 @@
+import pstats
+
+from receptionist import metrics
+from receptionist.allocator import find_table_for_party
+from receptionist.navigation import plan_path
+
+
+def test_histogram_renders_cumulative_buckets():
+    h = metrics.Histogram('test_latency_seconds', 'Test.', ('kind',), buckets=(0.1, 1.0))
+    metrics.REGISTRY.remove(h)
+    h.observe(0.05, 'a')
+    h.observe(0.5, 'a')
+    h.observe(5, 'a')
+    assert h.render()[2:] == [
+        'test_latency_seconds_bucket{kind="a",le="0.1"} 1',
+        'test_latency_seconds_bucket{kind="a",le="1"} 2',
+        'test_latency_seconds_bucket{kind="a",le="+Inf"} 3',
+        'test_latency_seconds_sum{kind="a"} 5.55',
+        'test_latency_seconds_count{kind="a"} 3',
+    ]
+
+
+def test_allocator_and_planner_are_instrumented(monkeypatch):
+    single = metrics.ALLOCATIONS.value('single')
+    combo = metrics.ALLOCATIONS.value('combination')
+    scanned = metrics.TABLES_SCANNED.value()
+    find_table_for_party(2)
+    find_table_for_party(8)
+    assert metrics.ALLOCATIONS.value('single') == single + 1
+    assert metrics.ALLOCATIONS.value('combination') == combo + 1
+    assert metrics.TABLES_SCANNED.value() > scanned
+
+    # a batch that loses a reservation race and re-plans counts its parties once
+    from receptionist import allocator, db
+    real, lost = allocator.reserve_tables, []
+
+    def reserve_once_lost(ids):
+        if not lost:
+            lost.append(ids)
+            raise db.ReservationConflict(ids)
+        real(ids)
+    db.init_db(force=True)
+    monkeypatch.setattr(allocator, 'reserve_tables', reserve_once_lost)
+    single = metrics.ALLOCATIONS.value('single')
+    assert all(allocator.allocate_batch([2, 4]))
+    assert lost and metrics.ALLOCATIONS.value('single') == single + 2
+
+    runs = metrics.PLANNER_EXPANDED.count()
+    assert len(plan_path((0, 0), (4, 0), [(2, 0), (2, 1)])) == 7
+    assert metrics.PLANNER_EXPANDED.count() == runs + 1
+    assert metrics.DB_QUERY_LATENCY.count('update', 'tables') > 0
+
+
+def test_disabled_metrics_record_nothing():
+    metrics.set_enabled(False)
+    try:
+        runs = metrics.PLANNER_EXPANDED.count()
+        plan_path((0, 0), (3, 3))
+        assert metrics.PLANNER_EXPANDED.count() == runs
+    finally:
+        metrics.set_enabled(True)
+
+
+def test_metrics_endpoint_and_profiling_toggle(tmp_path, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'PROFILE_DIR', str(tmp_path))
+    client = app_module.app.test_client()
+    assert client.post('/api/profiling', json={'enabled': True}).status_code == 403
+    monkeypatch.setattr(app_module, 'PROFILING_ALLOWED', True)
+    client.get('/api/version')
+    text = client.get('/metrics').get_data(as_text=True)
+    assert '# TYPE receptionist_http_request_duration_seconds histogram' in text
+    assert 'receptionist_http_request_duration_seconds_count{endpoint="api_version",method="GET",status="200"}' in text
+
+    # a client-supplied directory is ignored
+    elsewhere = tmp_path / 'elsewhere'
+    assert client.post('/api/profiling', json={'enabled': True, 'dir': str(elsewhere)}).get_json()['enabled']
+    try:
+        res = client.post('/api/find_table', json={'size': 2})
+        pstats.Stats(res.headers['X-Profile-File'])  # a loadable cProfile dump
+        assert res.headers['X-Profile-File'].startswith(str(tmp_path)) and not elsewhere.exists()
+    finally:
+        client.post('/api/profiling', json={'enabled': False})
+    assert 'X-Profile-File' not in client.get('/api/version').headers
+
+
+def test_profile_dumps_are_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, 'PROFILE_MAX_FILES', 3)
+    monkeypatch.setattr(metrics, '_profile_files', type(metrics._profile_files)())
+    dumps = tmp_path / 'profiles'
+    metrics.set_profiling(str(dumps))
+    try:
+        paths = []
+        for _ in range(5):
+            profiler = metrics.start_profile()
+            assert profiler is not None
+            paths.append(metrics.finish_profile(profiler, 'x'))
+    finally:
+        metrics.set_profiling(None)
+    assert sorted(p.name for p in dumps.iterdir()) == sorted(p.rsplit('/', 1)[1] for p in paths[2:])
@@ -0,0 +1,101 @@
+from receptionist.navigation import FloorMap, plan_path
+
+
+def test_floor_map_matches_astar_length():
+    obstacles = [(2, y) for y in range(2, 12)]
+    fm = FloorMap(15, 12, obstacles, landmarks=[(1, 1)])
+    for goal in [(9, 4), (3, 8), (14, 11)]:
+        path = fm.path((1, 1), goal)
+        assert path[0] == (1, 1) and path[-1] == goal
+        assert len(path) == len(plan_path((1, 1), goal, obstacles))
+        assert not set(path) & set(obstacles)
+
+
+def test_floor_map_unreachable_goal():
+    fm = FloorMap(5, 5, [(3, 4), (4, 3)], landmarks=[(0, 0)])
+    assert fm.path((0, 0), (4, 4)) == []
+    assert fm.path((0, 0), (9, 9)) == []
+
+
+def test_obstacle_change_drops_only_affected_fields():
+    fm = FloorMap(20, 5, [(10, y) for y in range(5)], landmarks=[(1, 1), (15, 1)])
+    left, right = fm.distance_field((1, 1)), fm.distance_field((15, 1))
+    fm.set_obstacles([(10, y) for y in range(5)] + [(3, 3)])
+    assert fm.distance_field((15, 1)) is right
+    assert fm.distance_field((1, 1)) is not left
+    assert (3, 3) not in fm.distance_field((1, 1))
+
+
+def test_plan_path_unreachable_goal_terminates():
+    import time
+    walls = [(5, 4), (5, 6), (4, 5), (6, 5)]
+    start = time.perf_counter()
+    assert plan_path((0, 0), (5, 5), walls) == []
+    assert time.perf_counter() - start < 0.1
+
+
+def test_plan_path_on_explicit_grid():
+    from receptionist.navigation import OccupancyGrid
+    grid = OccupancyGrid(4, 3, [(1, 0), (1, 1)])
+    assert plan_path((0, 0), (2, 0), grid=grid) == [(0, 0), (0, 1), (0, 2), (1, 2), (2, 2), (2, 1), (2, 0)]
+    assert plan_path((0, 0), (7, 0), grid=grid) == []
+
+
+def test_approach_point_serves_whole_table_set():
+    fm = FloorMap(15, 12, [(9, 5)], landmarks=[(1, 1)])
+    assert fm.approach_point([(4, 6)], (1, 1)) == (4, 6)
+    # between two tables; (9, 5) itself is blocked, so the nearer side cells win
+    assert fm.approach_point([(3, 3), (5, 3)], (1, 1)) == (4, 3)
+    assert fm.approach_point([(9, 4), (9, 6)], (1, 1)) == (8, 5)
+    assert fm.approach_point([], (1, 1)) is None
+
+
+def test_smoothing_keeps_only_turning_points_with_clear_segments():
+    from receptionist.navigation import line_of_sight, smooth_path
+    fm = FloorMap(30, 30, [(10, y) for y in range(25)], landmarks=[(0, 0)])
+    path = fm.path((0, 0), (29, 0))
+    waypoints = smooth_path(path, fm.passable)
+    assert waypoints[0] == (0, 0) and waypoints[-1] == (29, 0)
+    assert len(waypoints) <= 4 < len(path) // 10
+    assert set(waypoints) <= set(path)
+    assert all(line_of_sight(a, b, fm.passable) for a, b in zip(waypoints, waypoints[1:]))
+    # a segment may not squeeze diagonally between two blocked corners
+    corner = FloorMap(3, 3, [(1, 0), (0, 1)])
+    assert not line_of_sight((0, 0), (1, 1), corner.passable)
+    assert smooth_path(plan_path((0, 0), (20, 20)), lambda pos: True) == [(0, 0), (20, 20)]
+
+
+def test_run_length_encoding_round_trips():
+    from receptionist.navigation import decode_runs, encode_runs
+    path = plan_path((0, 0), (6, 3), [(3, y) for y in range(3)])
+    runs = encode_runs(path)
+    assert decode_runs(path[0], runs) == path
+    assert encode_runs([(2, 2), (3, 2), (4, 2), (4, 1)]) == 'R2U1' and encode_runs([(2, 2)]) == ''
+
+
+def test_get_path_formats_shrink_the_response():
+    import app as app_module
+    from receptionist.navigation import decode_runs
+    client = app_module.app.test_client()
+    cells = client.post('/api/plan_path', json={'start': [0, 0], 'goal': [99, 60], 'obstacles': [[50, 30]]})
+    waypoints = client.post('/api/plan_path', json={'start': [0, 0], 'goal': [99, 60], 'obstacles': [[50, 30]],
+                                                     'format': 'waypoints'})
+    assert len(waypoints.data) * 10 < len(cells.data)
+    runs = client.post('/api/get_path', json={'x': 9, 'y': 7, 'format': 'runs'}).get_json()
+    full = client.post('/api/get_path', json={'x': 9, 'y': 7}).get_json()
+    decoded = decode_runs(tuple(runs['start']), runs['runs'])
+    assert runs['success'] and [list(c) for c in decoded] == full['path']
+    assert client.post('/api/get_path', json={'format': 'svg'}).status_code == 400
+
+
+def test_plan_path_rejects_coordinates_beyond_the_grid_limit():
+    import pytest
+    import app as app_module
+    from receptionist.navigation import MAX_GRID_CELLS, OccupancyGrid
+    client = app_module.app.test_client()
+    resp = client.post('/api/plan_path', json={'start': [0, 0], 'goal': [10 ** 12, 10 ** 12]})
+    assert resp.status_code == 400 and 'span' in resp.get_json()['error']
+    resp = client.post('/api/plan_path', json={'start': [0, 0], 'goal': [3, 3], 'obstacles': [[-10 ** 9, 0]]})
+    assert resp.status_code == 400
+    with pytest.raises(ValueError):
+        OccupancyGrid.around([(0, 0), (MAX_GRID_CELLS, 0)])
@@ -0,0 +1,71 @@
+import pytest
+from receptionist.nlp import parse_party_size, parse_party_sizes
+
+
+@pytest.mark.parametrize('text,size', [
+    ('a table for six', 6),
+    ('just me and my wife', 2),
+    ('I have two friends with me', 3),
+    ('two friends and me', 3),
+    ('me, my wife and three kids', 5),
+    ('twenty two people', 22),
+    ('a table for twenty-two', 22),
+    ('a couple of friends and me', 3),
+    ('a table for two adults and three kids', 5),
+    ('there are 5 of us', 5),
+    ('just me', 1),
+    # a count of people, or after "for", already includes the speaker
+    ('I need a table for 3 people', 3),
+    ("I'd like a table for 4 people", 4),
+    ('I have a reservation for 6 people', 6),
+    ('can I get a table for two people', 2),
+    # clock times are not party sizes
+    ('we have a booking for 8pm under Silva', None),
+    ('booked for 8pm', None),
+    ("a table for two at 7:30 p.m.", 2),
+    ("four of us at 9 o'clock", 4),
+    ('I want a table', None),
+    ('', None),
+])
+def test_parse_party_size(text, size):
+    assert parse_party_size(text) == size
+
+
+def test_batch_parse_and_endpoint():
+    texts = ['a table for six', 'hello', 'me and 3 friends']
+    assert parse_party_sizes(texts) == [6, None, 4]
+    import app as app_module
+    client = app_module.app.test_client()
+    assert client.post('/api/parse_party', json={'texts': texts}).get_json() == {'party_sizes': [6, None, 4]}
+    assert client.post('/api/parse_party', json={'text': 'for four'}).get_json() == {'party_size': 4}
+
+
+def test_intents_and_slots():
+    from receptionist.nlp import interpret
+    r = interpret('we have a booking under Silva')
+    assert r['intent'] == 'reservation_lookup' and r['slots']['name'] == 'Silva'
+    r = interpret('Can we sit outside?')
+    assert r['intent'] == 'seating_preference' and r['slots']['seating'] == 'outdoor'
+    assert interpret('a table for six')['slots']['party_size'] == 6
+    assert interpret('we have a booking for 8pm under Silva')['slots']['party_size'] is None
+    assert interpret('a table for two at 7:30pm')['slots']['party_size'] == 2
+    assert interpret('how long is the wait')['intent'] == 'wait_time'
+
+
+def test_pipeline_cache_and_plugins():
+    from receptionist.nlp import NLUPipeline
+    nlu = NLUPipeline()
+    nlu.interpret('A table for six!')
+    nlu.interpret('a table   for SIX')
+    assert nlu.cache_info().hits == 1
+    nlu.add_extractor('allergy', lambda t: 'nuts' if 'nuts' in t.split() else None)
+    assert nlu.interpret('no nuts please')['slots']['allergy'] == 'nuts'
+
+
+def test_handle_request_answers_non_party_intents():
+    import app as app_module
+    client = app_module.app.test_client()
+    j = client.post('/api/handle_request', json={'text': 'we have a booking under Silva'}).get_json()
+    assert not j['success'] and 'Silva' in j['message']
+    j = client.post('/api/handle_request', json={'text': 'a table for two'}).get_json()
+    assert j['success'] and j['slots']['party_size'] == 2
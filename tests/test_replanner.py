@@ -0,0 +1,82 @@
+import random
+from receptionist.navigation import OccupancyGrid, plan_path
+from receptionist.replanner import DStarLite
+
+
+def test_dstar_matches_full_replan_under_changes():
+    rng = random.Random(7)
+    grid = OccupancyGrid(30, 30)
+    planner = DStarLite(grid, (0, 0), (29, 29))
+    path = planner.path()
+    assert len(path) == 59
+    obstacles = set()
+    pos = (0, 0)
+    for _ in range(40):
+        path = planner.path()
+        if len(path) < 2:
+            break
+        pos = path[1]
+        planner.move_to(pos)
+        cell = path[min(3, len(path) - 1)]
+        if cell not in ((29, 29), pos):
+            obstacles.add(cell)
+            planner.set_cells(blocked=[cell])
+        if obstacles and rng.random() < 0.2:
+            freed = obstacles.pop()
+            planner.set_cells(cleared=[freed])
+        new = planner.path()
+        expected = plan_path(pos, (29, 29), list(obstacles), grid=OccupancyGrid(30, 30, obstacles))
+        assert len(new) == len(expected)
+        assert not set(new) & obstacles
+
+
+def test_dstar_unreachable_goal():
+    grid = OccupancyGrid(5, 5)
+    planner = DStarLite(grid, (0, 0), (4, 4))
+    planner.set_cells(blocked=[(3, 4), (4, 3)])
+    assert planner.path() == []
+    planner.set_cells(cleared=[(3, 4)])
+    assert planner.path()[-1] == (4, 4)
+
+
+def test_avoid_session_endpoint():
+    import app as app_module
+    client = app_module.app.test_client()
+    j = client.post('/api/avoid', json={'start': [1, 1], 'goal': [9, 4]}).get_json()
+    sid, path = j['session_id'], j['path']
+    assert path[0] == [1, 1] and path[-1] == [9, 4]
+    blocked = path[3]
+    j = client.post('/api/avoid', json={'session_id': sid, 'position': path[1], 'obstacle': blocked}).get_json()
+    assert j['path'][0] == path[1] and blocked not in j['path']
+    assert client.post('/api/avoid', json={'session_id': sid, 'close': True}).get_json()['closed']
+    assert client.post('/api/avoid', json={'session_id': sid}).status_code == 404
+    # stateless sidestep still works
+    j = client.post('/api/avoid', json={'path': [[0, 0], [1, 0], [2, 0]], 'obstacle': [1, 0]}).get_json()
+    assert j['path'] == [[0, 0], [1, 1], [2, 0]]
+
+
+def test_avoid_rejects_positions_off_the_floor():
+    import pytest
+    import app as app_module
+    client = app_module.app.test_client()
+    sid = client.post('/api/avoid', json={'start': [1, 1], 'goal': [9, 4]}).get_json()['session_id']
+    for position in ([-1, 2], [10 ** 6, 0], 'here', [1]):
+        assert client.post('/api/avoid', json={'session_id': sid, 'position': position}).status_code == 400
+    # the session is untouched and still plans from its start
+    assert client.post('/api/avoid', json={'session_id': sid}).get_json()['path'][0] == [1, 1]
+    with pytest.raises(ValueError):
+        DStarLite(OccupancyGrid(5, 5), (0, 0), (4, 4)).move_to((5, 0))
+
+
+def test_avoid_rejects_malformed_cells():
+    import app as app_module
+    client = app_module.app.test_client()
+    for body in ({'start': [1, 1]}, {'start': 'here', 'goal': [9, 4]}, {'start': [1, 1], 'goal': ['a', 4]},
+                 {'start': [1, 1], 'goal': [9, 4], 'obstacles': [[1]]},
+                 {'start': [1, 1], 'goal': [9, 4], 'cleared': 5},
+                 {'path': [[0, 0]], 'obstacle': None}, {'session_id': ['x']}, ['start']):
+        assert client.post('/api/avoid', json=body).status_code == 400, body
+    sid = client.post('/api/avoid', json={'start': [1, 1], 'goal': [9, 4]}).get_json()['session_id']
+    for body in ({'obstacle': [2]}, {'obstacles': [[2, 'x']]}, {'cleared': [None]}):
+        assert client.post('/api/avoid', json={'session_id': sid, **body}).status_code == 400, body
+    assert client.post('/api/avoid', json={'session_id': sid, 'obstacles': [[2.0, 1]]}).get_json()['success']
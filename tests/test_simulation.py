@@ -0,0 +1,56 @@
+from receptionist import db
+from receptionist.simulation import run_scenario, run_scenarios, summarize
+
+# more parties than the five-table main room seats, all at opening
+RUSH = [[0, 'a table for four'], [1, 'table for four'], [2, 'we are four'], [3, 'hello'],
+        [4, 'a table for two please'], [5, 'just me and my wife']]
+
+
+def _stable(report):
+    return {k: v for k, v in report.items() if k not in ('wall_seconds', 'speedup')}
+
+
+def test_trace_replay_waitlists_and_seats_everyone():
+    r = run_scenario({'trace': RUSH, 'dining_minutes': 30, 'dining_sigma': 0.01})
+    assert r['counts'] == {'arrivals': 6, 'unparsed': 1, 'seated': 5, 'waitlisted': 1,
+                           'turned_away': 0, 'abandoned': 0}
+    # T1, T2 and the T3 sync pair seat the fours, T4 the first two; the last
+    # couple waits for a meal to end and a table to be cleaned
+    assert r['wait_minutes']['max'] > 30
+    assert r['robot_travel_cells']['count'] == 5 and r['robot_travel_cells']['max'] > 0
+    assert 0 < r['seat_utilisation'] <= r['table_occupancy'] <= 1
+    assert r['speedup'] > 100
+
+
+def test_turn_away_policy_drops_instead_of_queueing():
+    r = run_scenario({'trace': RUSH, 'policy': 'turn-away'})
+    assert r['counts']['turned_away'] == 1 and r['counts']['waitlisted'] == 0
+
+
+def test_poisson_runs_are_reproducible_and_parallel():
+    scenarios = [{'site': 'rooftop', 'seed': s, 'rate_per_hour': 30, 'hours': 2} for s in (1, 2)]
+    parallel = run_scenarios(scenarios, processes=2)
+    assert [r['seed'] for r in parallel] == [1, 2]
+    assert _stable(parallel[0]) == _stable(run_scenario(scenarios[0]))
+    assert parallel[0]['counts']['arrivals'] > 20
+
+
+def test_summarize_percentiles():
+    assert summarize([]) == {'count': 0, 'mean': None, 'p50': None, 'p90': None, 'p99': None, 'max': None}
+    s = summarize(list(range(1, 101)))
+    assert (s['p50'], s['p90'], s['p99'], s['max'], s['mean']) == (50, 90, 99, 100, 50.5)
+
+
+def test_scenario_runs_on_one_clock_and_leaves_no_cached_state(tmp_path):
+    from receptionist import feed, floor, waitlist
+    caches = (floor._indexes, waitlist._waitlists, feed._feeds, db._listeners)
+    before = [len(c) for c in caches]
+    r = run_scenario({'trace': RUSH, 'dining_minutes': 30, 'dining_sigma': 0.01}, workdir=str(tmp_path))
+    assert [len(c) for c in caches] == before
+    path = str(tmp_path / 'evening-0.db')
+    with db.use_db(path):
+        (entry,) = [dict(e) for e in db.get_connection().execute("SELECT * FROM waitlist")]
+        first = db.get_connection().execute("SELECT MIN(at) FROM guest_events").fetchone()[0]
+    # enqueued and seated on the same (simulated) clock as the rest of the run
+    assert 30 * 60 < entry['seated_at'] - entry['enqueued_at'] < r['simulated_seconds']
+    assert 0 <= entry['enqueued_at'] - first <= 5
@@ -0,0 +1,73 @@
+import sqlite3
+
+from receptionist import db, sites
+from receptionist.allocator import choose_tables, find_table_for_party
+from receptionist.feed import get_feed
+
+
+def test_layout_lives_in_the_db():
+    rows = {r['table_id']: r for r in db.list_tables()}
+    assert (rows['T3_B']['floor'], rows['T3_B']['x'], rows['T3_B']['y']) == (0, 9, 6)
+    [main] = db.list_floors()
+    assert (main['width'], main['height'], main['home']) == (15, 12, (1, 1))
+    assert main['robots'] == {'R1': (1, 1), 'R2': (1, 3), 'R3': (1, 5)}
+
+
+def test_legacy_db_gets_default_coordinates(tmp_path, monkeypatch):
+    path = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE tables (table_id TEXT PRIMARY KEY, capacity INTEGER NOT NULL, '
+                 'status TEXT NOT NULL, is_combinable INTEGER NOT NULL, sync_id TEXT)')
+    conn.execute("INSERT INTO tables VALUES ('T2', 4, 'Seated', 1, NULL)")
+    conn.commit()
+    conn.close()
+    with db.use_db(path):
+        db.init_db()
+        [row] = db.list_tables()
+        assert (row['status'], row['floor'], row['x'], row['y']) == ('Seated', 0, 5, 3)
+        assert [f['name'] for f in db.list_floors()] == ['Main room']
+
+
+def test_sites_have_separate_state():
+    main, roof = sites.get_site('main'), sites.get_site('rooftop')
+    assert roof.db_path != main.db_path and sorted(roof.floors) == [0, 1]
+    v_main = db.floor_version()
+    with roof.activate():
+        assert find_table_for_party(2) == ['G1']
+        assert {r['table_id'] for r in db.list_tables()} >= {'G1', 'R1'}
+    # the default site neither saw the write nor lost its own tables
+    assert db.floor_version() == v_main
+    assert get_feed().wait(v_main, 0) == (v_main, False, [])
+    assert {r['status'] for r in db.list_tables()} == {'Available'}
+    assert sites.get_site('../etc') is None and sites.get_site('nowhere') is None
+
+
+def test_party_is_never_split_across_levels():
+    rows = [
+        {'table_id': 'A', 'capacity': 4, 'status': 'Available', 'is_combinable': 1, 'sync_id': None, 'floor': 0},
+        {'table_id': 'B', 'capacity': 4, 'status': 'Available', 'is_combinable': 1, 'sync_id': None, 'floor': 1},
+        {'table_id': 'C', 'capacity': 2, 'status': 'Available', 'is_combinable': 1, 'sync_id': None, 'floor': 1},
+        {'table_id': 'D', 'capacity': 2, 'status': 'Available', 'is_combinable': 1, 'sync_id': None, 'floor': 1},
+    ]
+    # A+B would waste nothing, but they are on different levels
+    assert sorted(choose_tables(rows, 8)) == ['B', 'C', 'D']
+    assert choose_tables(rows, 9) is None
+
+
+def test_api_selects_site_by_query_or_header():
+    import app as app_module
+    client = app_module.app.test_client()
+    assert client.get('/api/get_tables?site=nowhere').status_code == 404
+    info = client.get('/api/site', headers={'X-Site': 'rooftop'}).get_json()
+    assert [f['name'] for f in info['floors']] == ['Ground floor', 'Roof terrace']
+    # fourteen only fit together on the roof terrace (R1 + R2 + R3)
+    j = client.post('/api/guide?site=rooftop', json={'text': 'a table for fourteen'}).get_json()
+    assert j['success'] and j['floor'] == 1 and sorted(j['tables']) == ['R1', 'R2', 'R3']
+    assert j['path'][0] == [1, 8] and j['path'][-1] == [j['target_coords']['x'], j['target_coords']['y']]
+    tables = client.get('/api/get_tables?site=rooftop').get_json()
+    assert {t['name'] for t in tables if t['status'] == 'Reserved'} == {'R1', 'R2', 'R3'}
+    assert all(t['status'] == 'Available' for t in client.get('/api/get_tables').get_json())
+    # the ground floor wall blocks x = 10 except at y = 5..6
+    path = client.post('/api/get_path?site=rooftop', json={'x': 14, 'y': 5}).get_json()['path']
+    assert [10, 5] in path or [10, 6] in path
+    assert client.post('/api/get_path?site=rooftop', json={'floor': 7}).status_code == 400
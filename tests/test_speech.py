@@ -0,0 +1,106 @@
+import asyncio
+from receptionist.speech import (BargeIn, LocalEngine, astream_speech_to_text, astream_text_to_speech,
+                                 stream_speech_to_text, stream_text_to_speech)
+
+
+def _chunks(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_streaming_stt_yields_partials_then_final():
+    audio = 'a table for six, café seating'.encode('utf-8')
+    results = list(stream_speech_to_text(_chunks(audio, 5)))
+    assert [r['final'] for r in results].count(True) == 1
+    assert results[0]['text'] == 'a tab'
+    assert results[-1] == {'text': 'a table for six, café seating', 'final': True}
+
+
+def test_streaming_tts_reassembles_and_barges_in():
+    text = 'Good evening. Got it, a table for 4. Please follow me.'
+    assert b''.join(stream_text_to_speech(text)) == text.encode('utf-8')
+    barge = BargeIn()
+    out = []
+    for audio in stream_text_to_speech(text, barge_in=barge):
+        out.append(audio)
+        # guest starts talking while the robot is mid-sentence
+        list(stream_speech_to_text([b'sorry'], on_speech=barge.cancel))
+    assert out == [b'Good evening. ']
+
+
+def test_async_streams():
+    async def mic():
+        for c in _chunks(b'just me', 3):
+            yield c
+
+    async def run():
+        engine = LocalEngine()
+        partials = [r async for r in astream_speech_to_text(mic(), engine)]
+        audio = [a async for a in astream_text_to_speech('Hello. Welcome!', engine)]
+        return partials, audio
+
+    partials, audio = asyncio.run(run())
+    assert partials[-1]['text'] == 'just me'
+    assert audio == [b'Hello. ', b'Welcome!']
+
+
+def test_phrase_cache_tiers(tmp_path):
+    from receptionist.speech import PhraseCache
+
+    class CountingEngine(LocalEngine):
+        calls = 0
+
+        def synthesize(self, text):
+            CountingEngine.calls += 1
+            return super().synthesize(text)
+
+    engine = CountingEngine()
+    cache = PhraseCache(engine, directory=str(tmp_path))
+    cache.prewarm(['Good evening.'])
+    assert cache.synthesize('Good evening.') == b'Good evening.'
+    assert cache.stats()['misses'] == 1 and cache.stats()['memory_hits'] == 1
+
+    # a fresh process reuses the disk store; another voice does not
+    again = PhraseCache(engine, directory=str(tmp_path))
+    again.synthesize('Good evening.')
+    assert again.stats()['disk_hits'] == 1 and CountingEngine.calls == 1
+    other = PhraseCache(CountingEngine(voice='warm'), directory=str(tmp_path))
+    other.synthesize('Good evening.')
+    assert CountingEngine.calls == 2
+
+
+def test_templates_are_prewarmed():
+    import app as app_module
+    from receptionist.speech import get_phrase_cache
+    app_module.app.test_client().get('/api/version')
+    app_module._prewarm_phrases().join(10)  # started by the first request
+    before = get_phrase_cache().stats()['misses']
+    get_phrase_cache().synthesize(app_module.CONFIRM_TEMPLATE.format(party=4))
+    assert get_phrase_cache().stats()['misses'] == before
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    import os
+    from receptionist.speech import PhraseCache
+    cache = PhraseCache(LocalEngine(), directory=str(tmp_path), max_disk_entries=10)
+    for i in range(10):
+        cache.synthesize(f'phrase {i}')
+    for i in range(10):  # make phrase 0 the most recently used on disk
+        os.utime(cache._path(cache.key(f'phrase {i}')), (i + 1, i + 1))
+    PhraseCache(LocalEngine(), directory=str(tmp_path)).synthesize('phrase 0')
+    cache.synthesize('phrase 10')  # the eleventh file trims the store to 9
+    on_disk = {t for t in [f'phrase {i}' for i in range(11)] if os.path.exists(cache._path(cache.key(t)))}
+    assert len(on_disk) == 9 and {'phrase 0', 'phrase 10'} <= on_disk
+    assert 'phrase 1' not in on_disk and 'phrase 2' not in on_disk
+
+
+
+def test_rewriting_a_cached_phrase_does_not_count_as_a_new_entry(tmp_path):
+    import os
+    from receptionist.speech import PhraseCache
+    cache = PhraseCache(LocalEngine(), directory=str(tmp_path), max_disk_entries=3)
+    for text in ('one', 'two', 'three'):
+        cache.synthesize(text)
+    for _ in range(5):  # e.g. another process wrote the same phrase meanwhile
+        cache._write(cache.key('one'), b'one')
+    assert cache._disk_entries == 3
+    assert all(os.path.exists(cache._path(cache.key(t))) for t in ('one', 'two', 'three'))
@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(code, tmp_path):
+    env = {**os.environ, 'RECEPTIONIST_DB': str(tmp_path / 'cold.db')}
+    return subprocess.run([sys.executable, '-c', f'import sys; sys.path.insert(0, {ROOT!r}); {code}'],
+                          env=env, cwd=str(tmp_path), check=True, capture_output=True, text=True).stdout
+
+
+def test_package_import_loads_submodules_on_first_use(tmp_path):
+    out = _run("import receptionist; print('receptionist.db' in sys.modules, 'sqlite3' in sys.modules); "
+               "from receptionist import parse_party_size; print(parse_party_size('table for three'), "
+               "'receptionist.nlp' in sys.modules, 'receptionist.db' in sys.modules)", tmp_path)
+    assert out.split() == ['False', 'False', '3', 'True', 'False']
+
+
+def test_app_import_leaves_the_db_and_tts_to_the_first_request(tmp_path):
+    out = _run("import os; from receptionist import speech; speech.TTS_CACHE_DIR = 'tts_cache'; "
+               "import app; print(os.path.exists(os.environ['RECEPTIONIST_DB']), os.path.exists('tts_cache')); "
+               "print(app.app.test_client().get('/api/get_tables').status_code, "
+               "os.path.exists(os.environ['RECEPTIONIST_DB']))", tmp_path)
+    assert out.split() == ['False', 'False', '200', 'True']
@@ -0,0 +1,131 @@
+import time
+
+from receptionist import db, lifecycle
+from receptionist.waitlist import Waitlist, estimate_waits, fits_floor, get_waitlist
+
+ALL = ['T1', 'T2', 'T3_A', 'T3_B', 'T4']
+
+
+def test_freed_tables_go_to_the_best_placed_party_that_fits():
+    db.reserve_tables(ALL)
+    wl = get_waitlist()
+    big = wl.enqueue(8)
+    first = wl.enqueue(2, name='Silva')
+    vip = wl.enqueue(2, priority=1)
+    assert [e['status'] for e in (big, first, vip)] == ['Waiting'] * 3
+    assert [p['id'] for p in wl.snapshot()] == [vip['id'], big['id'], first['id']]
+
+    # releasing an unseated reservation frees T4: the VIP two-top skips the party of eight
+    lifecycle.release(['T4'])
+    assert wl.get(vip['id'])['status'] == 'Seated' and wl.get(vip['id'])['tables'] == ['T4']
+    assert {r['table_id']: r['status'] for r in db.list_tables()}['T4'] == 'Reserved'
+    lifecycle.release(['T1'])
+    assert wl.get(first['id'])['tables'] == ['T1']
+    assert [p['id'] for p in wl.snapshot()] == [big['id']]
+
+
+def test_waiting_parties_survive_a_restart_and_can_cancel():
+    db.reserve_tables(ALL)
+    wl = get_waitlist()
+    ids = [wl.enqueue(n)['id'] for n in (4, 2, 6)]
+    assert wl.cancel(ids[1]) and not wl.cancel(ids[1])
+    reloaded = Waitlist(db.current_db())
+    assert [p['id'] for p in reloaded.snapshot()] == [ids[0], ids[2]]
+    db.init_db(force=True)
+    assert wl.snapshot() == [] and wl.get(ids[0]) is None
+
+
+def test_many_queued_parties_only_the_heads_are_tried():
+    db.reserve_tables(ALL)
+    wl = get_waitlist()
+    for i in range(300):
+        wl.enqueue(6 + i % 7)
+    two = wl.enqueue(2)
+    start = time.perf_counter()
+    lifecycle.release(['T4'])
+    assert time.perf_counter() - start < 0.5
+    assert wl.get(two['id'])['status'] == 'Seated' and len(wl) == 300
+
+
+def test_wait_estimates_grow_along_the_queue():
+    db.reserve_tables(ALL)
+    now = time.time()
+    etas = estimate_waits([2, 4, 4, 6, 30], now)
+    assert all(now <= a <= b for a, b in zip(etas[:3], etas[1:4]))
+    assert etas[-1] is None
+    assert estimate_waits([0, 2, -1], now)[::2] == [None, None]
+
+
+def test_parties_no_allocation_can_seat_are_turned_away():
+    # ten seats combine (T1 + T2 + T4); the S1 pair seats twelve but cannot combine
+    assert fits_floor(10) and fits_floor(6) and not fits_floor(12) and not fits_floor(0)
+    import app as app_module
+    db.reserve_tables(ALL)
+    j = app_module.app.test_client().post('/api/handle_request', json={'text': 'a table for twelve'}).get_json()
+    assert not j['success'] and 'waitlist' not in j and len(get_waitlist()) == 0
+
+
+def test_a_party_of_zero_is_never_queued():
+    import app as app_module
+    client = app_module.app.test_client()
+    db.reserve_tables(ALL)
+    j = client.post('/api/handle_request', json={'text': 'table for zero'}).get_json()
+    assert not j['success'] and 'waitlist' not in j
+    assert len(get_waitlist()) == 0 and client.get('/api/waitlist').status_code == 200
+
+
+def test_handle_request_queues_the_guest_when_full():
+    import app as app_module
+    client = app_module.app.test_client()
+    db.reserve_tables(ALL)
+    j = client.post('/api/handle_request', json={'text': 'a table for four'}).get_json()
+    assert not j['success'] and j['waitlist']['position'] == 1 and 'waitlist' in j['message']
+    assert j['waitlist']['eta_seconds'] > 0
+    listing = client.get('/api/waitlist').get_json()
+    assert listing['waiting'] == 1 and listing['parties'][0]['party_size'] == 4
+    entry_id = j['waitlist']['id']
+    lifecycle.release(['T1'])
+    assert client.get(f'/api/waitlist/{entry_id}').get_json()['tables'] == ['T1']
+    assert client.delete(f'/api/waitlist/{entry_id}').status_code == 404
+    assert client.post('/api/waitlist', json={'size': 99}).status_code == 400
+
+
+def test_claim_notifies_listeners_only_after_commit():
+    import threading
+    db.reserve_tables(['T1', 'T2', 'T3_A', 'T3_B'])
+    seen = []
+
+    def listener(table_ids, status):
+        # read from another connection: only committed rows are visible there
+        rows = []
+        t = threading.Thread(target=lambda: rows.extend(db.get_tables(['T4'])))
+        t.start()
+        t.join()
+        seen.append((status, rows[0]['status']))
+
+    db.subscribe(listener)
+    try:
+        entry = get_waitlist().enqueue(2)
+    finally:
+        db._listeners.remove(listener)
+    assert entry['status'] == 'Seated' and seen == [('Reserved', 'Reserved')]
+
+
+def test_a_match_requested_mid_pass_is_not_lost(monkeypatch):
+    import threading
+    wl = get_waitlist()
+    passes = []
+    real = wl._match_once
+
+    def match_once():
+        passes.append(1)
+        if len(passes) == 1:
+            # another thread asks for a match while this pass runs
+            t = threading.Thread(target=lambda: passes.append(wl.match()))
+            t.start()
+            t.join()
+        return real()
+
+    monkeypatch.setattr(wl, '_match_once', match_once)
+    wl.match()
+    assert passes == [1, [], 1] and not wl._matching
@@ -1,10 +1,13 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from receptionist import get_greeting, parse_party_size, find_table_for_party
-from receptionist.db import init_db, list_tables
+from receptionist.db import init_db, list_tables, floor_version
 import json
 import os
 
+# how often to check whether another kiosk changed the floor
+FLOOR_POLL_MS = 1000
+
 
 class AccessibleApp(tk.Tk):
     def __init__(self):
@@ -17,8 +20,14 @@ class AccessibleApp(tk.Tk):
         self.high_contrast = False
 
         self._create_widgets()
+        self._floor_version = None
+        # paint the window first; opening (or seeding) the DB can wait a frame
+        self.after_idle(self._load_floor)
+
+    def _load_floor(self):
         init_db()
         self.refresh_tables()
+        self.after(FLOOR_POLL_MS, self._watch_floor)
 
     def _create_widgets(self):
         # Menu
@@ -111,7 +120,14 @@ class AccessibleApp(tk.Tk):
         self.announce(f'Reserved table(s): {", ".join(res)}')
         self.refresh_tables()
 
+    def _watch_floor(self):
+        # a one-row read; the table list is only re-read when the version moved
+        if floor_version() != self._floor_version:
+            self.refresh_tables()
+        self.after(FLOOR_POLL_MS, self._watch_floor)
+
     def refresh_tables(self):
+        self._floor_version = floor_version()
         self.table_list.delete(0, 'end')
         rows = list(list_tables())
         for r in rows: